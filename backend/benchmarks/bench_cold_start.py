@@ -0,0 +1,125 @@
+"""
+Measure cold start: import time of ``server`` and time to first request.
+
+Each run uses a fresh interpreter. ``import_s`` is the time to import
+the ``server`` module. ``first_response_s`` is the time from spawning
+``uvicorn server:app`` to the first successful
+``GET /api/webinar-stats``. ``ready_s`` is the time until
+``GET /api/ready`` answers 200 (warm-up finished). Runs against the
+in-memory storage unless ``--mongo-url`` is given.
+
+    cd backend && python -m benchmarks.bench_cold_start
+    cd backend && python -m benchmarks.bench_cold_start --warmup blocking --runs 10
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = "import time; started = time.perf_counter(); import server; print(time.perf_counter() - started)"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def status_of(url: str) -> int:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return 0
+
+
+def measure_import(env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_startup(env: dict, timeout: float) -> dict:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {"first_response_s": None, "ready_s": None}
+    try:
+        deadline = started + timeout
+        while time.perf_counter() < deadline and result["ready_s"] is None:
+            if result["first_response_s"] is None and status_of(f"{base_url}/api/webinar-stats") == 200:
+                result["first_response_s"] = time.perf_counter() - started
+            if result["first_response_s"] is not None and status_of(f"{base_url}/api/ready") == 200:
+                result["ready_s"] = time.perf_counter() - started
+            time.sleep(0.005)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return result
+
+
+def summarize(values: list) -> dict:
+    values = [value for value in values if value is not None]
+    if not values:
+        return {"runs": 0}
+    return {
+        "runs": len(values),
+        "min_ms": round(min(values) * 1000, 1),
+        "median_ms": round(statistics.median(values) * 1000, 1),
+        "max_ms": round(max(values) * 1000, 1),
+    }
+
+
+def run(args) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "STARTUP_WARMUP": args.warmup,
+        "STORAGE_BACKEND": "mongo" if args.mongo_url else "memory",
+        "RATE_LIMIT_ENABLED": "false",
+    })
+    if args.mongo_url:
+        env.update({"MONGO_URL": args.mongo_url, "DB_NAME": args.db_name})
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    startups = [measure_startup(env, args.timeout) for _ in range(args.runs)]
+    return {
+        "storage": env["STORAGE_BACKEND"],
+        "warmup": args.warmup,
+        "import": summarize(imports),
+        "first_response": summarize([startup["first_response_s"] for startup in startups]),
+        "ready": summarize([startup["ready_s"] for startup in startups]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", choices=["background", "blocking"], default="background")
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--db-name", default="bench_cold_start")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for a server to become ready")
+    args = parser.parse_args()
+
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
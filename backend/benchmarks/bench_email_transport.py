@@ -0,0 +1,88 @@
+"""
+Compare email throughput of the threadpool path and the asyncio path.
+
+The threadpool path runs the blocking ``send_email`` on a thread pool
+sized like Starlette's default (40 threads); the asyncio path awaits
+``async_send_email`` directly on the loop. Both talk to a local
+SendGrid stub with configurable latency.
+
+    cd backend && python -m benchmarks.bench_email_transport --messages 2000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.sendgrid_stub import SendGridStub
+
+
+async def run_threadpool(messages: int, threads: int) -> float:
+    import emails
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=threads)
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        loop.run_in_executor(executor, emails.send_email, f"user{i}@example.com", "Benchmark", "<p>hi</p>")
+        for i in range(messages)
+    ])
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+    return elapsed
+
+
+async def run_async(messages: int) -> float:
+    import emails
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        emails.async_send_email(f"user{i}@example.com", "Benchmark", "<p>hi</p>")
+        for i in range(messages)
+    ])
+    elapsed = time.perf_counter() - started
+    await emails.aclose_async_transport()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="stub response delay in seconds")
+    parser.add_argument("--threads", type=int, default=40, help="threadpool size for the blocking path")
+    parser.add_argument("--in-flight", type=int, default=200, help="SENDGRID_MAX_IN_FLIGHT for the async path")
+    args = parser.parse_args()
+
+    stub = SendGridStub(latency=args.latency).start()
+    os.environ["SENDGRID_API_URL"] = stub.url
+    os.environ["SENDGRID_API_KEY"] = "SG.benchmark"
+    os.environ["SENDGRID_POOL_SIZE"] = str(max(args.threads, args.in_flight))
+    os.environ["SENDGRID_MAX_IN_FLIGHT"] = str(args.in_flight)
+
+    import emails
+
+    threadpool_seconds = asyncio.run(run_threadpool(args.messages, args.threads))
+    emails.close_transport()
+    async_seconds = asyncio.run(run_async(args.messages))
+    stub.stop()
+
+    print(json.dumps({
+        "messages": args.messages,
+        "stub_latency_s": args.latency,
+        "threadpool": {
+            "threads": args.threads,
+            "seconds": round(threadpool_seconds, 3),
+            "emails_per_s": round(args.messages / threadpool_seconds, 1),
+        },
+        "asyncio": {
+            "max_in_flight": args.in_flight,
+            "seconds": round(async_seconds, 3),
+            "emails_per_s": round(args.messages / async_seconds, 1),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
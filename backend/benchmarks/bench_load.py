@@ -0,0 +1,227 @@
+"""
+Load-test the registration API end to end, in-process.
+
+Starts ``server.app`` under uvicorn on a local port together with the
+SendGrid stub, then drives each scenario with an aiohttp client at a
+fixed concurrency and reports throughput, latency percentiles and error
+rates as JSON. Uses a real MongoDB when ``--mongo-url`` is given (a
+scratch database that is dropped afterwards); ``--fake-mongo`` runs
+against mongomock-motor instead, which must be installed separately,
+and ``--storage memory|sqlite`` takes MongoDB out of the picture to
+measure the HTTP and validation layers on their own.
+
+The client and the server share one process (and the GIL), so compare
+numbers between commits on the same machine rather than reading them
+as production capacity.
+
+    cd backend && python -m benchmarks.bench_load --mongo-url mongodb://localhost:27017
+    cd backend && python -m benchmarks.bench_load --fake-mongo --concurrency 64 --duration 5
+    cd backend && python -m benchmarks.bench_load --storage memory
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import aiohttp
+
+from benchmarks.sendgrid_stub import SendGridStub
+
+SCENARIOS = ["register", "stats", "registrations"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class AppServer:
+    """
+    uvicorn running ``server.app`` on its own event loop in a daemon thread
+    """
+
+    def __init__(self, app, port: int):
+        import uvicorn
+
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=port, log_level="warning", access_log=False, lifespan="on",
+        ))
+        self._thread = threading.Thread(target=self.server.run, name="bench-app", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "AppServer":
+        self._thread.start()
+        deadline = time.monotonic() + 30
+        while not self.server.started:
+            if not self._thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("App server failed to start")
+            time.sleep(0.05)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self._thread.join(timeout=30)
+
+
+def registration_body() -> dict:
+    return {
+        "fullName": "Load Test User",
+        "email": f"load-{uuid.uuid4().hex}@example.com",
+        "whatsapp": "+91-9876543210",
+        "referralSource": "LinkedIn",
+    }
+
+
+async def request(session: aiohttp.ClientSession, base_url: str, scenario: str) -> int:
+    if scenario == "register":
+        async with session.post(f"{base_url}/api/webinar-register", json=registration_body()) as response:
+            await response.read()
+            return response.status
+    path = "/api/webinar-stats" if scenario == "stats" else "/api/webinar-registrations?limit=50"
+    async with session.get(f"{base_url}{path}") as response:
+        await response.read()
+        return response.status
+
+
+async def drive(base_url: str, scenario: str, concurrency: int, duration: float, max_requests: int) -> dict:
+    latencies = []
+    statuses = {}
+    errors = 0
+    issued = 0
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors, issued
+            while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+                issued += 1
+                started = time.perf_counter()
+                try:
+                    status = await request(session, base_url, scenario)
+                except Exception as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+                if not isinstance(status, int) or status >= 400:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "errors": errors,
+        "error_rate": round(errors / max(1, len(latencies)), 4),
+        "statuses": statuses,
+    }
+
+
+def configure_environment(args, stub: SendGridStub, db_name: str):
+    # server.py reads its configuration at import time
+    os.environ.update({
+        "STORAGE_BACKEND": args.storage or "mongo",
+        "SQLITE_PATH": os.path.join(tempfile.mkdtemp(prefix="bench_load_"), "webinar.sqlite3"),
+        "MONGO_URL": args.mongo_url or "mongodb://fake",
+        "DB_NAME": db_name,
+        "SENDGRID_API_KEY": "bench",
+        "SENDGRID_API_URL": stub.url,
+        "WEBINAR_CAPACITY": str(args.capacity),
+        "RATE_LIMIT_ENABLED": "true" if args.rate_limit else "false",
+    })
+    if args.fake_mongo:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("--fake-mongo needs mongomock-motor (pip install mongomock-motor)")
+        import motor.motor_asyncio
+
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+
+
+def run(args) -> dict:
+    db_name = f"bench_load_{uuid.uuid4().hex[:8]}"
+    stub = SendGridStub(latency=args.sendgrid_latency_ms / 1000).start()
+    configure_environment(args, stub, db_name)
+
+    import server
+
+    app_server = AppServer(server.app, args.port or free_port()).start()
+    results = {}
+    try:
+        for scenario in args.scenarios:
+            results[scenario] = asyncio.run(
+                drive(app_server.url, scenario, args.concurrency, args.duration, args.requests)
+            )
+    finally:
+        app_server.stop()
+        stub.stop()
+        if args.mongo_url:
+            from pymongo import MongoClient
+
+            with MongoClient(args.mongo_url) as cleanup:
+                cleanup.drop_database(db_name)
+
+    return {
+        "backend": args.storage or ("mongodb" if args.mongo_url else "mongomock"),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "sendgrid_latency_ms": args.sendgrid_latency_ms,
+        "rate_limit": args.rate_limit,
+        "scenarios": results,
+        "sendgrid_requests": stub.requests_received,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    backend = parser.add_mutually_exclusive_group(required=True)
+    backend.add_argument("--mongo-url", default=None)
+    backend.add_argument("--fake-mongo", action="store_true", help="run against mongomock-motor")
+    backend.add_argument("--storage", choices=["memory", "sqlite"], help="run without MongoDB")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--requests", type=int, default=0, help="stop a scenario after this many requests")
+    parser.add_argument("--capacity", type=int, default=10_000_000, help="webinar seats, so registrations never sell out")
+    parser.add_argument("--sendgrid-latency-ms", type=float, default=50.0)
+    parser.add_argument("--rate-limit", action="store_true", help="keep the registration rate limiter enabled")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Per-row cost of serializing list endpoints, before and after the fast path.
+
+"validated" reproduces the previous path: build a pydantic model per
+Mongo document, then let FastAPI validate it against ``response_model``
+again and render it with the standard JSON encoder. "orjson" is the
+fast path: projected documents encoded directly by ORJSONResponse.
+
+    cd backend && python -m benchmarks.bench_serialization --rows 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import List
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmarks")
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from server import StatusCheck, WebinarRegistration
+
+
+def make_rows(rows: int):
+    now = datetime.utcnow()
+    registrations = [
+        {
+            "id": str(uuid.uuid4()),
+            "fullName": f"User {i}",
+            "email": f"user{i}@example.com",
+            "whatsapp": "+91-9876543210",
+            "referralSource": "LinkedIn",
+            "timestamp": now,
+        }
+        for i in range(rows)
+    ]
+    status_checks = [
+        {"id": str(uuid.uuid4()), "client_name": f"client {i}", "timestamp": now}
+        for i in range(rows)
+    ]
+    return {"webinar_registrations": (WebinarRegistration, registrations), "status_checks": (StatusCheck, status_checks)}
+
+
+async def validated(model, docs, field) -> bytes:
+    objects = [model(**doc) for doc in docs]
+    content = await serialize_response(field=field, response_content=objects)
+    return JSONResponse(content).body
+
+
+async def fast_path(model, docs, field) -> bytes:
+    return ORJSONResponse(docs).body
+
+
+def measure(render, model, docs, field, repeat: int) -> float:
+    loop = asyncio.new_event_loop()
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            loop.run_until_complete(render(model, docs, field))
+        return (time.perf_counter() - started) / repeat
+    finally:
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {"rows": args.rows}
+    for endpoint, (model, docs) in make_rows(args.rows).items():
+        field = create_response_field(name=f"Response_{endpoint}", type_=List[model], mode="serialization")
+        before = measure(validated, model, docs, field, args.repeat)
+        after = measure(fast_path, model, docs, field, args.repeat)
+        results[endpoint] = {
+            "validated_us_per_row": round(before / args.rows * 1e6, 2),
+            "orjson_us_per_row": round(after / args.rows * 1e6, 2),
+            "speedup": round(before / after, 1),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measure per-message render cost of the email templates.
+
+Compares the precompiled templates against the previous approach of
+rebuilding the full inline HTML with an f-string on every call (the
+baseline is generated from the same template files so both produce the
+same markup apart from minification and escaping).
+
+    cd backend && python -m benchmarks.bench_templates --messages 10000
+"""
+
+import argparse
+import html
+import json
+import re
+import time
+
+from templating import TEMPLATE_DIR, _PLACEHOLDER, templates
+
+
+def fstring_baseline(name: str, escaped: bool = False):
+    """
+    Compile a template file into the per-call f-string function the
+    senders used before the template subsystem existed, optionally with
+    the HTML escaping that function lacked
+    """
+    source = (TEMPLATE_DIR / f"{name}.html").read_text(encoding="utf-8")
+    wrapper = "escape(str(%s))" if escaped else "%s"
+
+    def to_expression(match: re.Match) -> str:
+        default = match.group(2)
+        lookup = "data.get(%r, %r)" % (match.group(1), default.strip() if default else "")
+        return "{" + wrapper % lookup + "}"
+
+    body = _PLACEHOLDER.sub(to_expression, source)
+    namespace = {"escape": html.escape}
+    exec(f'def render(data):\n    return f"""{body}"""\n', namespace)
+    return namespace["render"]
+
+
+def measure(render, contexts) -> float:
+    started = time.perf_counter()
+    for context in contexts:
+        render(context)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+
+    contexts = {
+        "webinar_registration_notification": [
+            {
+                "fullName": f"User {i}",
+                "email": f"user{i}@example.com",
+                "whatsapp": f"+91-98765{i:05d}",
+                "referralSource": "LinkedIn",
+                "timestamp": "2025-01-01 10:00:00",
+            }
+            for i in range(args.messages)
+        ],
+        "webinar_confirmation": [{"user_name": f"User {i}"} for i in range(args.messages)],
+    }
+
+    results = {"messages": args.messages}
+    for name, rows in contexts.items():
+        baseline = fstring_baseline(name)
+        baseline_escaped = fstring_baseline(name, escaped=True)
+        compiled = templates.get(name)
+        baseline_seconds = measure(baseline, rows)
+        baseline_escaped_seconds = measure(baseline_escaped, rows)
+        compiled_seconds = measure(compiled.render, rows)
+        results[name] = {
+            "fstring_us_per_message": round(baseline_seconds / args.messages * 1e6, 2),
+            "fstring_escaped_us_per_message": round(baseline_escaped_seconds / args.messages * 1e6, 2),
+            "compiled_us_per_message": round(compiled_seconds / args.messages * 1e6, 2),
+            "fstring_bytes": len(baseline(rows[0]).encode()),
+            "compiled_bytes": len(compiled.render(rows[0]).encode()),
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
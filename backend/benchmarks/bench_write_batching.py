@@ -0,0 +1,138 @@
+"""
+Find the crossover point between insert_one and group-commit batching.
+
+Runs N concurrent writers at increasing concurrency levels and reports
+throughput and latency percentiles for direct ``insert_one`` calls and
+for ``InsertBatcher``. Uses a real MongoDB when ``--mongo-url`` is given
+(documents go to a scratch collection that is dropped afterwards),
+otherwise a simulated server: each write pays a network round trip,
+then holds one of ``--server-slots`` execution slots for a fixed
+per-operation cost plus a per-document cost.
+
+    cd backend && python -m benchmarks.bench_write_batching --mongo-url mongodb://localhost:27017
+    cd backend && python -m benchmarks.bench_write_batching --rtt-ms 0.5 --op-us 250 --per-doc-us 10
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+from write_batcher import InsertBatcher
+
+
+class SimulatedCollection:
+    def __init__(self, rtt: float, op_cost: float, per_doc: float, slots: int):
+        self.rtt = rtt
+        self.op_cost = op_cost
+        self.per_doc = per_doc
+        self.slots = asyncio.Semaphore(slots)
+
+    async def _execute(self, documents: int):
+        await asyncio.sleep(self.rtt / 2)
+        async with self.slots:
+            await asyncio.sleep(self.op_cost + self.per_doc * documents)
+        await asyncio.sleep(self.rtt / 2)
+
+    async def insert_one(self, document: dict):
+        await self._execute(1)
+
+    async def insert_many(self, documents: list, ordered: bool = True):
+        await self._execute(len(documents))
+
+
+def make_document() -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "fullName": "Benchmark User",
+        "email": f"{uuid.uuid4().hex}@example.com",
+        "whatsapp": "+91-9876543210",
+        "referralSource": "LinkedIn",
+        "timestamp": datetime.utcnow(),
+    }
+
+
+async def drive(write, concurrency: int, per_writer: int) -> dict:
+    latencies = []
+
+    async def writer():
+        for _ in range(per_writer):
+            started = time.perf_counter()
+            await write(make_document())
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[writer() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "docs_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 3),
+    }
+
+
+async def run(args) -> dict:
+    client = None
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongo_url, maxPoolSize=max(args.levels) + 10)
+        collection = client[args.db_name][f"bench_registrations_{uuid.uuid4().hex[:8]}"]
+    else:
+        collection = SimulatedCollection(args.rtt_ms / 1000, args.op_us / 1e6, args.per_doc_us / 1e6, args.server_slots)
+
+    results = []
+    try:
+        for concurrency in args.levels:
+            per_writer = max(1, args.docs // concurrency)
+            direct = await drive(collection.insert_one, concurrency, per_writer)
+            batcher = InsertBatcher(collection, max_batch=args.batch_size, max_delay=args.delay_ms / 1000)
+            batched = await drive(batcher.insert, concurrency, per_writer)
+            results.append({
+                "concurrency": concurrency,
+                "insert_one": direct,
+                "batched": batched,
+                "avg_batch": round(batcher.documents_written / max(1, batcher.batches_written), 1),
+            })
+    finally:
+        if client is not None:
+            await collection.drop()
+            client.close()
+
+    crossover = next(
+        (row["concurrency"] for row in results if row["batched"]["docs_per_s"] > row["insert_one"]["docs_per_s"] * 1.1),
+        None,
+    )
+    return {
+        "backend": "mongodb" if args.mongo_url else (
+            f"simulated rtt={args.rtt_ms}ms op={args.op_us}us per_doc={args.per_doc_us}us slots={args.server_slots}"
+        ),
+        "docs_per_level": args.docs,
+        "crossover_concurrency": crossover,
+        "levels": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--db-name", default="benchmarks")
+    parser.add_argument("--docs", type=int, default=5000, help="documents written per concurrency level")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated network round trip")
+    parser.add_argument("--op-us", type=float, default=250.0, help="simulated server cost per write operation")
+    parser.add_argument("--per-doc-us", type=float, default=10.0, help="simulated server cost per document")
+    parser.add_argument("--server-slots", type=int, default=4, help="simulated concurrent operations on the server")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Minimal stand-in for the SendGrid v3 mail API used by the benchmarks.
+
+Accepts keep-alive HTTP/1.1 POSTs on /v3/mail/send, waits ``latency``
+seconds to mimic the provider and answers 202. Runs on its own event
+loop in a daemon thread so it never competes with the code under test.
+"""
+
+import asyncio
+import threading
+from typing import Optional
+
+
+class SendGridStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05,
+                 status_code: int = 202):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.status_code = status_code
+        self.requests_received = 0
+        self.bodies = []
+        self.keep_bodies = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                body = await reader.readexactly(length) if length else b""
+                self.requests_received += 1
+                if self.keep_bodies:
+                    self.bodies.append(body)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                writer.write(
+                    f"HTTP/1.1 {self.status_code} Stub\r\nContent-Length: 0\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode()
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> "SendGridStub":
+        self._thread = threading.Thread(target=self._run, name="sendgrid-stub", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop.stop()
+
+    def stop(self):
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Run a local SendGrid stub server")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stub = SendGridStub(port=args.port, latency=args.latency).start()
+    print(f"SendGrid stub listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
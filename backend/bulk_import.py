@@ -0,0 +1,258 @@
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+
+
+def format_for(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """
+    Guess the upload format from its file name or content type
+    """
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+def iter_csv(file) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    (row, fields, error) per data row of a CSV upload with a header line
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        for row, fields in enumerate(csv.DictReader(text), start=1):
+            if None in fields:
+                yield row, None, "too many columns"
+                continue
+            # Empty cells are missing values, so optional fields become None
+            yield row, {key: value for key, value in fields.items() if key and value not in (None, "")}, None
+    finally:
+        text.detach()
+
+
+def iter_ndjson(file) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    (row, fields, error) per non-blank line of an NDJSON upload
+    """
+    for row, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            fields = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row, None, f"invalid JSON: {str(e)}"
+            continue
+        if not isinstance(fields, dict):
+            yield row, None, "expected a JSON object"
+            continue
+        yield row, fields, None
+
+
+def read_chunk(rows: Iterator, size: int) -> list:
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+def validate_rows(model, document_model, rows: list) -> Tuple[List[Tuple[int, dict]], List[tuple]]:
+    """
+    Validate parsed rows; returns (row, document) pairs and (row, fields, error) failures
+
+    Only the fields of ``model`` are taken from a row, and they are
+    validated once, by ``document_model``, which adds the id and timestamp.
+    """
+    accepted = set(model.model_fields)
+    documents, failures = [], []
+    for row, fields, error in rows:
+        if error is None:
+            try:
+                document = document_model(**{key: value for key, value in fields.items() if key in accepted})
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in problem['loc']) or 'row'}: {problem['msg']}"
+                    for problem in e.errors()
+                )
+            else:
+                documents.append((row, document.dict()))
+                continue
+        failures.append((row, fields, error))
+    return documents, failures
+
+
+class RegistrationImporter:
+    """
+    Bulk-load registrations from a CSV or NDJSON upload.
+
+    The upload is read in a worker thread ``chunk_size`` rows at a time.
+    Validation against ``model`` (mostly email address checks) is the
+    expensive part, so chunks are validated on a pool of ``processes``
+    (in a thread when it is 1) while earlier chunks are written. The
+    models are pickled by reference, so they must live in a module the
+    pool can import cheaply (``models``), not in ``server``. The valid rows of a chunk take their seats with
+    one ``reserve_many`` and are written with one
+    ``insert_registrations``, so memory stays bounded by a few chunks
+    whatever the file size. Confirmation emails go to the outbox
+    scheduled ``1 / email_rate`` seconds apart instead of all at once.
+    Rows that fail validation, find no seat or are already registered
+    are listed in the report (up to ``max_errors`` of them).
+    """
+
+    def __init__(
+        self,
+        storage,
+        seat_allocator,
+        outbox,
+        model,
+        document_model,
+        on_imported: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+        chunk_size: int = 1000,
+        email_rate: float = 50.0,
+        max_errors: int = 1000,
+        processes: int = 2,
+    ):
+        self.storage = storage
+        self.seat_allocator = seat_allocator
+        self.outbox = outbox
+        self.model = model
+        self.document_model = document_model
+        self.on_imported = on_imported
+        self.chunk_size = max(1, chunk_size)
+        self.email_rate = email_rate
+        self.max_errors = max_errors
+        self.processes = max(1, processes)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._next_email_at: Optional[datetime] = None
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _validator(self) -> Optional[ProcessPoolExecutor]:
+        if self.processes <= 1:
+            return None
+        if self._executor is None:
+            # forkserver: never fork the threaded server process itself
+            self._executor = ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context("forkserver")
+            )
+        return self._executor
+
+    async def run(self, file, upload_format: str) -> dict:
+        started = time.perf_counter()
+        rows = iter_csv(file) if upload_format == "csv" else iter_ndjson(file)
+        report = {"received": 0, "imported": 0, "duplicates": 0, "rejected": 0,
+                  "errors": [], "errors_truncated": False, "emails_scheduled": 0, "aborted": None}
+        loop = asyncio.get_running_loop()
+        executor = self._validator()
+        validating = deque()
+        try:
+            while True:
+                # Keep one chunk per validator process in flight
+                while len(validating) < self.processes:
+                    raw = await asyncio.to_thread(read_chunk, rows, self.chunk_size)
+                    if not raw:
+                        break
+                    report["received"] += len(raw)
+                    validating.append(loop.run_in_executor(
+                        executor, validate_rows, self.model, self.document_model, raw
+                    ))
+                if not validating:
+                    break
+                documents, failures = await validating.popleft()
+                for row, fields, error in failures:
+                    self._reject(report, row, fields, error)
+                if documents:
+                    await self._import_chunk(documents, report)
+        except Exception as e:
+            for future in validating:
+                future.cancel()
+            # Chunks already written stay imported; the report says where it stopped
+            logger.error(f"Bulk import stopped after {report['received']} rows: {str(e)}")
+            report["aborted"] = f"stopped after row {report['received']}: {str(e)}"
+        report["email_rate_per_second"] = self.email_rate
+        report["duration_s"] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Bulk import: {report['imported']} imported, {report['duplicates']} duplicates, "
+            f"{report['rejected']} rejected of {report['received']} rows in {report['duration_s']}s"
+        )
+        return report
+
+    async def _import_chunk(self, chunk: List[Tuple[int, dict]], report: dict):
+        seats = await self.seat_allocator.reserve_many(len(chunk))
+        for row, document in chunk[seats:]:
+            self._reject(report, row, document, "no seats left")
+        chunk = chunk[:seats]
+        if not chunk:
+            return
+
+        try:
+            failed = await self.storage.insert_registrations([document for _, document in chunk])
+        except Exception:
+            await self.seat_allocator.release(len(chunk))
+            raise
+        if failed:
+            await self.seat_allocator.release(len(failed))
+        for index, reason in failed.items():
+            row, document = chunk[index]
+            if reason == "duplicate email":
+                report["duplicates"] += 1
+                self._add_error(report, row, document, reason)
+            else:
+                self._reject(report, row, document, reason)
+        imported = [document for index, (_, document) in enumerate(chunk) if index not in failed]
+        report["imported"] += len(imported)
+        if not imported:
+            return
+
+        if self.on_imported is not None:
+            await self.on_imported(imported)
+        try:
+            await self._schedule_confirmations(imported)
+            report["emails_scheduled"] += len(imported)
+        except Exception as e:
+            logger.error(f"Failed to queue bulk import confirmation emails: {str(e)}")
+
+    async def _schedule_confirmations(self, documents: List[dict]):
+        interval = 1.0 / self.email_rate if self.email_rate > 0 else 0.0
+        now = datetime.utcnow()
+        if self._next_email_at is None or self._next_email_at < now:
+            self._next_email_at = now
+        await self.outbox.enqueue_many(
+            [
+                ("webinar_confirmation", {"user_email": document["email"], "user_name": document["fullName"]})
+                for document in documents
+            ],
+            not_before=self._next_email_at,
+            interval=interval,
+        )
+        self._next_email_at += timedelta(seconds=interval * len(documents))
+
+    def _reject(self, report: dict, row: int, fields: Optional[dict], error: str):
+        report["rejected"] += 1
+        self._add_error(report, row, fields, error)
+
+    def _add_error(self, report: dict, row: int, fields: Optional[dict], error: str):
+        if len(report["errors"]) >= self.max_errors:
+            report["errors_truncated"] = True
+            return
+        email = fields.get("email") if isinstance(fields, dict) else None
+        report["errors"].append({"row": row, "email": email if isinstance(email, str) else None, "error": error})
@@ -0,0 +1,135 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Gauge values for the states
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """
+    A call was refused without being attempted; ``retry_after`` seconds until the next probe
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt: int, base: float, cap: float = float("inf")) -> float:
+    """
+    Jittered exponential backoff: between half and all of ``base * 2**attempt`` (at most ``cap``)
+    """
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker shared by every thread of a process.
+
+    Closed, calls go through and ``failure_threshold`` failures in a row
+    open the circuit. Open, ``allow`` refuses calls for ``reset_seconds``
+    without any I/O; after that the circuit is half-open and lets
+    ``half_open_probes`` calls through. A probe that succeeds closes the
+    circuit, one that fails opens it for another ``reset_seconds``. Probe
+    slots that were never reported back (e.g. a cancelled send) are
+    handed out again after ``reset_seconds``.
+
+    ``allow`` and ``record_success`` take no lock while the circuit is
+    closed and healthy, so the breaker costs nothing in normal operation.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0,
+                 half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._changed_at = time.monotonic()
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead now (a half-open call is a probe and must be reported)
+        """
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._changed_at < self.reset_seconds:
+                    self.rejected += 1
+                    return False
+                self._set_state(HALF_OPEN, now)
+            elif self.state == HALF_OPEN and self._probes >= self.half_open_probes:
+                if now - self._changed_at < self.reset_seconds:
+                    self.rejected += 1
+                    return False
+                self._set_state(HALF_OPEN, now)
+            if self.state == HALF_OPEN:
+                self._probes += 1
+            return True
+
+    def record_success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self._set_state(CLOSED, time.monotonic())
+                logger.info(f"{self.name} circuit closed after a successful probe")
+
+    def record_failure(self, error: str = ""):
+        with self._lock:
+            self.last_error = error
+            if self.state == HALF_OPEN:
+                self._open(f"probe failed: {error}")
+            elif self.state == CLOSED:
+                self.failures += 1
+                if self.failures >= self.failure_threshold:
+                    self._open(f"{self.failures} consecutive failures, last: {error}")
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the open circuit lets a probe through (0 when closed or half-open)
+        """
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self._changed_at + self.reset_seconds - time.monotonic())
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+            "times_opened": self.opened_count,
+            "rejected_calls": self.rejected,
+            "last_error": self.last_error,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+        }
+
+    def _open(self, reason: str):
+        self.opened_count += 1
+        self._set_state(OPEN, time.monotonic())
+        logger.warning(f"{self.name} circuit opened for {self.reset_seconds:g}s: {reason}")
+
+    def _set_state(self, state: str, now: float):
+        self.state = state
+        self._changed_at = now
+        self._probes = 0
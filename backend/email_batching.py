@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+from emails import EmailRejectedError, async_send_webinar_confirmation_batch, async_send_webinar_confirmation_email
+
+logger = logging.getLogger(__name__)
+
+# SendGrid accepts at most 1000 personalizations per request
+MAX_PERSONALIZATIONS = 1000
+
+# Rejections that are about the account, not the recipients, so splitting the batch cannot help
+ACCOUNT_REJECTIONS = (401, 403)
+
+
+class ConfirmationBatcher:
+    """
+    Coalesce webinar confirmation emails into batched SendGrid requests.
+
+    ``submit_many`` parks the caller until its recipients have been sent
+    as part of one or more batches; the outbox hands it every confirmation
+    it claimed at once, so batches are not limited by the number of
+    delivery slots. A batch goes out ``window_seconds`` after its first
+    recipient arrives, or as soon as it holds ``max_recipients``. If
+    SendGrid rejects the batch (a 4xx, e.g. one invalid address) its
+    recipients are sent one by one, so only the bad ones fail. If the
+    request fails otherwise every caller in the batch gets the error, so
+    the outbox retries each message on its own schedule.
+    """
+
+    def __init__(self, window_seconds: float = 0.5, max_recipients: int = 500):
+        self.window_seconds = window_seconds
+        self.max_recipients = max(1, min(max_recipients, MAX_PERSONALIZATIONS))
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sends: set = set()
+        self.batches_sent = 0
+        self.recipients_sent = 0
+        self.batches_split = 0
+
+    async def submit(self, user_email: str, user_name: str) -> bool:
+        result = (await self.submit_many([(user_email, user_name)]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def submit_many(self, recipients: List[Tuple[str, str]]) -> List[Union[bool, Exception]]:
+        """
+        Send (user_email, user_name) pairs in batches; returns the result or error per recipient
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for user_email, user_name in recipients:
+            future = loop.create_future()
+            futures.append(future)
+            self._pending.append((user_email, user_name, future))
+            if len(self._pending) >= self.max_recipients:
+                self._flush()
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "window_seconds": self.window_seconds,
+            "max_recipients": self.max_recipients,
+            "waiting": len(self._pending),
+            "batches_in_flight": len(self._sends),
+            "batches_sent": self.batches_sent,
+            "recipients_sent": self.recipients_sent,
+            "batches_split": self.batches_split,
+        }
+
+    async def close(self):
+        """
+        Send whatever is waiting and wait for in-flight batches
+        """
+        self._flush()
+        if self._sends:
+            await asyncio.wait(list(self._sends))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._send(batch))
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def _send(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        try:
+            result = await async_send_webinar_confirmation_batch(
+                [(email, name) for email, name, _ in batch]
+            )
+        except EmailRejectedError as e:
+            if len(batch) > 1 and e.status_code not in ACCOUNT_REJECTIONS:
+                await self._send_each(batch)
+                return
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches_sent += 1
+        self.recipients_sent += len(batch)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(result)
+
+    async def _send_each(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        logger.warning(f"Confirmation batch of {len(batch)} was rejected, sending its recipients one by one")
+        self.batches_split += 1
+        results = await asyncio.gather(
+            *(async_send_webinar_confirmation_email(email, name) for email, name, _ in batch),
+            return_exceptions=True,
+        )
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                self.recipients_sent += 1
+                future.set_result(result)
+
+
+class RegistrationDigest:
+    """
+    Collect admin registration notifications into periodic digest emails.
+
+    ``add`` buffers a registration's notification data. The buffer is
+    handed to ``deliver`` (which queues one digest email) ``interval_seconds``
+    after its first registration arrives, or as soon as it holds
+    ``max_registrations``. If ``deliver`` fails the registrations go back
+    into the buffer for the next flush. The buffer lives in this process:
+    ``close`` flushes it on shutdown, a crash loses at most one interval,
+    and every worker sends its own digests.
+    """
+
+    def __init__(self, deliver: Callable[[List[dict]], Awaitable], interval_seconds: float = 300.0,
+                 max_registrations: int = 100):
+        self.deliver = deliver
+        self.interval_seconds = interval_seconds
+        self.max_registrations = max(1, max_registrations)
+        self._pending: List[dict] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._sends: set = set()
+        self.digests_sent = 0
+        self.registrations_sent = 0
+
+    def add(self, registration_data: dict):
+        self._pending.append(registration_data)
+        if len(self._pending) >= self.max_registrations:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.interval_seconds, self._flush)
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "max_registrations": self.max_registrations,
+            "waiting": len(self._pending),
+            "digests_sent": self.digests_sent,
+            "registrations_sent": self.registrations_sent,
+        }
+
+    async def close(self):
+        """
+        Queue whatever is waiting and wait for in-flight deliveries
+        """
+        self._flush()
+        if self._sends:
+            await asyncio.wait(list(self._sends))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_registrations]
+            del self._pending[:self.max_registrations]
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, batch: List[dict]):
+        try:
+            await self.deliver(batch)
+        except Exception as e:
+            logger.error(f"Failed to queue registration digest of {len(batch)} registrations: {str(e)}")
+            self._pending[:0] = batch
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.interval_seconds, self._flush)
+            return
+        self.digests_sent += 1
+        self.registrations_sent += len(batch)
@@ -1,14 +1,427 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, To
+import asyncio
+import html
+import importlib
 import os
 import logging
-from typing import Optional
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from circuit_breaker import CLOSED, STATE_VALUES, CircuitBreaker, CircuitOpenError, backoff_delay
+from metrics import (
+    EMAIL_DELIVERY_ERRORS,
+    SENDGRID_CIRCUIT_REJECTIONS,
+    SENDGRID_CIRCUIT_STATE,
+    SENDGRID_REQUEST_DURATION,
+    SENDGRID_RETRIES,
+    sendgrid_outcome,
+)
+from templating import Markup, templates
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# SendGrid substitution tag replaced with each recipient's name in batched sends
+CONFIRMATION_NAME_TAG = "-fullName-"
+
 class EmailDeliveryError(Exception):
     pass
 
+class EmailCircuitOpenError(CircuitOpenError, EmailDeliveryError):
+    """
+    Refused without contacting SendGrid because its circuit is open
+    """
+
+class EmailRejectedError(EmailDeliveryError):
+    """
+    SendGrid refused the request with a 4xx other than 429; retrying it unchanged will not help
+    """
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class _TransientSendError(EmailDeliveryError):
+    """
+    A failure worth retrying: network error, timeout, 429 or 5xx
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def _retry_after_header(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class _ResilientTransport:
+    """
+    Retry and circuit-breaker policy shared by the SendGrid transports.
+
+    Each attempt gets at most ``timeout`` seconds and a send as a whole
+    at most ``deadline``. Transient failures are retried up to
+    ``attempts`` times with jittered exponential backoff (honouring
+    ``Retry-After`` up to ``retry_max_delay``) and count against
+    ``breaker``; while the breaker is open sends raise
+    EmailCircuitOpenError at once instead of waiting for a timeout.
+    """
+
+    transport_label = ""
+
+    def _init_policy(self, timeout: float, attempts: int, retry_base_delay: float, retry_max_delay: float,
+                     deadline: Optional[float], breaker: Optional[CircuitBreaker]):
+        self.timeout = timeout
+        self.attempts = max(1, attempts)
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.deadline = deadline if deadline is not None else timeout * self.attempts
+        self.breaker = breaker or CircuitBreaker("SendGrid")
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            SENDGRID_CIRCUIT_REJECTIONS.labels(self.transport_label).inc()
+            retry_after = self.breaker.retry_after()
+            raise EmailCircuitOpenError(f"SendGrid circuit is open, retry in {retry_after:.1f}s", retry_after)
+
+    def _attempt_timeout(self, deadline_at: float) -> float:
+        return max(0.1, min(self.timeout, deadline_at - time.monotonic()))
+
+    def _failed(self, attempt: int, error: _TransientSendError, deadline_at: float) -> Optional[float]:
+        """
+        Record a transient failure; seconds to wait before retrying, or None to give up
+        """
+        self.breaker.record_failure(str(error))
+        if attempt >= self.attempts or self.breaker.state != CLOSED:
+            return None
+        delay = backoff_delay(attempt - 1, self.retry_base_delay, self.retry_max_delay)
+        if error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.retry_max_delay))
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        SENDGRID_RETRIES.labels(self.transport_label).inc()
+        return delay
+
+class SendGridTransport(_ResilientTransport):
+    """
+    Keep-alive HTTP transport for the SendGrid v3 mail API.
+
+    One instance is shared by the whole process so TLS sessions and
+    connections are reused across sends. ``base_url`` can point at a
+    local stub server for benchmarks.
+    """
+
+    transport_label = "sync"
+
+    def __init__(self, api_key: Optional[str], base_url: str = "https://api.sendgrid.com",
+                 pool_size: int = 10, timeout: float = 10.0, attempts: int = 3,
+                 retry_base_delay: float = 0.25, retry_max_delay: float = 4.0,
+                 deadline: Optional[float] = None, breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self._init_policy(timeout, attempts, retry_base_delay, retry_max_delay, deadline, breaker)
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def send(self, payload: dict) -> int:
+        """
+        POST a mail/send payload and return the HTTP status code
+        """
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_circuit()
+            try:
+                with tracer.span("sendgrid.request"):
+                    return self._post(payload, self._attempt_timeout(deadline_at))
+            except _TransientSendError as e:
+                delay = self._failed(attempt, e, deadline_at)
+                if delay is None:
+                    raise
+                with tracer.span("sendgrid.backoff"):
+                    time.sleep(delay)
+
+    def _post(self, payload: dict, timeout: float) -> int:
+        import requests
+
+        started = time.perf_counter()
+        status_code = None
+        try:
+            response = self._session.post(f"{self.base_url}/v3/mail/send", json=payload, timeout=timeout)
+            status_code = response.status_code
+        except requests.RequestException as e:
+            raise _TransientSendError(f"SendGrid request failed: {str(e)}")
+        finally:
+            SENDGRID_REQUEST_DURATION.labels("sync", sendgrid_outcome(status_code)).observe(
+                time.perf_counter() - started
+            )
+        if status_code == 429 or status_code >= 500:
+            raise _TransientSendError(
+                f"SendGrid returned {status_code}: {response.text[:200]}",
+                _retry_after_header(response.headers.get("Retry-After")),
+            )
+        # SendGrid answered, so it is healthy even if it rejected this message
+        self.breaker.record_success()
+        if status_code >= 400:
+            raise EmailRejectedError(f"SendGrid returned {status_code}: {response.text[:200]}", status_code)
+        return status_code
+
+    def close(self):
+        self._session.close()
+
+_circuit_breaker: Optional[CircuitBreaker] = None
+_circuit_breaker_lock = threading.Lock()
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """
+    Return the process-wide SendGrid circuit breaker shared by both transports
+    """
+    global _circuit_breaker
+    if _circuit_breaker is None:
+        with _circuit_breaker_lock:
+            if _circuit_breaker is None:
+                breaker = CircuitBreaker(
+                    "SendGrid",
+                    failure_threshold=int(os.getenv('SENDGRID_CIRCUIT_FAILURE_THRESHOLD', '5')),
+                    reset_seconds=float(os.getenv('SENDGRID_CIRCUIT_RESET_SECONDS', '30')),
+                    half_open_probes=int(os.getenv('SENDGRID_CIRCUIT_HALF_OPEN_PROBES', '1')),
+                )
+                SENDGRID_CIRCUIT_STATE.set_function(lambda: STATE_VALUES[breaker.state])
+                _circuit_breaker = breaker
+    return _circuit_breaker
+
+def _retry_settings() -> dict:
+    return {
+        "attempts": int(os.getenv('SENDGRID_RETRY_ATTEMPTS', '3')),
+        "retry_base_delay": float(os.getenv('SENDGRID_RETRY_BASE_DELAY', '0.25')),
+        "retry_max_delay": float(os.getenv('SENDGRID_RETRY_MAX_DELAY', '4')),
+        "deadline": float(os.getenv('SENDGRID_DEADLINE', '30')),
+        "breaker": get_circuit_breaker(),
+    }
+
+_transport: Optional[SendGridTransport] = None
+_transport_lock = threading.Lock()
+
+def get_transport() -> SendGridTransport:
+    """
+    Return the process-wide transport, creating it on first use
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = SendGridTransport(
+                    os.getenv('SENDGRID_API_KEY'),
+                    base_url=os.getenv('SENDGRID_API_URL', 'https://api.sendgrid.com'),
+                    pool_size=int(os.getenv('SENDGRID_POOL_SIZE', '10')),
+                    timeout=float(os.getenv('SENDGRID_TIMEOUT', '10')),
+                    **_retry_settings(),
+                )
+    return _transport
+
+def set_transport(transport: Optional[SendGridTransport]):
+    """
+    Replace the process-wide transport (e.g. with one pointing at a stub server)
+    """
+    global _transport
+    with _transport_lock:
+        previous, _transport = _transport, transport
+    if previous is not None and previous is not transport:
+        previous.close()
+
+def close_transport():
+    """
+    Close pooled connections; called on application shutdown
+    """
+    set_transport(None)
+
+class AsyncSendGridTransport(_ResilientTransport):
+    """
+    Non-blocking counterpart of SendGridTransport built on aiohttp.
+
+    ``max_in_flight`` bounds concurrent requests with a semaphore so a
+    burst of sends queues on the event loop instead of opening
+    unbounded connections; retries wait outside it. The session is
+    created on first use because it has to be bound to the running
+    event loop.
+    """
+
+    transport_label = "async"
+
+    def __init__(self, api_key: Optional[str], base_url: str = "https://api.sendgrid.com",
+                 pool_size: int = 10, timeout: float = 10.0, max_in_flight: int = 100,
+                 attempts: int = 3, retry_base_delay: float = 0.25, retry_max_delay: float = 4.0,
+                 deadline: Optional[float] = None, breaker: Optional[CircuitBreaker] = None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight
+        self._init_policy(timeout, attempts, retry_base_delay, retry_max_delay, deadline, breaker)
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+                connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def send(self, payload: dict) -> int:
+        """
+        POST a mail/send payload and return the HTTP status code
+        """
+        deadline_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._check_circuit()
+            try:
+                with tracer.span("sendgrid.request"):
+                    async with self._semaphore:
+                        return await self._post(payload, self._attempt_timeout(deadline_at))
+            except _TransientSendError as e:
+                delay = self._failed(attempt, e, deadline_at)
+                if delay is None:
+                    raise
+                with tracer.span("sendgrid.backoff"):
+                    await asyncio.sleep(delay)
+
+    async def _post(self, payload: dict, timeout: float) -> int:
+        import aiohttp
+
+        started = time.perf_counter()
+        status_code = None
+        try:
+            async with self._get_session().post(
+                f"{self.base_url}/v3/mail/send", json=payload, timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                status_code = response.status
+                if status_code == 429 or status_code >= 500:
+                    body = await response.text()
+                    raise _TransientSendError(
+                        f"SendGrid returned {status_code}: {body[:200]}",
+                        _retry_after_header(response.headers.get("Retry-After")),
+                    )
+                # SendGrid answered, so it is healthy even if it rejected this message
+                self.breaker.record_success()
+                if status_code >= 400:
+                    body = await response.text()
+                    raise EmailRejectedError(f"SendGrid returned {status_code}: {body[:200]}", status_code)
+                await response.read()
+                return status_code
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise _TransientSendError(f"SendGrid request failed: {str(e) or type(e).__name__}")
+        finally:
+            SENDGRID_REQUEST_DURATION.labels("async", sendgrid_outcome(status_code)).observe(
+                time.perf_counter() - started
+            )
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+_async_transport: Optional[AsyncSendGridTransport] = None
+
+def get_async_transport() -> AsyncSendGridTransport:
+    """
+    Return the process-wide async transport, creating it on first use
+    """
+    global _async_transport
+    if _async_transport is None:
+        _async_transport = AsyncSendGridTransport(
+            os.getenv('SENDGRID_API_KEY'),
+            base_url=os.getenv('SENDGRID_API_URL', 'https://api.sendgrid.com'),
+            pool_size=int(os.getenv('SENDGRID_POOL_SIZE', '10')),
+            timeout=float(os.getenv('SENDGRID_TIMEOUT', '10')),
+            max_in_flight=int(os.getenv('SENDGRID_MAX_IN_FLIGHT', '100')),
+            **_retry_settings(),
+        )
+    return _async_transport
+
+async def set_async_transport(transport: Optional[AsyncSendGridTransport]):
+    """
+    Replace the process-wide async transport
+    """
+    global _async_transport
+    previous, _async_transport = _async_transport, transport
+    if previous is not None and previous is not transport:
+        await previous.aclose()
+
+async def aclose_async_transport():
+    """
+    Close the async connection pool; called on application shutdown
+    """
+    await set_async_transport(None)
+
+def preload_email_stack():
+    """
+    Import the SendGrid helpers and HTTP clients ahead of the first send
+
+    They are imported lazily so they stay out of application start-up;
+    the warm-up phase calls this in the background instead.
+    """
+    for module in ("aiohttp", "requests", "sendgrid.helpers.mail"):
+        importlib.import_module(module)
+
+def build_message(to: str, subject: str, content: str, content_type: str = "html") -> dict:
+    """
+    Build a SendGrid v3 mail/send payload
+    """
+    from sendgrid.helpers.mail import Mail
+
+    sender_email = os.getenv('SENDER_EMAIL', 'noreply@transformbuddy.ai')
+
+    message = Mail(
+        from_email=sender_email,
+        to_emails=to,
+        subject=subject,
+        html_content=content if content_type == "html" else None,
+        plain_text_content=content if content_type == "plain" else None
+    )
+    return message.get()
+
+def build_personalized_message(recipients: List[Tuple[str, dict]], subject: str, html_content: str) -> dict:
+    """
+    Build one mail/send payload addressed to many recipients
+
+    Args:
+        recipients: (email, substitutions) pairs, one personalization each
+        subject: Email subject line shared by all recipients
+        html_content: HTML body containing the substitution tags
+    """
+    sender_email = os.getenv('SENDER_EMAIL', 'noreply@transformbuddy.ai')
+    return {
+        "personalizations": [
+            {"to": [{"email": email}], "substitutions": substitutions}
+            for email, substitutions in recipients
+        ],
+        "from": {"email": sender_email},
+        "subject": subject,
+        "content": [{"type": "text/html", "value": html_content}],
+    }
+
+@tracer.traced("email.send")
 def send_email(to: str, subject: str, content: str, content_type: str = "html"):
     """
     Send email via SendGrid
@@ -20,127 +433,136 @@ def send_email(to: str, subject: str, content: str, content_type: str = "html"):
         content_type: "html" or "plain"
     """
     try:
-        sender_email = os.getenv('SENDER_EMAIL', 'noreply@transformbuddy.ai')
-        
-        message = Mail(
-            from_email=sender_email,
-            to_emails=to,
-            subject=subject,
-            html_content=content if content_type == "html" else None,
-            plain_text_content=content if content_type == "plain" else None
-        )
+        status_code = get_transport().send(build_message(to, subject, content, content_type))
+        logger.info(f"Email sent successfully to {to}. Status: {status_code}")
+        return status_code == 202
 
-        sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        response = sg.send(message)
-        logger.info(f"Email sent successfully to {to}. Status: {response.status_code}")
-        return response.status_code == 202
-        
+    except EmailCircuitOpenError:
+        raise
     except Exception as e:
         logger.error(f"Failed to send email to {to}: {str(e)}")
+        EMAIL_DELIVERY_ERRORS.labels("send_email").inc()
         raise EmailDeliveryError(f"Failed to send email: {str(e)}")
 
-def send_webinar_registration_notification(admin_email: str, registration_data: dict):
+def render_webinar_registration_notification(registration_data: dict):
     """
-    Send webinar registration notification to admin
+    Build subject and HTML body of the admin registration notification
     """
     subject = f"New Webinar Registration - {registration_data.get('fullName', 'Unknown')}"
+    html_content = templates.render("webinar_registration_notification", registration_data)
+    return subject, html_content
 
-    html_content = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; color: #333; max-width: 600px; margin: 0 auto;">
-            <div style="background: linear-gradient(135deg, #1a1a1b 0%, #2a2a2b 100%); padding: 30px; text-align: center; border-radius: 10px 10px 0 0;">
-                <h1 style="color: #DAFF01; margin: 0; font-size: 28px;">🎉 New Webinar Registration!</h1>
-            </div>
-            
-            <div style="background: white; padding: 30px; border-radius: 0 0 10px 10px; box-shadow: 0 4px 15px rgba(0,0,0,0.1);">
-                <h2 style="color: #1a1a1b; border-bottom: 2px solid #DAFF01; padding-bottom: 10px;">Registration Details</h2>
-                
-                <div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <p style="margin: 8px 0;"><strong>👤 Name:</strong> {registration_data.get('fullName', 'N/A')}</p>
-                    <p style="margin: 8px 0;"><strong>📧 Email:</strong> {registration_data.get('email', 'N/A')}</p>
-                    <p style="margin: 8px 0;"><strong>📱 WhatsApp:</strong> {registration_data.get('whatsapp', 'N/A')}</p>
-                    <p style="margin: 8px 0;"><strong>🔍 Source:</strong> {registration_data.get('referralSource', 'Not specified')}</p>
-                    <p style="margin: 8px 0;"><strong>📅 Registration Time:</strong> {registration_data.get('timestamp', 'N/A')}</p>
-                </div>
-                
-                <div style="background: #DAFF01; color: #1a1a1b; padding: 15px; border-radius: 8px; text-align: center; margin-top: 20px;">
-                    <strong>🚀 Another step closer to our webinar goal!</strong>
-                </div>
-                
-                <p style="color: #666; font-size: 14px; margin-top: 30px; text-align: center;">
-                    <em>This notification was sent from TransformBuddy.AI webinar registration system.</em>
-                </p>
-            </div>
-        </body>
-    </html>
+def render_webinar_registration_digest(registrations: List[dict]):
     """
+    Build subject and HTML body of the admin digest, one table row per registration
+    """
+    row = templates.get("webinar_registration_digest_row").render
+    timestamps = [data["timestamp"] for data in registrations if data.get("timestamp")]
+    subject = f"Webinar Registrations Digest - {len(registrations)} new"
+    html_content = templates.render("webinar_registration_digest", {
+        "count": len(registrations),
+        "first": min(timestamps) if timestamps else None,
+        "last": max(timestamps) if timestamps else None,
+        "rows": Markup("".join(row(data) for data in registrations)),
+    })
+    return subject, html_content
+
+def render_webinar_confirmation_email(user_name: str):
+    """
+    Build subject and HTML body of the user confirmation email
+    """
+    subject = "🎉 Welcome to TransformBuddy.AI Free Webinar!"
+    html_content = templates.render("webinar_confirmation", {"user_name": user_name})
+    return subject, html_content
 
+def send_webinar_registration_notification(admin_email: str, registration_data: dict):
+    """
+    Send webinar registration notification to admin
+    """
+    subject, html_content = render_webinar_registration_notification(registration_data)
+    return send_email(admin_email, subject, html_content, "html")
+
+def send_webinar_registration_digest(admin_email: str, registrations: List[dict]):
+    """
+    Send one admin email listing many webinar registrations
+    """
+    subject, html_content = render_webinar_registration_digest(registrations)
     return send_email(admin_email, subject, html_content, "html")
 
 def send_webinar_confirmation_email(user_email: str, user_name: str):
     """
     Send confirmation email to user who registered for webinar
     """
-    subject = "🎉 Welcome to TransformBuddy.AI Free Webinar!"
+    subject, html_content = render_webinar_confirmation_email(user_name)
+    return send_email(user_email, subject, html_content, "html")
+
+@tracer.traced("email.send")
+async def async_send_email(to: str, subject: str, content: str, content_type: str = "html"):
+    """
+    Send email via SendGrid on the event loop
+
+    Same contract as send_email, but uses the shared non-blocking
+    transport so no thread is held while the request is in flight.
+    """
+    try:
+        status_code = await get_async_transport().send(build_message(to, subject, content, content_type))
+        logger.info(f"Email sent successfully to {to}. Status: {status_code}")
+        return status_code == 202
+
+    except EmailCircuitOpenError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to send email to {to}: {str(e)}")
+        EMAIL_DELIVERY_ERRORS.labels("async_send_email").inc()
+        raise EmailDeliveryError(f"Failed to send email: {str(e)}")
+
+async def async_send_webinar_registration_notification(admin_email: str, registration_data: dict):
+    """
+    Send webinar registration notification to admin without blocking
+    """
+    subject, html_content = render_webinar_registration_notification(registration_data)
+    return await async_send_email(admin_email, subject, html_content, "html")
+
+async def async_send_webinar_registration_digest(admin_email: str, registrations: List[dict]):
+    """
+    Send one admin email listing many webinar registrations without blocking
+    """
+    subject, html_content = render_webinar_registration_digest(registrations)
+    return await async_send_email(admin_email, subject, html_content, "html")
+
+async def async_send_webinar_confirmation_email(user_email: str, user_name: str):
+    """
+    Send confirmation email to user who registered for webinar without blocking
+    """
+    subject, html_content = render_webinar_confirmation_email(user_name)
+    return await async_send_email(user_email, subject, html_content, "html")
 
-    html_content = f"""
-    <html>
-        <body style="font-family: Arial, sans-serif; color: #333; max-width: 600px; margin: 0 auto;">
-            <div style="background: linear-gradient(135deg, #1a1a1b 0%, #2a2a2b 100%); padding: 40px 30px; text-align: center; border-radius: 15px 15px 0 0;">
-                <h1 style="color: #DAFF01; margin: 0 0 10px 0; font-size: 32px;">🚀 You're In!</h1>
-                <p style="color: #fff; font-size: 18px; margin: 0;">Welcome to the AI Transformation Revolution</p>
-            </div>
-            
-            <div style="background: white; padding: 40px 30px; border-radius: 0 0 15px 15px; box-shadow: 0 8px 25px rgba(0,0,0,0.1);">
-                <p style="font-size: 18px; color: #1a1a1b; margin-bottom: 20px;">Hi {user_name}! 👋</p>
-                
-                <p style="font-size: 16px; line-height: 1.6; margin-bottom: 25px;">
-                    <strong>Congratulations!</strong> You've successfully registered for our exclusive <strong>FREE webinar</strong> on transforming your body and mind with AI.
-                </p>
-                
-                <div style="background: #f8f9fa; padding: 25px; border-radius: 10px; margin: 25px 0; border-left: 4px solid #DAFF01;">
-                    <h3 style="color: #1a1a1b; margin-top: 0;">📅 What's Next?</h3>
-                    <ul style="color: #333; line-height: 1.8;">
-                        <li>✅ <strong>Calendar invite</strong> will be sent separately</li>
-                        <li>✅ <strong>Webinar link</strong> will arrive 24 hours before the event</li>
-                        <li>✅ <strong>WhatsApp reminders</strong> to ensure you don't miss it</li>
-                        <li>✅ <strong>Exclusive resources</strong> shared during the session</li>
-                    </ul>
-                </div>
-                
-                <div style="background: linear-gradient(135deg, #DAFF01 0%, #A6BE15 100%); padding: 20px; border-radius: 10px; text-align: center; margin: 30px 0;">
-                    <p style="color: #1a1a1b; font-weight: bold; font-size: 16px; margin: 0;">
-                        🎯 Join our WhatsApp community for exclusive updates and tips!
-                    </p>
-                </div>
-                
-                <div style="text-align: center; margin: 30px 0;">
-                    <h3 style="color: #1a1a1b; margin-bottom: 15px;">What You'll Discover:</h3>
-                    <div style="text-align: left; max-width: 400px; margin: 0 auto;">
-                        <p style="margin: 10px 0;"><strong>🧠 AI Personalization:</strong> How AI adapts to your unique lifestyle</p>
-                        <p style="margin: 10px 0;"><strong>📸 Smart Tracking:</strong> Photo-based calorie and nutrition analysis</p>
-                        <p style="margin: 10px 0;"><strong>🏋️ Custom Workouts:</strong> AI-powered fitness plans for Indians</p>
-                        <p style="margin: 10px 0;"><strong>💡 Real Success Stories:</strong> How others transformed with AI</p>
-                    </div>
-                </div>
-                
-                <div style="background: #ffe6e6; border: 1px solid #ff9999; padding: 20px; border-radius: 8px; text-align: center; margin: 25px 0;">
-                    <p style="color: #cc0000; margin: 0; font-weight: bold;">
-                        ⚠️ Limited to 100 participants - You've secured your spot!
-                    </p>
-                </div>
-                
-                <p style="color: #666; font-size: 14px; margin-top: 40px; text-align: center; line-height: 1.5;">
-                    Questions? Reply to this email or reach out to us at <strong>support@transformbuddy.ai</strong><br>
-                    <em>We're excited to see you transform your health journey with AI!</em>
-                </p>
-            </div>
-            
-            <div style="text-align: center; padding: 20px; color: #999; font-size: 12px;">
-                <p>© 2025 TransformBuddy.AI • Made with ❤️ in India</p>
-            </div>
-        </body>
-    </html>
-    """
-
-    return send_email(user_email, subject, html_content, "html")
\ No newline at end of file
+@tracer.traced("email.send")
+async def async_send_webinar_confirmation_batch(recipients: List[Tuple[str, str]]):
+    """
+    Send the confirmation email to many users in a single API request
+
+    Args:
+        recipients: (user_email, user_name) pairs, at most 1000 per call
+    """
+    subject, html_content = render_webinar_confirmation_email(CONFIRMATION_NAME_TAG)
+    payload = build_personalized_message(
+        [(email, {CONFIRMATION_NAME_TAG: html.escape(name)}) for email, name in recipients],
+        subject,
+        html_content,
+    )
+    try:
+        status_code = await get_async_transport().send(payload)
+        logger.info(f"Confirmation batch sent to {len(recipients)} recipients. Status: {status_code}")
+        return status_code == 202
+
+    except EmailCircuitOpenError:
+        raise
+    except EmailRejectedError as e:
+        logger.error(f"Confirmation batch to {len(recipients)} recipients was rejected: {str(e)}")
+        EMAIL_DELIVERY_ERRORS.labels("async_send_webinar_confirmation_batch").inc()
+        raise EmailRejectedError(f"Failed to send email: {str(e)}", e.status_code)
+    except Exception as e:
+        logger.error(f"Failed to send confirmation batch to {len(recipients)} recipients: {str(e)}")
+        EMAIL_DELIVERY_ERRORS.labels("async_send_webinar_confirmation_batch").inc()
+        raise EmailDeliveryError(f"Failed to send email: {str(e)}")
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# A stored entry: (request fingerprint, response)
+Entry = Tuple[str, dict]
+
+
+class IdempotencyKeyReused(Exception):
+    """
+    The key was already used for a request with a different body
+    """
+
+
+def request_fingerprint(payload: dict) -> str:
+    """
+    SHA-256 of the canonical JSON form of a request body
+    """
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class MemoryIdempotencyStore:
+    """
+    Bounded in-process map of idempotency key -> (fingerprint, stored response)
+
+    Entries expire after ``ttl_seconds``; beyond ``max_keys`` the oldest
+    entry is evicted.
+    """
+
+    def __init__(self, ttl_seconds: float = 86400, max_keys: int = 100_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, Tuple[float, Entry]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stored = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        return stored
+
+    def put(self, key: str, fingerprint: str, response: dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, (fingerprint, response))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MongoIdempotencyStore:
+    """
+    Idempotency records shared by all workers, expired by a TTL index
+    """
+
+    def __init__(self, collection, ttl_seconds: float = 86400):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def get(self, key: str) -> Optional[Entry]:
+        # Records without a fingerprint cannot be matched to a request and are ignored
+        doc = await self.collection.find_one(
+            {"_id": key, "fingerprint": {"$type": "string"}, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        return (doc["fingerprint"], doc["response"]) if doc else None
+
+    async def put(self, key: str, fingerprint: str, response: dict):
+        await self.collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "fingerprint": fingerprint,
+                "response": response,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds),
+            }},
+            upsert=True
+        )
+
+
+class IdempotencyCache:
+    """
+    Replays the stored response for a repeated ``Idempotency-Key``.
+
+    Lookups hit the in-memory store first, then the optional shared
+    store. Concurrent requests with the same key wait for the first one
+    instead of running the operation again. Only successful responses
+    are stored, so a failed attempt can be retried with the same key.
+
+    Each response is stored with the ``fingerprint`` of the request that
+    produced it; the same key with a different fingerprint raises
+    IdempotencyKeyReused instead of replaying another request's response.
+    """
+
+    def __init__(self, memory: MemoryIdempotencyStore, shared: Optional[MongoIdempotencyStore] = None):
+        self.memory = memory
+        self.shared = shared
+        self._in_flight = {}
+        self.replayed = 0
+        self.conflicts = 0
+
+    async def run(self, key: str, fingerprint: str,
+                  operation: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """
+        Returns (response, replayed)
+        """
+        stored = self.memory.get(key)
+        if stored is not None:
+            return self._replay(key, fingerprint, stored)
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            pending_fingerprint, pending_future = pending
+            self._check(key, fingerprint, pending_fingerprint)
+            response = await asyncio.shield(pending_future)
+            self.replayed += 1
+            return response, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            if self.shared is not None:
+                stored = await self._shared_get(key)
+                if stored is not None:
+                    self.memory.put(key, *stored)
+                    future.set_result(stored[1])
+                    return self._replay(key, fingerprint, stored)
+
+            response = await operation()
+            self.memory.put(key, fingerprint, response)
+            if self.shared is not None:
+                await self._shared_put(key, fingerprint, response)
+            future.set_result(response)
+            return response, False
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # Mark retrieved; waiters (if any) still receive it
+                future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self.memory),
+            "in_flight": len(self._in_flight),
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+            "shared_store": self.shared is not None,
+        }
+
+    def _replay(self, key: str, fingerprint: str, stored: Entry) -> Tuple[dict, bool]:
+        stored_fingerprint, response = stored
+        self._check(key, fingerprint, stored_fingerprint)
+        self.replayed += 1
+        return response, True
+
+    def _check(self, key: str, fingerprint: str, stored_fingerprint: str):
+        if stored_fingerprint != fingerprint:
+            self.conflicts += 1
+            raise IdempotencyKeyReused(f"Idempotency-Key {key} was already used with a different request body")
+
+    async def _shared_get(self, key: str) -> Optional[Entry]:
+        try:
+            return await self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Idempotency store lookup failed for {key}: {str(e)}")
+            return None
+
+    async def _shared_put(self, key: str, fingerprint: str, response: dict):
+        try:
+            await self.shared.put(key, fingerprint, response)
+        except Exception as e:
+            logger.warning(f"Idempotency store write failed for {key}: {str(e)}")
@@ -0,0 +1,48 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+EMAIL_UNIQUE_KEY = {"email": ASCENDING}
+
+
+async def has_unique_email_index(db) -> bool:
+    """
+    Whether webinar_registrations has a unique index on email alone
+    """
+    indexes = await db.webinar_registrations.index_information()
+    return any(
+        info.get("unique") and dict(info["key"]) == EMAIL_UNIQUE_KEY
+        for info in indexes.values()
+    )
+
+
+async def ensure_indexes(db) -> bool:
+    """
+    Create the indexes the API relies on if they are missing
+
+    create_index is a no-op for an index that already exists, so this is
+    safe to run on every startup. Returns whether the unique email index
+    is in place.
+    """
+    registrations = db.webinar_registrations
+    email_unique = True
+
+    # Serves the newest-first admin listing and its keyset pagination
+    await registrations.create_index([("timestamp", DESCENDING), ("id", DESCENDING)], name="timestamp_desc_id_desc")
+    await registrations.create_index([("referralSource", ASCENDING)], name="referralSource")
+    try:
+        await registrations.create_index([("email", ASCENDING)], name="email_unique", unique=True)
+    except Exception as e:
+        # Existing duplicate registrations have to be cleaned up first
+        logger.error(f"Could not create unique email index on webinar_registrations: {str(e)}")
+        email_unique = False
+    await db.webinar_waitlist.create_index(
+        [("webinar_id", ASCENDING), ("email", ASCENDING)], name="webinar_email_unique", unique=True
+    )
+    await db.webinar_waitlist.create_index(
+        [("webinar_id", ASCENDING), ("waitlisted_at", ASCENDING)], name="webinar_waitlisted_at"
+    )
+    logger.info("Database indexes are in place")
+    return email_unique
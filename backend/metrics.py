@@ -0,0 +1,355 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Cells:
+    """
+    Per-thread value cells.
+
+    Each thread only ever writes the cell list it owns, so updates need
+    no lock; readers sum across threads at scrape time. The event loop
+    and every driver/executor thread get a cell of their own.
+    """
+
+    __slots__ = ("size", "_by_thread")
+
+    def __init__(self, size: int):
+        self.size = size
+        self._by_thread: Dict[int, List[float]] = {}
+
+    def mine(self) -> List[float]:
+        cells = self._by_thread.get(threading.get_ident())
+        if cells is None:
+            cells = self._by_thread.setdefault(threading.get_ident(), [0.0] * self.size)
+        return cells
+
+    def totals(self) -> List[float]:
+        totals = [0.0] * self.size
+        for cells in list(self._by_thread.values()):
+            for i, value in enumerate(cells):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    kind = ""
+    width = 1
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def collect(self) -> Dict[Tuple[str, ...], List[float]]:
+        """
+        This process's totals per label set
+        """
+        samples = {}
+        for values, child in list(self._children.items()):
+            totals = self._totals(child)
+            if totals is not None:
+                samples[values] = totals
+        return samples
+
+    def render(self, samples: Optional[Dict[Tuple[str, ...], List[float]]] = None) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        samples = self.collect() if samples is None else samples
+        for values, totals in sorted(samples.items()):
+            lines.extend(self._render_sample(values, totals))
+        return lines
+
+    def _totals(self, child) -> Optional[List[float]]:
+        return child._cells.totals()
+
+    def _render_sample(self, values, totals) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float = 1.0):
+        self._cells.mine()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.totals()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def _render_sample(self, values, totals):
+        return [f"{self.name}{self._label_text(values)} {_number(totals[0])}"]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "_cells")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # One cell per bucket, then +Inf, then the sum
+        self._cells = _Cells(len(buckets) + 2)
+
+    def observe(self, value: float):
+        cells = self._cells.mine()
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                cells[i] += 1
+                break
+        else:
+            cells[len(self.buckets)] += 1
+        cells[-1] += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.width = len(self.buckets) + 2
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_sample(self, values, totals):
+        lines = []
+        cumulative = 0.0
+        bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, totals):
+            cumulative += count
+            le = 'le="' + bound + '"'
+            lines.append(f"{self.name}_bucket{self._label_text(values, le)} {_number(cumulative)}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {_number(totals[-1])}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {_number(cumulative)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Gauge whose value is read from a callback at scrape time
+    """
+
+    kind = "gauge"
+
+    def set_function(self, function: Callable[[], float], *values: str):
+        self._children[tuple(str(value) for value in values)] = function
+
+    def _totals(self, child):
+        try:
+            return [float(child())]
+        except Exception:
+            return None
+
+    def _render_sample(self, values, totals):
+        return [f"{self.name}{self._label_text(values)} {_number(totals[0])}"]
+
+
+class Registry:
+    """
+    The metrics of this process, or of every worker once ``share`` is called
+
+    Shared, each worker copies its totals into its own row of the
+    ``SharedCounters`` segment (on scrape and every few seconds from
+    ``publish_periodically``) and ``render`` sums the rows, so any worker
+    can answer a scrape for the whole server. Gauges are summed as well.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self.shared = None
+        self._unshared = set()
+
+    def register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def share(self, shared):
+        self.shared = shared
+
+    def render(self) -> str:
+        lines = []
+        if self.shared is None:
+            for metric in list(self._metrics.values()):
+                lines.extend(metric.render())
+        else:
+            self.publish()
+            samples = self._shared_samples()
+            for metric in list(self._metrics.values()):
+                lines.extend(metric.render(samples.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+    def publish(self, gauges: bool = True):
+        """
+        Copy this process's totals into its shared row (gauges=False zeroes the gauges)
+        """
+        for metric in list(self._metrics.values()):
+            for values, totals in metric.collect().items():
+                key = _shared_key(metric.name, values)
+                if key in self._unshared:
+                    continue
+                try:
+                    offset = self.shared.slot(key, metric.width)
+                except Exception as e:
+                    logger.warning(f"Metric {metric.name} is not shared across workers: {str(e)}")
+                    self._unshared.add(key)
+                    continue
+                if not gauges and metric.kind == "gauge":
+                    totals = [0.0]
+                self.shared.store(offset, totals)
+
+    async def publish_periodically(self, interval: float = 5.0):
+        while True:
+            await asyncio.sleep(interval)
+            self.publish()
+
+    def _shared_samples(self) -> Dict[str, Dict[Tuple[str, ...], List[float]]]:
+        samples: Dict[str, Dict[Tuple[str, ...], List[float]]] = {}
+        for key, (offset, width) in self.shared.keys(SHARED_PREFIX).items():
+            name, values = json.loads(key[len(SHARED_PREFIX):])
+            samples.setdefault(name, {})[tuple(values)] = self.shared.total(offset, width)
+        return samples
+
+
+SHARED_PREFIX = "metric:"
+
+
+def _shared_key(name: str, values: Tuple[str, ...]) -> str:
+    return SHARED_PREFIX + json.dumps([name, values], separators=(",", ":"))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+))
+MONGO_COMMAND_DURATION = REGISTRY.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by command name", ("command", "outcome")
+))
+SENDGRID_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "sendgrid_request_duration_seconds", "SendGrid mail/send latency by outcome", ("transport", "outcome")
+))
+SENDGRID_RETRIES = REGISTRY.register(Counter(
+    "sendgrid_retries_total", "SendGrid requests retried after a transient failure", ("transport",)
+))
+SENDGRID_CIRCUIT_REJECTIONS = REGISTRY.register(Counter(
+    "sendgrid_circuit_rejections_total", "Sends refused without a request while the SendGrid circuit was open",
+    ("transport",)
+))
+SENDGRID_CIRCUIT_STATE = REGISTRY.register(Gauge(
+    "sendgrid_circuit_state", "SendGrid circuit breaker state: 0 closed, 1 half-open, 2 open"
+))
+EMAIL_DELIVERY_ERRORS = REGISTRY.register(Counter(
+    "email_delivery_errors_total", "EmailDeliveryError raised by the email senders", ("sender",)
+))
+BACKGROUND_TASKS = REGISTRY.register(Gauge(
+    "background_tasks_in_flight", "Background work currently queued or running", ("kind",)
+))
+
+
+# Any other method token a client sends is labelled "other"
+HTTP_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners cannot blow up cardinality
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "other"
+            HTTP_REQUEST_DURATION.labels(method, route_label, status["code"]).observe(
+                time.perf_counter() - started
+            )
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener feeding MONGO_COMMAND_DURATION
+
+    insert_one/update_one/count_documents/aggregate show up under their
+    wire command names (insert, update, aggregate, findAndModify, ...).
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "success").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_COMMAND_DURATION.labels(event.command_name, "failure").observe(event.duration_micros / 1e6)
+
+
+def sendgrid_outcome(status_code: Optional[int]) -> str:
+    return f"{status_code // 100}xx" if status_code else "error"
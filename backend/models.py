@@ -0,0 +1,48 @@
+"""
+Request and response models
+
+Kept apart from ``server`` so bulk import validation processes can
+unpickle them without importing (and starting) the whole app.
+"""
+
+import uuid
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, EmailStr, Field
+
+
+class StatusCheck(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class StatusCheckCreate(BaseModel):
+    client_name: str
+
+
+class WebinarRegistration(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    fullName: str
+    email: EmailStr
+    whatsapp: str
+    referralSource: Optional[str] = None
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+
+class WebinarRegistrationCreate(BaseModel):
+    fullName: str
+    email: EmailStr
+    whatsapp: str
+    referralSource: Optional[str] = None
+
+
+class WebinarRegistrationPage(BaseModel):
+    items: List[WebinarRegistration]
+    next_cursor: Optional[str] = None
+
+
+class EmailResponse(BaseModel):
+    status: str
+    message: str
@@ -0,0 +1,464 @@
+import asyncio
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import OperationFailure
+
+from circuit_breaker import CLOSED, CircuitBreaker, CircuitOpenError, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+class EmailOutbox:
+    """
+    Durable email queue stored in MongoDB.
+
+    Messages are written next to the data that triggers them and are
+    delivered by a bounded pool of asyncio workers. A worker claims a
+    message by leasing it, runs the handler registered for its ``kind``
+    (awaited on the loop for coroutine functions, on a private thread
+    pool otherwise) and acknowledges it. Failed sends are retried with
+    jittered exponential backoff; leases that expire (e.g. the process
+    died mid-send) make the message claimable again, so nothing is lost
+    on restart.
+
+    With a ``circuit`` breaker, no messages are claimed while it is open
+    and only one at a time while it is half-open. Sends refused by an
+    open circuit (CircuitOpenError) are deferred until it may close,
+    without using up an attempt.
+
+    Kinds with a ``batch_handlers`` entry are claimed ``batch_size`` at a
+    time: the handler gets every claimed payload in one call, on one
+    delivery slot, and returns a result or an exception per payload.
+
+    Delivered messages are removed by a TTL index ``sent_retention_days``
+    after they were sent, permanently failed ones ``failed_retention_days``
+    after they failed.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handlers: Dict[str, Callable],
+        concurrency: int = 8,
+        max_attempts: int = 5,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 60,
+        backoff_seconds: float = 5.0,
+        circuit: Optional[CircuitBreaker] = None,
+        sent_retention_days: float = 7,
+        failed_retention_days: float = 30,
+        batch_handlers: Optional[Dict[str, Callable[[List[dict]], Awaitable[list]]]] = None,
+        batch_size: int = 500,
+    ):
+        self.collection = collection
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+        self.circuit = circuit
+        self.sent_retention_days = sent_retention_days
+        self.failed_retention_days = failed_retention_days
+        self.batch_handlers = batch_handlers or {}
+        self.batch_size = max(1, batch_size)
+
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._tasks: set = set()
+        # Blocking handlers get their own threads so they never compete
+        # with request handling for Starlette's shared threadpool.
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def build_message(kind: str, payload: dict, not_before: Optional[datetime] = None) -> dict:
+        now = datetime.utcnow()
+        return {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": not_before or now,
+            "lease_expires_at": None,
+            "last_error": None,
+            "created_at": now,
+            "sent_at": None,
+            "failed_at": None,
+            "lease": None,
+        }
+
+    async def enqueue(self, kind: str, payload: dict) -> str:
+        return (await self.enqueue_many([(kind, payload)]))[0]
+
+    async def enqueue_many(self, messages: List[tuple], not_before: Optional[datetime] = None,
+                           interval: float = 0.0) -> List[str]:
+        """
+        Persist messages as (kind, payload) tuples and wake the workers
+
+        With ``not_before`` the messages are held until then, ``interval``
+        seconds apart, to pace large batches.
+        """
+        docs = [
+            self.build_message(
+                kind, payload, not_before + timedelta(seconds=i * interval) if not_before else None
+            )
+            for i, (kind, payload) in enumerate(messages)
+        ]
+        if docs:
+            await self.collection.insert_many(docs, ordered=False)
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return [doc["id"] for doc in docs]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        await self.collection.create_index("id", unique=True)
+        # TTL indexes only expire documents whose field holds a date, so pending messages stay
+        await self._ensure_ttl_index("sent_at", "sent_at_ttl", self.sent_retention_days)
+        await self._ensure_ttl_index(
+            "failed_at", "failed_at_ttl", self.failed_retention_days, partialFilterExpression={"status": FAILED}
+        )
+
+    async def _ensure_ttl_index(self, field: str, name: str, days: float, **options):
+        seconds = int(days * 86400)
+        try:
+            await self.collection.create_index(field, name=name, expireAfterSeconds=seconds, **options)
+        except OperationFailure as e:
+            if e.code != 85:  # IndexOptionsConflict: the retention setting changed
+                raise
+            await self.collection.database.command(
+                "collMod", self.collection.name, index={"name": name, "expireAfterSeconds": seconds}
+            )
+
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="email-outbox"
+        )
+        try:
+            await self.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create email outbox indexes: {str(e)}")
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        logger.info(f"Email outbox started with {self.concurrency} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        if self._dispatcher is None:
+            return
+        # wait_for() can swallow the cancellation when a wakeup lands at the
+        # same time (enqueue right before stop), so the loop checks a flag too
+        self._stopping = True
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+        if self._tasks:
+            # Unfinished sends keep their lease and are retried after restart
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        logger.info("Email outbox stopped")
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def stats(self) -> dict:
+        # Index-only counts on the status prefix of the dispatch indexes, no collection scan
+        pending, sending, sent, failed = await asyncio.gather(
+            *(self.collection.count_documents({"status": status}) for status in (PENDING, SENDING, SENT, FAILED))
+        )
+        return {
+            "queue_depth": pending + sending,
+            "pending": pending,
+            "sending": sending,
+            "sent": sent,
+            "failed": failed,
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "max_attempts": self.max_attempts,
+            "sent_retention_days": self.sent_retention_days,
+            "failed_retention_days": self.failed_retention_days,
+            "running": self._dispatcher is not None,
+        }
+
+    @staticmethod
+    def _claimable(now: datetime) -> dict:
+        return {
+            "$or": [
+                {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                {"status": SENDING, "lease_expires_at": {"$lte": now}},
+            ]
+        }
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            self._claimable(now),
+            {
+                "$set": {
+                    "status": SENDING,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _claim_many(self, kind: str, limit: int) -> List[dict]:
+        """
+        Claim up to ``limit`` more due messages of ``kind``
+        """
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        claimable = {"kind": kind, **self._claimable(now)}
+        candidates = await self.collection.find(claimable, {"_id": 0, "id": 1}) \
+            .sort("next_attempt_at", ASCENDING).limit(limit).to_list(limit)
+        if not candidates:
+            return []
+        ids = [doc["id"] for doc in candidates]
+        # The filter is re-checked per document, so messages another worker took meanwhile are skipped
+        lease = str(uuid.uuid4())
+        await self.collection.update_many(
+            {"id": {"$in": ids}, **claimable},
+            {
+                "$set": {
+                    "status": SENDING,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "lease": lease,
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        return await self.collection.find({"id": {"$in": ids}, "lease": lease}).to_list(limit)
+
+    async def _dispatch(self):
+        while not self._stopping:
+            if self.circuit is not None and self.circuit.state != CLOSED:
+                paused_for = self.circuit.retry_after()
+                if paused_for > 0 or self._tasks:
+                    # Open: leave messages queued; half-open: one message at a time probes it
+                    await asyncio.sleep(min(max(paused_for, self.poll_interval), self.lease_seconds))
+                    continue
+            await self._slots.acquire()
+            try:
+                message = await self._claim()
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            except Exception as e:
+                self._slots.release()
+                logger.error(f"Email outbox claim failed: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if message is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if message["kind"] in self.batch_handlers:
+                try:
+                    more = await self._claim_many(message["kind"], self.batch_size - 1)
+                except asyncio.CancelledError:
+                    self._slots.release()
+                    raise
+                except Exception as e:
+                    # Deliver what was claimed; the rest waits for the next claim
+                    logger.error(f"Email outbox batch claim failed: {str(e)}")
+                    more = []
+                task = asyncio.create_task(self._process_batch([message] + more))
+            else:
+                task = asyncio.create_task(self._process(message))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, message: dict):
+        try:
+            try:
+                handler = self.handlers[message["kind"]]
+                if asyncio.iscoroutinefunction(handler):
+                    await handler(**message["payload"])
+                else:
+                    loop = asyncio.get_running_loop()
+                    await loop.run_in_executor(self._executor, lambda: handler(**message["payload"]))
+            except Exception as e:
+                await self._fail(message, e)
+            else:
+                await self._ack(message)
+        except Exception as e:
+            # The lease expires and another worker picks the message up again
+            logger.error(f"Email outbox could not update message {message['id']}: {str(e)}")
+        finally:
+            self._slots.release()
+
+    async def _process_batch(self, messages: List[dict]):
+        try:
+            try:
+                results = await self.batch_handlers[messages[0]["kind"]]([message["payload"] for message in messages])
+            except Exception as e:
+                results = [e] * len(messages)
+            sent = []
+            for message, result in zip(messages, results):
+                if isinstance(result, Exception):
+                    await self._fail(message, result)
+                else:
+                    sent.append(message["id"])
+            if sent:
+                await self.collection.update_many(
+                    {"id": {"$in": sent}},
+                    {"$set": {"status": SENT, "sent_at": datetime.utcnow(), "lease_expires_at": None}},
+                )
+        except Exception as e:
+            # The leases expire and the messages are claimed again
+            logger.error(f"Email outbox could not update a batch of {len(messages)} messages: {str(e)}")
+        finally:
+            self._slots.release()
+
+    async def _ack(self, message: dict):
+        await self.collection.update_one(
+            {"id": message["id"]},
+            {"$set": {"status": SENT, "sent_at": datetime.utcnow(), "lease_expires_at": None}},
+        )
+
+    async def _fail(self, message: dict, error: Exception):
+        attempts = message["attempts"]
+        update = {"last_error": str(error), "lease_expires_at": None}
+        if isinstance(error, CircuitOpenError):
+            # Never reached the provider: hold the message, spread out, until the circuit may close
+            delay = error.retry_after + random.uniform(0, self.backoff_seconds)
+            update["status"] = PENDING
+            update["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+            await self.collection.update_one({"id": message["id"]}, {"$set": update, "$inc": {"attempts": -1}})
+            return
+        if attempts >= self.max_attempts:
+            update["status"] = FAILED
+            update["failed_at"] = datetime.utcnow()
+            logger.error(f"Email outbox message {message['id']} ({message['kind']}) failed permanently: {str(error)}")
+        else:
+            delay = backoff_delay(attempts - 1, self.backoff_seconds)
+            update["status"] = PENDING
+            update["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+            logger.warning(f"Email outbox message {message['id']} ({message['kind']}) failed, retrying in {delay:.0f}s: {str(error)}")
+        await self.collection.update_one({"id": message["id"]}, {"$set": update})
+
+
+class LocalEmailQueue:
+    """
+    Non-durable stand-in for EmailOutbox used with the local storage backends.
+
+    Messages go straight to their handler on the event loop, at most
+    ``concurrency`` at a time; kinds with a batch handler are passed to it
+    one payload per call without taking a slot, since the batch handler
+    bounds its own sends. Failed sends are not retried, except that
+    sends refused by an open circuit are tried again once it may close;
+    messages still queued when the process exits are lost.
+    """
+
+    def __init__(self, handlers: Dict[str, Callable], concurrency: int = 8,
+                 batch_handlers: Optional[Dict[str, Callable[[List[dict]], Awaitable[list]]]] = None):
+        self.handlers = handlers
+        self.batch_handlers = batch_handlers or {}
+        self.concurrency = max(1, concurrency)
+        self.sent = 0
+        self.failed = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def enqueue(self, kind: str, payload: dict) -> str:
+        return (await self.enqueue_many([(kind, payload)]))[0]
+
+    async def enqueue_many(self, messages: List[tuple], not_before: Optional[datetime] = None,
+                           interval: float = 0.0) -> List[str]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        messages = [(str(uuid.uuid4()), kind, payload) for kind, payload in messages]
+        if not_before:
+            # One task paces the whole batch instead of one sleeping task per message
+            delay = max(0.0, (not_before - datetime.utcnow()).total_seconds())
+            self._track(self._deliver_paced(messages, delay, interval))
+        else:
+            for message_id, kind, payload in messages:
+                self._track(self._deliver(message_id, kind, payload))
+        return [message_id for message_id, _, _ in messages]
+
+    async def start(self):
+        logger.info(f"Local email queue started with {self.concurrency} workers (not durable)")
+
+    async def stop(self, timeout: float = 10.0):
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+
+    async def stats(self) -> dict:
+        return {
+            "queue_depth": self.in_flight,
+            "pending": self.in_flight,
+            "sending": 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "max_attempts": 1,
+            "sent_retention_days": None,
+            "failed_retention_days": None,
+            "running": True,
+        }
+
+    def _track(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _deliver_paced(self, messages: List[tuple], delay: float, interval: float):
+        await asyncio.sleep(delay)
+        for i, (message_id, kind, payload) in enumerate(messages):
+            if i and interval:
+                await asyncio.sleep(interval)
+            self._track(self._deliver(message_id, kind, payload))
+
+    async def _deliver(self, message_id: str, kind: str, payload: dict):
+        try:
+            if kind in self.batch_handlers:
+                (result,) = await self.batch_handlers[kind]([payload])
+                if isinstance(result, Exception):
+                    raise result
+            else:
+                async with self._slots:
+                    await self.handlers[kind](**payload)
+            self.sent += 1
+        except CircuitOpenError as e:
+            self._track(self._deliver_paced([(message_id, kind, payload)], e.retry_after + random.random(), 0.0))
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Email {message_id} ({kind}) failed: {str(e)}")
@@ -0,0 +1,90 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Optional, Tuple
+
+import orjson
+
+REGISTRATION_FIELDS = ["id", "fullName", "email", "whatsapp", "referralSource", "timestamp"]
+REGISTRATION_PROJECTION = {"_id": 0, **{field: 1 for field in REGISTRATION_FIELDS}}
+# Newest first; id breaks ties between registrations with the same timestamp
+REGISTRATION_SORT = [("timestamp", -1), ("id", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    """
+    Opaque token pointing just past ``doc`` in (timestamp, id) order
+    """
+    raw = json.dumps({"t": doc["timestamp"].isoformat(), "id": doc["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """
+    Turn a cursor token back into the (timestamp, id) it points past
+
+    Raises:
+        ValueError: if the token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        timestamp = datetime.fromisoformat(data["t"])
+        last_id = str(data["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    return timestamp, last_id
+
+
+def serialize_row(doc: dict) -> dict:
+    row = {field: doc.get(field) for field in REGISTRATION_FIELDS}
+    if isinstance(row["timestamp"], datetime):
+        row["timestamp"] = row["timestamp"].isoformat()
+    return row
+
+
+async def stream_json_array(docs: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    # Documents come from REGISTRATION_PROJECTION, so they encode as-is
+    yield b"["
+    separator = b""
+    async for doc in docs:
+        yield separator + orjson.dumps(doc)
+        separator = b","
+    yield b"]"
+
+
+async def stream_ndjson(docs: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    async for doc in docs:
+        yield orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE)
+
+
+async def stream_csv(docs: AsyncIterable[dict], chunk_rows: int = 500) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=REGISTRATION_FIELDS)
+    writer.writeheader()
+    rows = 0
+    async for doc in docs:
+        writer.writerow(serialize_row(doc))
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def page_filter(position: Optional[Tuple[datetime, str]]) -> dict:
+    """
+    MongoDB keyset filter for the rows after ``position`` in REGISTRATION_SORT order
+    """
+    if position is None:
+        return {}
+    timestamp, last_id = position
+    return {
+        "$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "id": {"$lt": last_id}},
+        ]
+    }
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Take one token; returns 0 on success, otherwise seconds until one is available
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class ClientBuckets:
+    """
+    Per-client token buckets in a bounded LRU map
+
+    Lookup, refresh and eviction are all O(1); once ``max_clients`` is
+    reached the least recently seen client is forgotten (which at worst
+    hands it a fresh, full bucket).
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def take(self, client: str, now: float) -> float:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[client] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket.take(now)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LoopLagMonitor:
+    """
+    Measures event-loop lag by timing a periodic sleep
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, time.monotonic() - expected)
+
+
+class RateLimiter:
+    """
+    Per-client and global token buckets plus optional load shedding.
+
+    A request must get a token from its client's bucket (when the client
+    is known) and from the global bucket. With a lag monitor and ``max_loop_lag`` set, requests
+    are also shed while the event loop is overloaded.
+    """
+
+    def __init__(
+        self,
+        per_client_rate: float = 1.0,
+        per_client_burst: float = 5.0,
+        global_rate: float = 200.0,
+        global_burst: float = 400.0,
+        max_clients: int = 100_000,
+        lag_monitor: Optional[LoopLagMonitor] = None,
+        max_loop_lag: Optional[float] = None,
+    ):
+        self.clients = ClientBuckets(per_client_rate, per_client_burst, max_clients)
+        self.global_bucket = TokenBucket(global_rate, global_burst, time.monotonic())
+        self.lag_monitor = lag_monitor
+        self.max_loop_lag = max_loop_lag
+        self.rejected = 0
+        self.shed = 0
+
+    def check(self, client: Optional[str]) -> Tuple[int, float]:
+        """
+        Returns (0, 0) to admit the request, otherwise (status, retry_after)
+
+        With ``client`` None only the global bucket applies.
+        """
+        if self.lag_monitor is not None and self.max_loop_lag and self.lag_monitor.lag > self.max_loop_lag:
+            self.shed += 1
+            return 503, 1.0
+
+        now = time.monotonic()
+        wait = self.clients.take(client, now) if client is not None else 0.0
+        if not wait:
+            wait = self.global_bucket.take(now)
+        if wait:
+            self.rejected += 1
+            return 429, wait
+        return 0, 0.0
+
+    def stats(self) -> dict:
+        return {
+            "tracked_clients": len(self.clients),
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "loop_lag_ms": round(self.lag_monitor.lag * 1000, 3) if self.lag_monitor else None,
+        }
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying a RateLimiter to selected (method, path) pairs
+
+    Rejected requests get 429 (or 503 when shedding load) with a
+    ``Retry-After`` header and never reach the handler.
+
+    Clients are told apart by address only when ``trusted_proxy_hops`` says
+    where that address comes from: 0 is the socket peer (no proxy in
+    front), N takes the Nth ``X-Forwarded-For`` entry from the right, the
+    one appended by the outermost of N trusted proxies. Entries further
+    left are written by the client and ignored. With None only the global
+    bucket applies, since behind an unknown proxy every visitor would
+    share the proxy's address.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, routes: Iterable[Tuple[str, str]],
+                 trusted_proxy_hops: Optional[int] = None):
+        self.app = app
+        self.limiter = limiter
+        self.routes = set(routes)
+        self.trusted_proxy_hops = trusted_proxy_hops
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        status, retry_after = self.limiter.check(self._client_key(scope))
+        if status == 429:
+            await self._reject(send, 429, retry_after, "Too many registration attempts. Please try again shortly.")
+        elif status == 503:
+            await self._reject(send, 503, retry_after, "Server is busy. Please try again shortly.")
+        else:
+            await self.app(scope, receive, send)
+
+    def _client_key(self, scope) -> Optional[str]:
+        if self.trusted_proxy_hops is None:
+            return None
+        if self.trusted_proxy_hops > 0:
+            # Repeated headers are one list, in order
+            forwarded = [
+                address.strip()
+                for name, value in scope.get("headers", [])
+                if name == b"x-forwarded-for"
+                for address in value.decode("latin-1").split(",")
+            ]
+            if len(forwarded) >= self.trusted_proxy_hops:
+                return forwarded[-self.trusted_proxy_hops] or "unknown"
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    @staticmethod
+    async def _reject(send, status: int, retry_after: float, detail: str):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
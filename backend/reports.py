@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import List, Optional
+
+# $dateToString formats for the time breakdown buckets (UTC)
+TIME_BUCKET_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%G-W%V",
+    "month": "%Y-%m",
+}
+
+
+def registration_filter(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    referral_sources: Optional[List[Optional[str]]] = None,
+) -> dict:
+    """
+    MongoDB filter for registrations in [since, until) from the given referral sources
+    """
+    query = {}
+    if since or until:
+        query["timestamp"] = {}
+        if since:
+            query["timestamp"]["$gte"] = since
+        if until:
+            query["timestamp"]["$lt"] = until
+    if referral_sources:
+        query["referralSource"] = {"$in": list(referral_sources)}
+    return query
+
+
+def referral_breakdown_pipeline(query: Optional[dict] = None) -> list:
+    """
+    Registrations per referralSource, largest first
+    """
+    pipeline = [{"$match": query}] if query else []
+    return pipeline + [
+        {"$group": {"_id": "$referralSource", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+    ]
+
+
+def time_breakdown_pipeline(bucket: str, query: Optional[dict] = None) -> list:
+    """
+    Registrations per hour/day/week/month, oldest bucket first
+    """
+    pipeline = [{"$match": query}] if query else []
+    return pipeline + [
+        {"$group": {
+            "_id": {"$dateToString": {"format": TIME_BUCKET_FORMATS[bucket], "date": "$timestamp"}},
+            "count": {"$sum": 1},
+        }},
+        {"$sort": {"_id": 1}},
+    ]
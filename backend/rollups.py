@@ -0,0 +1,249 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+
+# _id of the document in the rollups collection that records the backfill
+BACKFILL_MARKER = "backfill"
+
+BucketKey = Tuple[datetime, Optional[str]]
+
+
+def as_naive_utc(value: datetime) -> datetime:
+    """
+    Timezone-aware datetimes converted to the naive UTC the buckets are stored in
+    """
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def bucket_hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def count_by_bucket(registrations: Iterable[dict]) -> Dict[BucketKey, int]:
+    counts: Dict[BucketKey, int] = defaultdict(int)
+    for registration in registrations:
+        counts[(bucket_hour(registration["timestamp"]), registration.get("referralSource"))] += 1
+    return counts
+
+
+def summarize_buckets(rows: Iterable[Tuple[datetime, Optional[str], int]], granularity: str = "hour") -> dict:
+    """
+    Turn (bucket_hour, referralSource, count) rows into a time series and a channel breakdown
+    """
+    series: Dict[datetime, Dict[Optional[str], int]] = defaultdict(lambda: defaultdict(int))
+    channels: Dict[Optional[str], int] = defaultdict(int)
+    for hour, source, count in rows:
+        bucket = hour.replace(hour=0) if granularity == "day" else hour
+        series[bucket][source] += count
+        channels[source] += count
+    return {
+        "series": [
+            {
+                "bucket": bucket.isoformat(),
+                "total": sum(by_source.values()),
+                "by_source": [
+                    {"_id": source, "count": count}
+                    for source, count in sorted(by_source.items(), key=lambda item: item[1], reverse=True)
+                ],
+            }
+            for bucket, by_source in sorted(series.items())
+        ],
+        "channels": [
+            {"_id": source, "count": count}
+            for source, count in sorted(channels.items(), key=lambda item: item[1], reverse=True)
+        ],
+        "total": sum(channels.values()),
+    }
+
+
+class ReferralRollups:
+    """
+    Hourly registration counts per referral source.
+
+    One document per (bucket_hour, referralSource) is incremented with an
+    atomic upsert for every registration, so analytics read at most one
+    document per hour and channel instead of scanning registrations.
+
+    The buckets are backfilled from the registrations once per database,
+    recorded by a marker document, while registrations keep being
+    recorded. The backfill only sets the buckets of hours that ended at
+    least ``backfill_margin_seconds`` before it started: a registration
+    is recorded moments after its timestamp, so by then every increment
+    for those hours has landed and ``record`` only touches later buckets.
+    Its ``$set`` can then neither overwrite nor double an increment, and
+    running it twice is harmless. A backfill left unfinished for
+    ``backfill_lease_seconds`` (its worker died) is taken over at the
+    next start.
+    """
+
+    def __init__(self, collection, registrations, backfill_lease_seconds: float = 600,
+                 backfill_margin_seconds: float = 300):
+        self.collection = collection
+        self.registrations = registrations
+        self.backfill_lease_seconds = backfill_lease_seconds
+        self.backfill_margin_seconds = backfill_margin_seconds
+
+    async def initialize(self):
+        await self.collection.create_index(
+            [("bucket_hour", ASCENDING), ("referralSource", ASCENDING)], name="bucket_hour_source", unique=True
+        )
+        if not await self._claim_backfill():
+            return
+        try:
+            cutoff = await self.rebuild()
+        except BaseException:
+            # Let the next start try again
+            await self.collection.delete_one({"_id": BACKFILL_MARKER, "state": "running"})
+            raise
+        await self.collection.update_one(
+            {"_id": BACKFILL_MARKER},
+            {"$set": {"state": "done", "cutoff": cutoff, "finished_at": datetime.utcnow()}},
+        )
+
+    async def _claim_backfill(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one({"_id": BACKFILL_MARKER, "state": "running", "started_at": now})
+            return True
+        except DuplicateKeyError:
+            pass
+        # Done, or running in another worker unless its lease ran out
+        stale = await self.collection.find_one_and_update(
+            {
+                "_id": BACKFILL_MARKER,
+                "state": "running",
+                "started_at": {"$lt": now - timedelta(seconds=self.backfill_lease_seconds)},
+            },
+            {"$set": {"started_at": now}},
+        )
+        return stale is not None
+
+    async def rebuild(self) -> datetime:
+        """
+        Set every bucket that closed over ``backfill_margin_seconds`` ago from the registrations (backfill)
+
+        Returns the cutoff hour; its bucket and later ones are left to ``record``.
+        """
+        cutoff = bucket_hour(datetime.utcnow() - timedelta(seconds=self.backfill_margin_seconds))
+        pipeline = [
+            {"$match": {"timestamp": {"$lt": cutoff}}},
+            {"$group": {
+                "_id": {
+                    "hour": {"$dateToString": {"format": "%Y-%m-%dT%H:00:00", "date": "$timestamp"}},
+                    "referralSource": "$referralSource",
+                },
+                "count": {"$sum": 1},
+            }},
+        ]
+        rows = await self.registrations.aggregate(pipeline).to_list(None)
+        if rows:
+            # $set, not $inc: the result is the same however often the backfill runs
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {
+                        "bucket_hour": datetime.fromisoformat(row["_id"]["hour"]),
+                        "referralSource": row["_id"].get("referralSource"),
+                    },
+                    {"$set": {"count": row["count"]}},
+                    upsert=True
+                )
+                for row in rows
+            ], ordered=False)
+        logger.info(f"Referral rollups backfilled before {cutoff.isoformat()}: {len(rows)} buckets")
+        return cutoff
+
+    async def record(self, registration: dict):
+        await self.collection.update_one(
+            {"bucket_hour": bucket_hour(registration["timestamp"]), "referralSource": registration.get("referralSource")},
+            {"$inc": {"count": 1}},
+            upsert=True
+        )
+
+    async def record_many(self, registrations: List[dict]):
+        counts = count_by_bucket(registrations)
+        if counts:
+            await self.collection.bulk_write([
+                UpdateOne(
+                    {"bucket_hour": hour, "referralSource": source},
+                    {"$inc": {"count": count}},
+                    upsert=True
+                )
+                for (hour, source), count in counts.items()
+            ], ordered=False)
+
+    async def query(self, start: datetime, end: datetime, granularity: str = "hour",
+                    sources: Optional[List[Optional[str]]] = None) -> dict:
+        """
+        Counts for registrations in [start, end), read from the hourly buckets only
+        """
+        query = {"bucket_hour": {"$gte": bucket_hour(as_naive_utc(start)), "$lt": as_naive_utc(end)}}
+        if sources:
+            query["referralSource"] = {"$in": list(sources)}
+        docs = await self.collection.find(query, {"_id": 0}).sort("bucket_hour", ASCENDING).to_list(None)
+        return summarize_buckets(
+            ((doc["bucket_hour"], doc.get("referralSource"), doc["count"]) for doc in docs), granularity
+        )
+
+
+class LocalReferralRollups:
+    """
+    In-process ReferralRollups for the local storage backends
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.counts: Dict[BucketKey, int] = defaultdict(int)
+        # While rebuilding: registrations newer than the cutoff that were recorded meanwhile
+        self._rebuild_cutoff: Optional[datetime] = None
+        self._recorded_during_rebuild: Dict[BucketKey, int] = defaultdict(int)
+
+    async def initialize(self):
+        await self.rebuild()
+
+    async def rebuild(self):
+        """
+        Recount from storage; registrations recorded while it is read are kept, not counted twice
+        """
+        cutoff = datetime.utcnow()
+        self._rebuild_cutoff = cutoff
+        self._recorded_during_rebuild = defaultdict(int)
+        try:
+            counts: Dict[BucketKey, int] = defaultdict(int)
+            async for registration in self.storage.iter_registrations():
+                if registration["timestamp"] < cutoff:
+                    counts[(bucket_hour(registration["timestamp"]), registration.get("referralSource"))] += 1
+            for key, count in self._recorded_during_rebuild.items():
+                counts[key] += count
+            self.counts = counts
+        finally:
+            self._rebuild_cutoff = None
+
+    async def record(self, registration: dict):
+        await self.record_many([registration])
+
+    async def record_many(self, registrations: List[dict]):
+        for key, count in count_by_bucket(registrations).items():
+            self.counts[key] += count
+        if self._rebuild_cutoff is not None:
+            newer = (registration for registration in registrations if registration["timestamp"] >= self._rebuild_cutoff)
+            for key, count in count_by_bucket(newer).items():
+                self._recorded_during_rebuild[key] += count
+
+    async def query(self, start: datetime, end: datetime, granularity: str = "hour",
+                    sources: Optional[List[Optional[str]]] = None) -> dict:
+        start, end = bucket_hour(as_naive_utc(start)), as_naive_utc(end)
+        return summarize_buckets((
+            (hour, source, count)
+            for (hour, source), count in list(self.counts.items())
+            if start <= hour < end and (not sources or source in sources)
+        ), granularity)
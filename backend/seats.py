@@ -0,0 +1,181 @@
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class SeatAllocator:
+    """
+    Race-free seat accounting for a capacity-limited webinar.
+
+    A single counter document per webinar in ``webinar_seats`` holds
+    ``capacity``, ``reserved`` and ``available``. A seat is taken with one
+    conditional ``find_one_and_update`` (``available > 0`` plus ``$inc``),
+    which MongoDB applies atomically, so concurrent registrations can
+    never oversell and no ``count_documents`` is needed per request.
+    Registrations that find no seat go to ``webinar_waitlist``.
+    """
+
+    def __init__(self, db, webinar_id: str = "default", capacity: int = 100):
+        self.counters = db.webinar_seats
+        self.waitlist = db.webinar_waitlist
+        self.registrations = db.webinar_registrations
+        self.webinar_id = webinar_id
+        self.capacity = capacity
+
+    async def initialize(self):
+        """
+        Create the counter document from the current registrations, or
+        apply a changed capacity to an existing one
+        """
+        counter = await self.counters.find_one({"_id": self.webinar_id})
+        if counter is None:
+            reserved = await self.registrations.count_documents({})
+            await self.counters.update_one(
+                {"_id": self.webinar_id},
+                {"$setOnInsert": {
+                    "capacity": self.capacity,
+                    "reserved": reserved,
+                    "available": max(0, self.capacity - reserved),
+                }},
+                upsert=True
+            )
+            logger.info(f"Seat counter for {self.webinar_id} created: {reserved}/{self.capacity} reserved")
+        elif counter["capacity"] != self.capacity:
+            delta = self.capacity - counter["capacity"]
+            await self.counters.update_one(
+                {"_id": self.webinar_id},
+                {"$set": {"capacity": self.capacity}, "$inc": {"available": delta}}
+            )
+            logger.info(f"Seat capacity for {self.webinar_id} changed from {counter['capacity']} to {self.capacity}")
+
+    async def reserve(self) -> bool:
+        """
+        Atomically take one seat; False when the webinar is sold out
+        """
+        counter = await self._take_seat()
+        if counter is None and await self.counters.find_one({"_id": self.webinar_id}) is None:
+            # Startup could not create the counter (e.g. database was down)
+            await self.initialize()
+            counter = await self._take_seat()
+        return counter is not None
+
+    async def reserve_many(self, count: int) -> int:
+        """
+        Atomically take up to ``count`` seats; returns how many were taken
+        """
+        while count > 0:
+            counter = await self.counters.find_one({"_id": self.webinar_id})
+            if counter is None:
+                await self.initialize()
+                continue
+            take = min(count, counter["available"])
+            if take <= 0:
+                return 0
+            result = await self.counters.update_one(
+                {"_id": self.webinar_id, "available": {"$gte": take}},
+                {"$inc": {"reserved": take, "available": -take}}
+            )
+            if result.modified_count:
+                return take
+            # Another registration took seats in between; look again
+        return 0
+
+    async def release(self, count: int = 1):
+        """
+        Give back seats taken by ``reserve`` or ``reserve_many`` that ended up unused
+        """
+        await self.counters.update_one(
+            {"_id": self.webinar_id},
+            {"$inc": {"reserved": -count, "available": count}}
+        )
+
+    async def join_waitlist(self, registration: dict) -> Optional[int]:
+        """
+        Add a registration to the waitlist (once per email)
+
+        Returns the 1-based waitlist position.
+        """
+        await self.waitlist.update_one(
+            {"webinar_id": self.webinar_id, "email": registration["email"]},
+            {"$setOnInsert": {**registration, "webinar_id": self.webinar_id, "waitlisted_at": datetime.utcnow()}},
+            upsert=True
+        )
+        entry = await self.waitlist.find_one({"webinar_id": self.webinar_id, "email": registration["email"]})
+        ahead = await self.waitlist.count_documents({
+            "webinar_id": self.webinar_id,
+            "waitlisted_at": {"$lt": entry["waitlisted_at"]},
+        })
+        return ahead + 1
+
+    async def stats(self) -> dict:
+        counter = await self.counters.find_one({"_id": self.webinar_id}, {"_id": 0}) or {}
+        waitlisted = await self.waitlist.count_documents({"webinar_id": self.webinar_id})
+        return {
+            "capacity": counter.get("capacity", self.capacity),
+            "reserved": counter.get("reserved", 0),
+            "available": counter.get("available", self.capacity),
+            "waitlisted": waitlisted,
+        }
+
+    async def _take_seat(self) -> Optional[dict]:
+        return await self.counters.find_one_and_update(
+            {"_id": self.webinar_id, "available": {"$gt": 0}},
+            {"$inc": {"reserved": 1, "available": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+
+
+class LocalSeatAllocator:
+    """
+    In-process SeatAllocator for the local storage backends.
+
+    Same interface and guarantees within one process (the event loop
+    serializes every update); the waitlist is kept in memory only.
+    """
+
+    def __init__(self, storage, webinar_id: str = "default", capacity: int = 100):
+        self.storage = storage
+        self.webinar_id = webinar_id
+        self.capacity = capacity
+        self.reserved: Optional[int] = None
+        self.waitlist: Dict[str, datetime] = {}
+
+    async def initialize(self):
+        self.reserved = await self.storage.count_registrations()
+        logger.info(f"Seat counter for {self.webinar_id} loaded: {self.reserved}/{self.capacity} reserved")
+
+    async def reserve(self) -> bool:
+        if self.reserved is None:
+            await self.initialize()
+        if self.reserved >= self.capacity:
+            return False
+        self.reserved += 1
+        return True
+
+    async def reserve_many(self, count: int) -> int:
+        if self.reserved is None:
+            await self.initialize()
+        take = max(0, min(count, self.capacity - self.reserved))
+        self.reserved += take
+        return take
+
+    async def release(self, count: int = 1):
+        self.reserved -= count
+
+    async def join_waitlist(self, registration: dict) -> Optional[int]:
+        self.waitlist.setdefault(registration["email"], datetime.utcnow())
+        # Dicts keep insertion order, which is waitlist order
+        return list(self.waitlist).index(registration["email"]) + 1
+
+    async def stats(self) -> dict:
+        reserved = self.reserved or 0
+        return {
+            "capacity": self.capacity,
+            "reserved": reserved,
+            "available": max(0, self.capacity - reserved),
+            "waitlisted": len(self.waitlist),
+        }
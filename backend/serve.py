@@ -0,0 +1,80 @@
+"""
+Multi-worker entry point.
+
+Runs ``server:app`` in several uvicorn worker processes that share hot
+counters (registration totals, referral counts, request metrics)
+through one mmap'ed file, so ``/api/webinar-stats``, the stats stream
+and ``/metrics`` report the same totals whichever worker answers.
+
+    cd backend && python serve.py --workers 4 --port 8001
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+
+from shared_counters import SharedCounters, pid_alive
+
+
+COUNTERS_FILE_PREFIX = "transformbuddy-counters-"
+
+
+def counters_directory() -> str:
+    # tmpfs keeps the pages in memory; fall back to the temp dir elsewhere
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def shared_counters_path() -> str:
+    return os.path.join(counters_directory(), f"{COUNTERS_FILE_PREFIX}{os.getpid()}")
+
+
+def remove_stale_counters():
+    """
+    Delete counters files left by servers that were killed before cleaning up
+    """
+    for path in Path(counters_directory()).glob(f"{COUNTERS_FILE_PREFIX}*"):
+        pid = path.name[len(COUNTERS_FILE_PREFIX):]
+        if pid.isdigit() and not pid_alive(int(pid)):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--max-keys", type=int, default=4096, help="distinct shared counters")
+    parser.add_argument("--timeout-graceful-shutdown", type=int, default=30)
+    args = parser.parse_args()
+
+    load_dotenv(Path(__file__).parent / '.env')
+    if os.getenv("STORAGE_BACKEND", "mongo") != "mongo" and args.workers > 1:
+        parser.error("several workers need STORAGE_BACKEND=mongo (the local backends count seats per process)")
+
+    remove_stale_counters()
+    path = shared_counters_path()
+    # Spare rows let restarted workers start before the old ones are reaped
+    SharedCounters.create(path, max_workers=args.workers * 2, max_keys=args.max_keys).close()
+    os.environ["SHARED_COUNTERS_PATH"] = path
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    try:
+        uvicorn.run(
+            "server:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            timeout_graceful_shutdown=args.timeout_graceful_shutdown,
+        )
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,317 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Query, Header, Response, UploadFile, File
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
+import asyncio
 import os
+import secrets
+import time
+from contextlib import asynccontextmanager
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
-import uuid
-from datetime import datetime
-from emails import send_webinar_registration_notification, send_webinar_confirmation_email, EmailDeliveryError
+from typing import List, Optional, Union
+from datetime import datetime, timedelta
+from emails import (
+    async_send_webinar_registration_notification,
+    async_send_webinar_confirmation_email,
+    async_send_webinar_registration_digest,
+    close_transport,
+    aclose_async_transport,
+    get_circuit_breaker,
+    preload_email_stack,
+)
+from bulk_import import FORMATS as IMPORT_FORMATS, RegistrationImporter, format_for
+from models import (
+    EmailResponse,
+    StatusCheck,
+    StatusCheckCreate,
+    WebinarRegistration,
+    WebinarRegistrationCreate,
+    WebinarRegistrationPage,
+)
+from email_batching import ConfirmationBatcher, RegistrationDigest
+from idempotency import (
+    IdempotencyCache,
+    IdempotencyKeyReused,
+    MemoryIdempotencyStore,
+    MongoIdempotencyStore,
+    request_fingerprint,
+)
+from metrics import BACKGROUND_TASKS, CONTENT_TYPE, REGISTRY, HTTPMetricsMiddleware, MongoCommandMetrics
+from outbox import EmailOutbox, LocalEmailQueue
+from rate_limit import LoopLagMonitor, RateLimiter, RateLimitMiddleware
+from rollups import GRANULARITIES, LocalReferralRollups, ReferralRollups, as_naive_utc
+from seats import LocalSeatAllocator, SeatAllocator
+from shared_counters import SharedCounters
+from pagination import (
+    decode_cursor,
+    encode_cursor,
+    stream_csv,
+    stream_json_array,
+    stream_ndjson,
+)
+from stats_cache import WebinarStatsCache
+from stats_stream import StatsBroadcaster
+from templating import templates
+from tracing import ProfilerBusy, TracedRoute, TracingMiddleware, profiler, trace_logging, tracer
+from storage import MemoryStorage, MongoStorage, SQLiteStorage
+from write_batcher import InsertBatcher
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Settings read at import; the clients that use them are created in lifespan()
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'mongo')
+WEBINAR_CAPACITY = int(os.getenv('WEBINAR_CAPACITY', '100'))
+WEBINAR_ID = os.getenv('WEBINAR_ID', 'default')
+WEBINAR_WAITLIST_ENABLED = os.getenv('WEBINAR_WAITLIST_ENABLED', 'true').lower() == 'true'
+# background: serve right away and report ready once warm; blocking: warm up before serving
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'background')
+# Set by serve.py when running several workers: counters shared through this mmap'ed file
+SHARED_COUNTERS_PATH = os.getenv('SHARED_COUNTERS_PATH')
+WORKER_COUNT = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+
+# Per-request spans: Server-Timing header and a ring buffer of slow traces
+tracer.configure(
+    enabled=os.getenv('TRACING_ENABLED', 'true').lower() == 'true',
+    slow_ms=float(os.getenv('TRACE_SLOW_MS', '250')),
+    buffer_size=int(os.getenv('TRACE_SLOW_BUFFER_SIZE', '100')),
+)
+profiler.max_seconds = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
+
+client = None
+db = None
+shared_counters = None
+metrics_publisher = None
+storage = None
+webinar_stats = None
+stats_broadcaster = None
+referral_rollups = None
+seat_allocator = None
+registration_writer = None
+email_outbox = None
+registration_importer = None
+warmup_task = None
+app_ready = False
+
+# Token-bucket rate limiting (per client IP and global) for registrations;
+# the global budget is split evenly between the workers
+loop_lag_monitor = LoopLagMonitor()
+max_loop_lag_ms = float(os.getenv('RATE_LIMIT_MAX_LOOP_LAG_MS', '0'))
+registration_rate_limiter = RateLimiter(
+    per_client_rate=float(os.getenv('RATE_LIMIT_PER_CLIENT_PER_MINUTE', '10')) / 60,
+    per_client_burst=float(os.getenv('RATE_LIMIT_PER_CLIENT_BURST', '5')),
+    global_rate=float(os.getenv('RATE_LIMIT_GLOBAL_PER_SECOND', '200')) / WORKER_COUNT,
+    global_burst=float(os.getenv('RATE_LIMIT_GLOBAL_BURST', '400')) / WORKER_COUNT,
+    max_clients=int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '100000')),
+    lag_monitor=loop_lag_monitor if max_loop_lag_ms > 0 else None,
+    max_loop_lag=max_loop_lag_ms / 1000 if max_loop_lag_ms > 0 else None,
+)
+
+# Idempotency-Key replay cache for registration retries
+idempotency_ttl = float(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400'))
+registration_idempotency = IdempotencyCache(
+    MemoryIdempotencyStore(
+        ttl_seconds=idempotency_ttl,
+        max_keys=int(os.getenv('IDEMPOTENCY_MAX_KEYS', '100000')),
+    ),
+    # Shared MongoDB store (IDEMPOTENCY_STORE=mongo) is attached in create_resources()
+)
+
+# Confirmation emails are coalesced into one SendGrid request per window
+# (set EMAIL_CONFIRMATION_BATCH_WINDOW_MS=0 to send them one by one)
+confirmation_batch_window = float(os.getenv('EMAIL_CONFIRMATION_BATCH_WINDOW_MS', '250')) / 1000
+confirmation_batcher = None
+if confirmation_batch_window > 0:
+    confirmation_batcher = ConfirmationBatcher(
+        window_seconds=confirmation_batch_window,
+        max_recipients=int(os.getenv('EMAIL_CONFIRMATION_BATCH_SIZE', '500')),
+    )
+
+# Email handlers run by the outbox workers
+ADMIN_NOTIFICATION_EMAIL = os.getenv('ADMIN_NOTIFICATION_EMAIL', 'support@transformbuddy.ai')
+# immediate: one admin email per registration; digest: one summary email per interval or per N registrations
+ADMIN_NOTIFICATION_MODE = os.getenv('ADMIN_NOTIFICATION_MODE', 'immediate')
+# Bearer token for the admin write endpoints (bulk import); unset disables them
+ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN')
+email_handlers = {
+    "webinar_registration_notification": async_send_webinar_registration_notification,
+    "webinar_registration_digest": async_send_webinar_registration_digest,
+    "webinar_confirmation": async_send_webinar_confirmation_email,
+}
+
+
+async def send_confirmation_batch(payloads: List[dict]) -> list:
+    return await confirmation_batcher.submit_many(
+        [(payload["user_email"], payload["user_name"]) for payload in payloads]
+    )
+
+# Confirmations are claimed from the outbox in bulk and sent as SendGrid batches
+email_batch_handlers = {"webinar_confirmation": send_confirmation_batch} if confirmation_batcher else {}
+
+
+async def queue_registration_digest(registrations: List[dict]):
+    await email_outbox.enqueue("webinar_registration_digest", {
+        "admin_email": ADMIN_NOTIFICATION_EMAIL,
+        "registrations": registrations,
+    })
+
+registration_digest = None
+if ADMIN_NOTIFICATION_MODE == 'digest':
+    registration_digest = RegistrationDigest(
+        queue_registration_digest,
+        interval_seconds=float(os.getenv('ADMIN_NOTIFICATION_DIGEST_INTERVAL_SECONDS', '300')),
+        max_registrations=int(os.getenv('ADMIN_NOTIFICATION_DIGEST_MAX_REGISTRATIONS', '100')),
+    )
+
+
+def create_mongo_client():
+    """
+    Motor client with explicit pool sizing; no connection is opened until first use
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(
+        os.environ['MONGO_URL'],
+        maxPoolSize=int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+        minPoolSize=int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+        maxIdleTimeMS=int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '300000')),
+        serverSelectionTimeoutMS=int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+        event_listeners=[MongoCommandMetrics()],
+    )
+
+def create_resources():
+    """
+    Build the storage client and everything that depends on it
+    """
+    global client, db, shared_counters, storage, webinar_stats, stats_broadcaster, referral_rollups, seat_allocator
+    global registration_writer, email_outbox, registration_importer
+
+    # Registration storage: MongoDB, or memory/sqlite for local runs and benchmarks
+    if STORAGE_BACKEND == 'mongo':
+        client = create_mongo_client()
+        db = client[os.environ['DB_NAME']]
+        storage = MongoStorage(db)
+    elif STORAGE_BACKEND == 'memory':
+        storage = MemoryStorage()
+    elif STORAGE_BACKEND == 'sqlite':
+        storage = SQLiteStorage(os.getenv('SQLITE_PATH', str(ROOT_DIR / 'webinar.sqlite3')))
+    else:
+        raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r} (expected mongo, memory or sqlite)")
+
+    # Multi-worker mode: stats and metrics are summed over every worker's shared row
+    if SHARED_COUNTERS_PATH:
+        shared_counters = SharedCounters.open(SHARED_COUNTERS_PATH)
+        worker = shared_counters.claim_worker()
+        REGISTRY.share(shared_counters)
+        logger.info(f"Worker {worker} of {WORKER_COUNT} sharing counters through {SHARED_COUNTERS_PATH}")
+
+    # Webinar statistics served from memory, resynced from storage periodically
+    webinar_stats = WebinarStatsCache(
+        storage,
+        capacity=WEBINAR_CAPACITY,
+        resync_seconds=float(os.getenv('STATS_RESYNC_SECONDS', '60')),
+        shared=shared_counters,
+    )
+
+    # One broadcaster pushes stats changes to every /api/webinar-stats/stream client
+    stats_broadcaster = StatsBroadcaster(
+        webinar_stats.snapshot,
+        coalesce_seconds=float(os.getenv('STATS_STREAM_COALESCE_MS', '250')) / 1000,
+        heartbeat_seconds=float(os.getenv('STATS_STREAM_HEARTBEAT_SECONDS', '15')),
+        poll_seconds=float(os.getenv('STATS_STREAM_POLL_SECONDS', '1')),
+        max_skipped=int(os.getenv('STATS_STREAM_MAX_SKIPPED', '20')),
+        max_subscribers=int(os.getenv('STATS_STREAM_MAX_SUBSCRIBERS', '20000')),
+        max_stream_seconds=float(os.getenv('STATS_STREAM_MAX_SECONDS', '300')),
+    )
+
+    # Hourly registrations per referral source for the analytics endpoint
+    if db is not None:
+        referral_rollups = ReferralRollups(db.registration_rollups, db.webinar_registrations)
+    else:
+        referral_rollups = LocalReferralRollups(storage)
+
+    # Seats are reserved atomically on a per-webinar counter document
+    if db is not None:
+        seat_allocator = SeatAllocator(db, webinar_id=WEBINAR_ID, capacity=WEBINAR_CAPACITY)
+    else:
+        seat_allocator = LocalSeatAllocator(storage, webinar_id=WEBINAR_ID, capacity=WEBINAR_CAPACITY)
+
+    # Optional group-commit batching of registration inserts under burst load (MongoDB only)
+    if db is not None and os.getenv('REGISTRATION_WRITE_BATCHING', 'false').lower() == 'true':
+        registration_writer = InsertBatcher(
+            db.webinar_registrations,
+            max_batch=int(os.getenv('REGISTRATION_WRITE_BATCH_SIZE', '500')),
+            max_delay=float(os.getenv('REGISTRATION_WRITE_BATCH_DELAY_MS', '0')) / 1000,
+        )
+        BACKGROUND_TASKS.set_function(lambda: registration_writer.stats()["queued"], "registration_write_queued")
+
+    if db is not None and os.getenv('IDEMPOTENCY_STORE', 'memory') == 'mongo':
+        registration_idempotency.shared = MongoIdempotencyStore(db.idempotency_keys, ttl_seconds=idempotency_ttl)
+
+    # Durable email outbox, delivered by a dedicated worker pool
+    # (the local storage backends hand emails straight to the senders instead)
+    email_outbox_concurrency = int(os.getenv('EMAIL_OUTBOX_CONCURRENCY', '64'))
+    if db is not None:
+        email_outbox = EmailOutbox(
+            db.email_outbox,
+            handlers=email_handlers,
+            concurrency=email_outbox_concurrency,
+            max_attempts=int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '5')),
+            poll_interval=float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', '1.0')),
+            lease_seconds=int(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', '60')),
+            backoff_seconds=float(os.getenv('EMAIL_OUTBOX_BACKOFF_SECONDS', '5')),
+            sent_retention_days=float(os.getenv('EMAIL_OUTBOX_SENT_RETENTION_DAYS', '7')),
+            failed_retention_days=float(os.getenv('EMAIL_OUTBOX_FAILED_RETENTION_DAYS', '30')),
+            # Hold deliveries while SendGrid's circuit is open instead of burning attempts
+            circuit=get_circuit_breaker(),
+            batch_handlers=email_batch_handlers,
+            batch_size=confirmation_batcher.max_recipients if confirmation_batcher else 1,
+        )
+    else:
+        email_outbox = LocalEmailQueue(
+            email_handlers, concurrency=email_outbox_concurrency, batch_handlers=email_batch_handlers
+        )
+    BACKGROUND_TASKS.set_function(lambda: email_outbox.in_flight, "email_outbox_sends")
+
+    # Admin bulk import: chunked inserts, confirmation emails paced through the outbox
+    registration_importer = RegistrationImporter(
+        storage,
+        seat_allocator,
+        email_outbox,
+        model=WebinarRegistrationCreate,
+        document_model=WebinarRegistration,
+        on_imported=record_imported_registrations,
+        chunk_size=int(os.getenv('BULK_IMPORT_CHUNK_SIZE', '1000')),
+        email_rate=float(os.getenv('BULK_IMPORT_EMAILS_PER_SECOND', '50')),
+        max_errors=int(os.getenv('BULK_IMPORT_MAX_ERRORS', '1000')),
+        # Validation processes; 1 validates in a thread
+        processes=int(os.getenv('BULK_IMPORT_PROCESSES', '2')),
+    )
+
+# Background work exported as gauges on /metrics
+if confirmation_batcher:
+    BACKGROUND_TASKS.set_function(lambda: confirmation_batcher.stats()["waiting"], "confirmation_batch_waiting")
+    BACKGROUND_TASKS.set_function(lambda: confirmation_batcher.stats()["batches_in_flight"], "confirmation_batch_sends")
+if registration_digest:
+    BACKGROUND_TASKS.set_function(lambda: registration_digest.stats()["waiting"], "admin_digest_waiting")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    create_resources()
+    await start_warmup()
+    try:
+        yield
+    finally:
+        await shutdown_resources()
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=TracedRoute)
 
 # Configure logging
 logging.basicConfig(
@@ -32,33 +319,9 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-# Define Models
-class StatusCheck(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-class StatusCheckCreate(BaseModel):
-    client_name: str
-
-class WebinarRegistration(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    fullName: str
-    email: EmailStr
-    whatsapp: str
-    referralSource: Optional[str] = None
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-class WebinarRegistrationCreate(BaseModel):
-    fullName: str
-    email: EmailStr
-    whatsapp: str
-    referralSource: Optional[str] = None
-
-class EmailResponse(BaseModel):
-    status: str
-    message: str
+if tracer.enabled:
+    # Time spent writing log records shows up as a "logging" span
+    trace_logging()
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -69,84 +332,265 @@ async def root():
 async def create_status_check(input: StatusCheckCreate):
     status_dict = input.dict()
     status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
+    await storage.insert_status_check(status_obj.dict())
     return status_obj
 
 @api_router.get("/status", response_model=List[StatusCheck])
 async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+    # Documents were validated on insert; project the model fields and encode them directly
+    status_checks = await storage.list_status_checks(1000)
+    return ORJSONResponse(status_checks)
+
+ALREADY_REGISTERED_RESPONSE = EmailResponse(
+    status="success",
+    message="You're already registered! Check your email for the webinar details."
+)
+
+async def handle_sold_out(full_registration: WebinarRegistration) -> EmailResponse:
+    """
+    Answer a registration that found no free seat: waitlist it, or
+    reject it when the waitlist is disabled
+    """
+    if await storage.registration_exists(full_registration.email):
+        return ALREADY_REGISTERED_RESPONSE
+
+    if not WEBINAR_WAITLIST_ENABLED:
+        logger.info(f"Webinar sold out, rejected {full_registration.email}")
+        raise HTTPException(
+            status_code=409,
+            detail="Sorry, the webinar is sold out. All seats have been taken."
+        )
+
+    position = await seat_allocator.join_waitlist(full_registration.dict())
+    logger.info(f"Webinar sold out, waitlisted {full_registration.email} at position {position}")
+    return EmailResponse(
+        status="waitlisted",
+        message=f"The webinar is full, so you're on the waitlist (position {position}). We'll email you if a seat opens up."
+    )
 
 @api_router.post("/webinar-register", response_model=EmailResponse)
-async def register_for_webinar(registration: WebinarRegistrationCreate, background_tasks: BackgroundTasks):
+async def register_for_webinar(
+    registration: WebinarRegistrationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+):
     """
-    Register user for webinar and send emails
+    Register user for webinar and queue emails in the outbox
+
+    A repeated Idempotency-Key returns the stored response without
+    touching the database or the email path again; reusing it with a
+    different body is rejected with 422.
     """
+    if not idempotency_key:
+        return await create_webinar_registration(registration)
+
     try:
-        # Create full registration object with ID and timestamp
-        full_registration = WebinarRegistration(
-            fullName=registration.fullName,
-            email=registration.email,
-            whatsapp=registration.whatsapp,
-            referralSource=registration.referralSource
+        result, replayed = await registration_idempotency.run(
+            idempotency_key,
+            request_fingerprint(registration.dict()),
+            lambda: _registration_as_dict(registration),
         )
-        
-        # Save to database
-        await db.webinar_registrations.insert_one(full_registration.dict())
-        logger.info(f"Saved webinar registration for {registration.email}")
-        
-        # Prepare data for email
-        registration_data = {
-            'fullName': full_registration.fullName,
-            'email': full_registration.email,
-            'whatsapp': full_registration.whatsapp,
-            'referralSource': full_registration.referralSource,
-            'timestamp': full_registration.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        
-        # Send emails in background
-        background_tasks.add_task(
-            send_webinar_registration_notification, 
-            "support@transformbuddy.ai",
-            registration_data
-        )
-        
-        background_tasks.add_task(
-            send_webinar_confirmation_email,
-            full_registration.email,
-            full_registration.fullName
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return EmailResponse(**result)
+
+async def _registration_as_dict(registration: WebinarRegistrationCreate) -> dict:
+    return (await create_webinar_registration(registration)).dict()
+
+async def create_webinar_registration(registration: WebinarRegistrationCreate) -> EmailResponse:
+    seat_reserved = False
+    try:
+        # Create full registration object with ID and timestamp
+        with tracer.span("model"):
+            full_registration = WebinarRegistration(
+                fullName=registration.fullName,
+                email=registration.email,
+                whatsapp=registration.whatsapp,
+                referralSource=registration.referralSource
+            )
+
+        # Take a seat atomically before saving so capacity holds under concurrency
+        with tracer.span("seats.reserve"):
+            seat_reserved = await seat_allocator.reserve()
+        if not seat_reserved:
+            with tracer.span("waitlist"):
+                return await handle_sold_out(full_registration)
+
+        with tracer.span("model.dict"):
+            document = full_registration.dict()
+
+        # Save to database; the unique email index absorbs retries and double-submits
+        try:
+            with tracer.span("db.insert"):
+                if registration_writer:
+                    await registration_writer.insert(document)
+                    is_new_registration = True
+                else:
+                    is_new_registration = await storage.insert_registration(document)
+        except DuplicateKeyError:
+            # A concurrent upsert for the same email won the race
+            is_new_registration = False
+
+        if not is_new_registration:
+            seat_reserved = False
+            await seat_allocator.release()
+            logger.info(f"Duplicate webinar registration for {registration.email}")
+            return ALREADY_REGISTERED_RESPONSE
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        # Nothing was saved, so the seat goes back to the pool
+        logger.error(f"Webinar registration error: {str(e)}")
+        if seat_reserved:
+            await seat_allocator.release()
+        raise HTTPException(
+            status_code=500, 
+            detail="Registration failed. Please try again or contact support."
         )
-        
+
+    # The registration is saved and keeps its seat; bookkeeping below must not fail the request
+    try:
+        webinar_stats.record_registration(full_registration.referralSource)
+        stats_broadcaster.notify()
+    except Exception as e:
+        # The live counters catch up at the next resync from the database
+        logger.error(f"Failed to update webinar stats: {str(e)}")
+    try:
+        with tracer.span("rollups.record"):
+            await referral_rollups.record(document)
+    except Exception as e:
+        # Only the analytics bucket is short by one
+        logger.error(f"Failed to update referral rollups: {str(e)}")
+    logger.info(f"Saved webinar registration for {registration.email}")
+
+    # Prepare data for email
+    registration_data = {
+        'fullName': full_registration.fullName,
+        'email': full_registration.email,
+        'whatsapp': full_registration.whatsapp,
+        'referralSource': full_registration.referralSource,
+        'timestamp': full_registration.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+    try:
+        # Persist emails next to the registration; outbox workers deliver them
+        messages = [
+            ("webinar_confirmation", {
+                "user_email": full_registration.email,
+                "user_name": full_registration.fullName,
+            }),
+        ]
+        if registration_digest:
+            registration_digest.add(registration_data)
+        else:
+            messages.insert(0, ("webinar_registration_notification", {
+                "admin_email": ADMIN_NOTIFICATION_EMAIL,
+                "registration_data": registration_data,
+            }))
+        with tracer.span("outbox.enqueue"):
+            await email_outbox.enqueue_many(messages)
         logger.info(f"Email tasks queued for {registration.email}")
         
-        return EmailResponse(
-            status="success",
-            message="Registration successful! Check your email for confirmation and webinar details."
-        )
-        
-    except EmailDeliveryError as e:
-        logger.error(f"Email delivery error for {registration.email}: {str(e)}")
+    except Exception as e:
+        logger.error(f"Failed to queue emails for {registration.email}: {str(e)}")
         # Still return success as registration was saved, just email failed
         return EmailResponse(
             status="success", 
             message="Registration saved! You may not receive confirmation email immediately, but you're registered."
         )
-        
+
+    return EmailResponse(
+        status="success",
+        message="Registration successful! Check your email for confirmation and webinar details."
+    )
+
+def require_admin(authorization: Optional[str] = Header(None)):
+    """
+    Admin writes and operational stats need ``Authorization: Bearer <ADMIN_API_TOKEN>``
+    """
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled (ADMIN_API_TOKEN is not set)")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+async def record_imported_registrations(documents: List[dict]):
+    # The rows are saved; bookkeeping failures must not abort the import
+    try:
+        for document in documents:
+            webinar_stats.record_registration(document.get('referralSource'))
+        stats_broadcaster.notify()
     except Exception as e:
-        logger.error(f"Webinar registration error: {str(e)}")
-        raise HTTPException(
-            status_code=500, 
-            detail="Registration failed. Please try again or contact support."
-        )
+        logger.error(f"Failed to update webinar stats: {str(e)}")
+    try:
+        await referral_rollups.record_many(documents)
+    except Exception as e:
+        logger.error(f"Failed to update referral rollups: {str(e)}")
 
-@api_router.get("/webinar-registrations", response_model=List[WebinarRegistration])
-async def get_webinar_registrations():
+@api_router.post("/webinar-registrations/import", dependencies=[Depends(require_admin)])
+async def import_webinar_registrations(
+    file: UploadFile = File(...),
+    import_format: Optional[str] = Query(None, alias="format", pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+):
     """
-    Get all webinar registrations (admin endpoint)
+    Bulk-import registrations from a CSV (with header) or NDJSON upload (admin endpoint)
+
+    Rows are validated like ``POST /api/webinar-register`` and written in
+    chunks; the response counts imported, duplicate and rejected rows and
+    lists the failing rows. Confirmation emails are sent at
+    ``BULK_IMPORT_EMAILS_PER_SECOND``; no admin notifications are sent.
     """
+    upload_format = import_format or format_for(file.filename, file.content_type)
+    if upload_format is None:
+        raise HTTPException(status_code=400, detail="Unknown upload format; pass format=csv or format=ndjson")
     try:
-        registrations = await db.webinar_registrations.find().sort("timestamp", -1).to_list(1000)
-        return [WebinarRegistration(**reg) for reg in registrations]
+        report = await registration_importer.run(file.file, upload_format)
+    finally:
+        await file.close()
+    return ORJSONResponse(report, status_code=500 if report["aborted"] else 200)
+
+@api_router.get(
+    "/webinar-registrations",
+    response_model=Union[List[WebinarRegistration], WebinarRegistrationPage],
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+async def get_webinar_registrations(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    export_format: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$"),
+):
+    """
+    Get webinar registrations, newest first (admin endpoint)
+
+    - no parameters: every registration as a JSON array, streamed
+    - limit/cursor: one page plus ``next_cursor`` for the following page
+    - format=ndjson|csv: streaming export starting at ``cursor``
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        if limit is not None and export_format == "json":
+            docs = await storage.list_registrations(after, limit + 1)
+            next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+            return ORJSONResponse({"items": docs[:limit], "next_cursor": next_cursor})
+
+        docs = storage.iter_registrations(after, limit)
+        if export_format == "ndjson":
+            return StreamingResponse(stream_ndjson(docs), media_type="application/x-ndjson")
+        if export_format == "csv":
+            return StreamingResponse(
+                stream_csv(docs),
+                media_type="text/csv",
+                headers={"Content-Disposition": 'attachment; filename="webinar_registrations.csv"'},
+            )
+        return StreamingResponse(stream_json_array(docs), media_type="application/json")
     except Exception as e:
         logger.error(f"Error fetching registrations: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch registrations")
@@ -157,27 +601,169 @@ async def get_webinar_stats():
     Get webinar registration statistics
     """
     try:
-        total_registrations = await db.webinar_registrations.count_documents({})
-        
-        # Get registrations by referral source
-        pipeline = [
-            {"$group": {"_id": "$referralSource", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        referral_stats = await db.webinar_registrations.aggregate(pipeline).to_list(100)
-        
-        return {
-            "total_registrations": total_registrations,
-            "available_seats": max(0, 100 - total_registrations),
-            "referral_breakdown": referral_stats
-        }
+        return await webinar_stats.snapshot()
     except Exception as e:
         logger.error(f"Error fetching stats: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch statistics")
 
+@api_router.get("/webinar-stats/stream")
+async def stream_webinar_stats():
+    """
+    Server-Sent Events: the current statistics, then a new ``stats`` event whenever they change
+    """
+    if not stats_broadcaster.has_capacity():
+        raise HTTPException(status_code=503, detail="Too many open statistics streams")
+    return StreamingResponse(
+        stats_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@api_router.get("/webinar-stats/stream/stats", dependencies=[Depends(require_admin)])
+async def get_stats_stream_stats():
+    """
+    Get open statistics streams and publish counters (admin endpoint)
+    """
+    return stats_broadcaster.stats()
+
+@api_router.get("/analytics/referrals")
+async def get_referral_analytics(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query("hour", pattern=f"^({'|'.join(GRANULARITIES)})$"),
+    source: Optional[List[str]] = Query(None),
+):
+    """
+    Registrations per hour or day and referral source, read from the rollups (admin endpoint)
+
+    - start/end: UTC range [start, end), defaults to the last 7 days
+    - source: repeatable; "none" selects registrations without a referral source
+    """
+    # Stored timestamps are naive UTC; "...Z" and "+02:00" inputs are converted to match
+    end = as_naive_utc(end) if end else datetime.utcnow()
+    start = as_naive_utc(start) if start else end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    sources = [None if value.lower() == "none" else value for value in source] if source else None
+    try:
+        result = await referral_rollups.query(start, end, granularity, sources)
+    except Exception as e:
+        logger.error(f"Error fetching referral analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch referral analytics")
+    return ORJSONResponse({"start": start, "end": end, "granularity": granularity, **result})
+
+@api_router.get("/webinar-seats")
+async def get_webinar_seats():
+    """
+    Get seat counter and waitlist size (admin endpoint)
+    """
+    try:
+        return await seat_allocator.stats()
+    except Exception as e:
+        logger.error(f"Error fetching seat stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch seat statistics")
+
+@api_router.get("/ready")
+async def get_readiness():
+    """
+    Readiness probe: 503 until warm-up has finished, while storage is
+    unreachable or while duplicate registrations could be stored
+    """
+    if not app_ready:
+        return ORJSONResponse({"status": "starting"}, status_code=503)
+    try:
+        await asyncio.wait_for(storage.ping(), timeout=2.0)
+        emails_are_unique = await asyncio.wait_for(storage.emails_are_unique(), timeout=2.0)
+    except Exception as e:
+        logger.warning(f"Readiness check failed: {str(e)}")
+        return ORJSONResponse({"status": "unavailable", "storage": storage.name}, status_code=503)
+    if not emails_are_unique:
+        logger.warning("Readiness check failed: the unique email index on webinar_registrations is missing")
+        return ORJSONResponse({"status": "missing_unique_email_index", "storage": storage.name}, status_code=503)
+    return {"status": "ready", "storage": storage.name}
+
+@api_router.get("/rate-limit/stats", dependencies=[Depends(require_admin)])
+async def get_rate_limit_stats():
+    """
+    Get registration rate limiter counters (admin endpoint)
+    """
+    return registration_rate_limiter.stats()
+
+@api_router.get("/idempotency/stats", dependencies=[Depends(require_admin)])
+async def get_idempotency_stats():
+    """
+    Get Idempotency-Key cache counters (admin endpoint)
+    """
+    return registration_idempotency.stats()
+
+@api_router.get("/traces/slow", dependencies=[Depends(require_admin)])
+async def get_slow_traces(limit: Optional[int] = Query(None, ge=1)):
+    """
+    Recent requests and background sends slower than TRACE_SLOW_MS, newest first (admin endpoint)
+    """
+    return {"stats": tracer.stats(), "traces": tracer.slow_traces(limit)}
+
+@api_router.post("/profile", dependencies=[Depends(require_admin)])
+async def profile_process(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(10.0, gt=0),
+    idle: bool = False,
+):
+    """
+    Sample the stacks of every thread for ``seconds`` (admin endpoint)
+
+    Returns collapsed stacks for flamegraph.pl or speedscope. Only this
+    worker process is sampled; ``idle=true`` keeps threads that are
+    waiting (event loop in select, idle pool threads).
+    """
+    try:
+        stacks, samples = await asyncio.to_thread(profiler.run, seconds, interval_ms / 1000, idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"profile-{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}.collapsed"
+    return PlainTextResponse(stacks, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Profile-Samples": str(samples),
+    })
+
+@api_router.get("/email-outbox/stats", dependencies=[Depends(require_admin)])
+async def get_email_outbox_stats():
+    """
+    Get email outbox queue depth and worker concurrency (admin endpoint)
+    """
+    try:
+        stats = await email_outbox.stats()
+        stats["confirmation_batching"] = confirmation_batcher.stats() if confirmation_batcher else None
+        stats["admin_digest"] = registration_digest.stats() if registration_digest else None
+        stats["sendgrid_circuit"] = get_circuit_breaker().stats()
+        return stats
+    except Exception as e:
+        logger.error(f"Error fetching email outbox stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch email outbox statistics")
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """
+    Prometheus text exposition of request, MongoDB and SendGrid metrics
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+if os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true':
+    # Per-client buckets need to know how many proxies sit in front of the app;
+    # unset, only the global bucket applies
+    trusted_proxy_hops = os.getenv('RATE_LIMIT_TRUSTED_PROXY_HOPS', '')
+    if not trusted_proxy_hops:
+        logger.warning("RATE_LIMIT_TRUSTED_PROXY_HOPS is not set, per-client rate limits are off")
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=registration_rate_limiter,
+        routes=[("POST", "/api/webinar-register")],
+        trusted_proxy_hops=int(trusted_proxy_hops) if trusted_proxy_hops else None,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -186,6 +772,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+app.add_middleware(
+    TracingMiddleware,
+    server_timing=os.getenv('TRACE_SERVER_TIMING', 'true').lower() == 'true',
+)
+
+# Outermost, so rate-limited and CORS preflight responses are timed too
+app.add_middleware(HTTPMetricsMiddleware)
+
+async def initialize_storage():
+    try:
+        await storage.initialize()
+    except Exception as e:
+        logger.error(f"Could not initialize {storage.name} storage: {str(e)}")
+
+async def create_idempotency_indexes():
+    if registration_idempotency.shared:
+        try:
+            await registration_idempotency.shared.ensure_indexes()
+        except Exception as e:
+            logger.warning(f"Could not create idempotency indexes: {str(e)}")
+
+async def initialize_seats():
+    try:
+        await seat_allocator.initialize()
+    except Exception as e:
+        # reserve() retries the initialization on first use
+        logger.warning(f"Could not initialize seat counter: {str(e)}")
+
+async def load_webinar_stats():
+    try:
+        await webinar_stats.load()
+    except Exception as e:
+        # The first stats request retries the load
+        logger.warning(f"Could not preload webinar stats: {str(e)}")
+
+async def initialize_rollups():
+    try:
+        await referral_rollups.initialize()
+    except Exception as e:
+        logger.warning(f"Could not initialize referral rollups: {str(e)}")
+
+async def warm_up():
+    """
+    Connect, create indexes, load counters and caches, start the email
+    workers and import the email stack, then mark the app ready
+    """
+    global app_ready
+    started = time.perf_counter()
+    try:
+        await storage.ping()
+    except Exception as e:
+        logger.warning(f"{storage.name} storage is not reachable yet: {str(e)}")
+    await initialize_storage()
+    await create_idempotency_indexes()
+    await initialize_seats()
+    await load_webinar_stats()
+    await initialize_rollups()
+    await email_outbox.start()
+    # Imports hold the GIL but not the event loop, so requests keep flowing meanwhile
+    await asyncio.to_thread(preload_email_stack)
+    await asyncio.to_thread(templates.precompile)
+    app_ready = True
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.3f}s")
+
+async def start_warmup():
+    global warmup_task, metrics_publisher
+    stats_broadcaster.start()
+    if shared_counters is not None:
+        metrics_publisher = asyncio.create_task(REGISTRY.publish_periodically())
+    if registration_rate_limiter.lag_monitor:
+        loop_lag_monitor.start()
+    if STARTUP_WARMUP == 'blocking':
+        await warm_up()
+    else:
+        warmup_task = asyncio.create_task(warm_up())
+
+async def shutdown_resources():
+    global app_ready
+    app_ready = False
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            pass
+    await stats_broadcaster.close()
+    registration_importer.close()
+    if registration_writer:
+        await registration_writer.close()
+    if registration_digest:
+        # Queue the buffered registrations before the outbox stops
+        await registration_digest.close()
+    await email_outbox.stop()
+    await loop_lag_monitor.stop()
+    if confirmation_batcher:
+        await confirmation_batcher.close()
+    await aclose_async_transport()
+    close_transport()
+    await storage.close()
+    if client is not None:
+        client.close()
+    if shared_counters is not None:
+        if metrics_publisher is not None:
+            metrics_publisher.cancel()
+        # Leave this worker's totals behind, but not its in-flight gauges
+        REGISTRY.publish(gauges=False)
+        REGISTRY.share(None)
+        shared_counters.close()
\ No newline at end of file
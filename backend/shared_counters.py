@@ -0,0 +1,202 @@
+import fcntl
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAGIC = b"TBSHCNT1"
+# magic, max_workers, max_keys, max_slots, key_count, slots_used
+HEADER = struct.Struct("<8sIIIII")
+HEADER_SIZE = 64
+KEY_COUNT_OFFSET = 20
+KEY_RECORD = struct.Struct("<II248s")
+
+
+class SharedCountersFull(Exception):
+    pass
+
+
+class SharedCounters:
+    """
+    Counters shared by the worker processes of one server through an mmap'ed file.
+
+    The file holds a header, a table of worker pids, a key table and one
+    row of float64 slots per worker plus a base row. A worker only ever
+    writes its own row, with aligned 8-byte stores, so updates need no
+    lock or IPC; readers sum the rows. Registering a new key appends to
+    the key table under an ``flock`` on the file; known keys are looked
+    up in a per-process dict. The base row holds corrections written by
+    ``rebase`` (also under the lock) so totals can be reset to values
+    recomputed from the database.
+
+    Create the file once with ``create`` in the parent process, then
+    ``open`` and ``claim_worker`` in each worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.max_workers, self.max_keys, self.max_slots, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a shared counters file")
+        self._pids_offset = HEADER_SIZE
+        self._keys_offset = self._pids_offset + _align(4 * self.max_workers)
+        self._rows_offset = self._keys_offset + KEY_RECORD.size * self.max_keys
+        self._rows = memoryview(self._map)[self._rows_offset:].cast("d")
+        self._keys: Dict[str, Tuple[int, int]] = {}
+        self._keys_seen = 0
+        self.worker: Optional[int] = None
+        self._row: Optional[memoryview] = None
+
+    @classmethod
+    def create(cls, path: str, max_workers: int, max_keys: int = 4096, max_slots: int = 65536) -> "SharedCounters":
+        size = (
+            HEADER_SIZE + _align(4 * max_workers) + KEY_RECORD.size * max_keys
+            + 8 * max_slots * (max_workers + 1)
+        )
+        with open(path, "wb") as f:
+            f.truncate(size)
+            f.write(HEADER.pack(MAGIC, max_workers, max_keys, max_slots, 0, 0))
+        return cls(path)
+
+    @classmethod
+    def open(cls, path: str) -> "SharedCounters":
+        return cls(path)
+
+    def close(self):
+        self.release_worker()
+        if self._row is not None:
+            self._row.release()
+        self._rows.release()
+        self._map.close()
+        self._file.close()
+
+    def claim_worker(self) -> int:
+        """
+        Take a free worker row (or the row of a worker that has exited)
+        """
+        with self._locked():
+            for index in range(self.max_workers):
+                offset = self._pids_offset + 4 * index
+                (pid,) = struct.unpack_from("<I", self._map, offset)
+                if pid == 0 or not pid_alive(pid):
+                    struct.pack_into("<I", self._map, offset, os.getpid())
+                    self.worker = index
+                    self._row = self._rows[index * self.max_slots:(index + 1) * self.max_slots]
+                    return index
+        raise SharedCountersFull(f"All {self.max_workers} worker rows in {self.path} are taken")
+
+    def release_worker(self):
+        if self.worker is not None:
+            with self._locked():
+                struct.pack_into("<I", self._map, self._pids_offset + 4 * self.worker, 0)
+            self.worker = None
+
+    def slot(self, key: str, width: int = 1) -> int:
+        """
+        Offset of the ``width`` slots registered under ``key``, registering it if new
+        """
+        entry = self._keys.get(key)
+        if entry is None:
+            self._refresh_keys()
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._register(key, width)
+        return entry[0]
+
+    def add(self, offset: int, amount: float = 1.0):
+        self._row[offset] += amount
+
+    def store(self, offset: int, values: Sequence[float]):
+        row = self._row
+        for i, value in enumerate(values):
+            row[offset + i] = value
+
+    def total(self, offset: int, width: int = 1) -> List[float]:
+        """
+        Sum of the slots over every worker row and the base row
+        """
+        totals = [0.0] * width
+        rows = self._rows
+        for row in range(self.max_workers + 1):
+            start = row * self.max_slots + offset
+            for i in range(width):
+                totals[i] += rows[start + i]
+        return totals
+
+    def value(self, key: str) -> float:
+        return self.total(self.slot(key))[0]
+
+    def keys(self, prefix: str = "") -> Dict[str, Tuple[int, int]]:
+        """
+        Every registered key starting with ``prefix``, as {key: (offset, width)}
+        """
+        self._refresh_keys()
+        return {key: entry for key, entry in self._keys.items() if key.startswith(prefix)}
+
+    def rebase(self, values: Dict[str, float], prefix: str = ""):
+        """
+        Make the totals of ``values`` (and 0 for other keys under ``prefix``) current
+
+        The rows are read and the base written under the lock, but workers
+        add to their rows without it: an increment for a registration made
+        between computing ``values`` (e.g. a database count) and this call
+        is either dropped or counted twice. The error is bounded by the
+        registrations in flight at that moment and the next rebase fixes it.
+        """
+        for key in values:
+            self.slot(key)
+        with self._locked():
+            base = self.max_workers * self.max_slots
+            for key, (offset, _) in self.keys(prefix).items():
+                if key in values or prefix:
+                    current = self.total(offset)[0] - self._rows[base + offset]
+                    self._rows[base + offset] = values.get(key, 0) - current
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _refresh_keys(self):
+        (count,) = struct.unpack_from("<I", self._map, KEY_COUNT_OFFSET)
+        for index in range(self._keys_seen, count):
+            offset, width, name = KEY_RECORD.unpack_from(self._map, self._keys_offset + KEY_RECORD.size * index)
+            self._keys[name.rstrip(b"\0").decode()] = (offset, width)
+        self._keys_seen = count
+
+    def _register(self, key: str, width: int) -> Tuple[int, int]:
+        name = key.encode()
+        if len(name) > 248 or b"\0" in name:
+            raise ValueError(f"Shared counter keys are at most 248 bytes without NUL: {key!r}")
+        with self._locked():
+            self._refresh_keys()
+            if key in self._keys:
+                return self._keys[key]
+            _, _, _, _, count, used = HEADER.unpack_from(self._map, 0)
+            if count >= self.max_keys or used + width > self.max_slots:
+                raise SharedCountersFull(f"No room for shared counter {key!r} in {self.path}")
+            KEY_RECORD.pack_into(self._map, self._keys_offset + KEY_RECORD.size * count, used, width, name)
+            # Publish the record before the count so readers never see a half-written key
+            struct.pack_into("<II", self._map, KEY_COUNT_OFFSET, count + 1, used + width)
+            self._refresh_keys()
+            return self._keys[key]
+
+
+def _align(size: int, to: int = 64) -> int:
+    return (size + to - 1) // to * to
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
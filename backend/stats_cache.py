@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Keys in the shared counters segment
+STATS_PREFIX = "stats:"
+TOTAL_KEY = STATS_PREFIX + "registrations"
+
+
+class WebinarStatsCache:
+    """
+    In-process copy of the webinar registration statistics.
+
+    Built from storage once at startup, then updated in place by
+    ``record_registration`` so reads never touch the database. Every
+    ``resync_seconds`` the next read schedules a background resync to
+    correct drift (registrations written by other processes, deletions,
+    failed increments); readers keep getting the cached snapshot while it
+    runs.
+
+    With ``shared`` (a ``SharedCounters`` segment) the registration total
+    lives in shared memory instead, so every worker process serves the
+    same total and seat count: registrations are added to this worker's
+    row, snapshots sum the rows, and a resync rebases the shared total.
+    The referral breakdown stays per process (``referralSource`` is free
+    text, so it cannot name shared slots); other workers' registrations
+    show up in it at the next resync.
+    """
+
+    def __init__(self, storage, capacity: int = 100, resync_seconds: float = 60.0, shared=None):
+        self.storage = storage
+        self.shared = shared
+        self.capacity = capacity
+        self.resync_seconds = resync_seconds
+        self.total = 0
+        self.referrals: Dict[Optional[str], int] = {}
+        self.loaded_at: Optional[float] = None
+        self._snapshot: Optional[dict] = None
+        self._resync: Optional[asyncio.Task] = None
+
+    async def load(self):
+        """
+        Recompute the statistics from storage
+        """
+        total = await self.storage.count_registrations()
+        referrals = await self.storage.referral_counts()
+        if self.shared is not None:
+            self.shared.rebase({TOTAL_KEY: total}, prefix=STATS_PREFIX)
+        self.total = total
+        self.referrals = referrals
+        self.loaded_at = time.monotonic()
+        self._snapshot = None
+
+    def record_registration(self, referral_source: Optional[str]):
+        if self.shared is not None:
+            try:
+                self.shared.add(self.shared.slot(TOTAL_KEY))
+            except Exception as e:
+                # The next resync corrects the shared total
+                logger.error(f"Failed to update shared registration total: {str(e)}")
+        self.total += 1
+        self.referrals[referral_source] = self.referrals.get(referral_source, 0) + 1
+        self._snapshot = None
+
+    async def snapshot(self) -> dict:
+        if self.loaded_at is None:
+            await self.load()
+        elif time.monotonic() - self.loaded_at > self.resync_seconds and self._resync is None:
+            self._resync = asyncio.create_task(self._background_resync())
+        if self.shared is not None:
+            self._read_shared()
+        if self._snapshot is None:
+            breakdown = sorted(self.referrals.items(), key=lambda item: item[1], reverse=True)
+            self._snapshot = {
+                "total_registrations": self.total,
+                "available_seats": max(0, self.capacity - self.total),
+                "referral_breakdown": [{"_id": source, "count": count} for source, count in breakdown],
+            }
+        return self._snapshot
+
+    def _read_shared(self):
+        """
+        Take the total of every worker from shared memory
+        """
+        total = int(self.shared.value(TOTAL_KEY))
+        if total != self.total:
+            self.total = total
+            self._snapshot = None
+
+    async def _background_resync(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Webinar stats resync failed: {str(e)}")
+            # Serve the current numbers for another interval before retrying
+            self.loaded_at = time.monotonic()
+        finally:
+            self._resync = None
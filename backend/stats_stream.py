@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, Set
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = b": heartbeat\n\n"
+
+
+class StatsSubscriber:
+    """
+    One open stream; holds at most the latest undelivered message
+    """
+
+    def __init__(self):
+        self.message: Optional[bytes] = None
+        self.skipped = 0
+        self.closed = False
+        self.ready = asyncio.Event()
+
+    def push(self, message: bytes, max_skipped: int) -> bool:
+        """
+        Queue ``message`` in place of any pending one; False if the subscriber fell too far behind
+        """
+        if self.message is not None and self.message is not HEARTBEAT:
+            self.skipped += 1
+            if self.skipped > max_skipped:
+                self.close()
+                return False
+        self.message = message
+        self.ready.set()
+        return True
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+class StatsBroadcaster:
+    """
+    Push webinar statistics to Server-Sent Events subscribers.
+
+    ``notify`` marks the statistics as changed; changes arriving within
+    ``coalesce_seconds`` are published together, so a burst of
+    registrations costs one snapshot and one serialization no matter how
+    many streams are open. Every ``poll_seconds`` the snapshot is checked
+    for changes made elsewhere (resyncs, other workers), and streams that
+    got nothing for ``heartbeat_seconds`` get a comment line to keep
+    proxies from closing them.
+
+    Each subscriber keeps only the newest message. A subscriber that has
+    not taken its pending message after ``max_skipped`` newer ones (a
+    stalled client or network) is disconnected; ``EventSource`` reconnects
+    on its own. Streams also end after ``max_stream_seconds`` so clients
+    spread over workers and graceful shutdown is not held open forever.
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Awaitable[dict]],
+        coalesce_seconds: float = 0.25,
+        heartbeat_seconds: float = 15.0,
+        poll_seconds: float = 1.0,
+        max_skipped: int = 20,
+        max_subscribers: int = 20000,
+        max_stream_seconds: float = 300.0,
+        retry_ms: int = 5000,
+    ):
+        self.snapshot = snapshot
+        self.coalesce_seconds = coalesce_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = min(poll_seconds, heartbeat_seconds)
+        self.max_skipped = max_skipped
+        self.max_subscribers = max_subscribers
+        self.max_stream_seconds = max_stream_seconds
+        self.retry_ms = retry_ms
+        self.subscribers: Set[StatsSubscriber] = set()
+        self.last_message: Optional[bytes] = None
+        self._last_data: Optional[bytes] = None
+        self._event_id = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._publishing: Optional[asyncio.Task] = None
+        self._dirty = False
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def close(self):
+        """
+        Stop publishing and end every open stream
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in (self._heartbeat, self._publishing):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._heartbeat = self._publishing = None
+        for subscriber in list(self.subscribers):
+            subscriber.close()
+
+    def notify(self):
+        """
+        The statistics changed; publish once the coalescing window closes
+        """
+        self._dirty = True
+        if self._timer is None and self._publishing is None:
+            self._timer = asyncio.get_running_loop().call_later(self.coalesce_seconds, self._schedule_publish)
+
+    def has_capacity(self) -> bool:
+        return len(self.subscribers) < self.max_subscribers
+
+    def subscribe(self) -> Optional[StatsSubscriber]:
+        """
+        Register a new stream, or None when ``max_subscribers`` are connected
+        """
+        if not self.has_capacity():
+            return None
+        subscriber = StatsSubscriber()
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    async def stream(self):
+        """
+        SSE body for one subscriber: the current snapshot, then every change
+
+        The subscriber is registered only once the body is being sent, so a
+        client that disconnects before that leaves nothing behind.
+        """
+        subscriber = self.subscribe()
+        if subscriber is None:
+            # Filled up since the request was accepted; EventSource retries later
+            yield f"retry: {self.retry_ms}\n\n".encode()
+            return
+        deadline = time.monotonic() + self.max_stream_seconds
+        try:
+            if self.last_message is None:
+                await self.publish()
+            yield f"retry: {self.retry_ms}\n".encode() + (self.last_message or HEARTBEAT)
+            while not subscriber.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                subscriber.ready.clear()
+                message, subscriber.message, subscriber.skipped = subscriber.message, None, 0
+                if message is not None and not subscriber.closed:
+                    yield message
+        finally:
+            self.subscribers.discard(subscriber)
+
+    async def publish(self):
+        """
+        Compute the snapshot once and hand it to every subscriber if it changed
+        """
+        self._dirty = False
+        data = orjson.dumps(await self.snapshot())
+        if data == self._last_data:
+            return
+        self._last_data = data
+        self._event_id += 1
+        self.last_message = b"event: stats\nid: %d\ndata: %s\n\n" % (self._event_id, data)
+        self.published += 1
+        for subscriber in list(self.subscribers):
+            if not subscriber.push(self.last_message, self.max_skipped):
+                self.subscribers.discard(subscriber)
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped_slow_consumers": self.dropped,
+            "coalesce_seconds": self.coalesce_seconds,
+            "heartbeat_seconds": self.heartbeat_seconds,
+        }
+
+    def _schedule_publish(self):
+        self._timer = None
+        self._publishing = asyncio.get_running_loop().create_task(self._publish_changes())
+
+    async def _publish_changes(self):
+        try:
+            await self.publish()
+        except Exception as e:
+            logger.error(f"Webinar stats publish failed: {str(e)}")
+        finally:
+            self._publishing = None
+            if self._dirty:
+                # Registrations arrived while publishing; start the next window
+                self.notify()
+
+    async def _heartbeat_loop(self):
+        last_sent = time.monotonic()
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            published = self.published
+            try:
+                await self.publish()
+            except Exception as e:
+                logger.error(f"Webinar stats publish failed: {str(e)}")
+            now = time.monotonic()
+            if self.published != published:
+                last_sent = now
+            elif now - last_sent >= self.heartbeat_seconds:
+                last_sent = now
+                for subscriber in list(self.subscribers):
+                    if subscriber.message is None:
+                        subscriber.push(HEARTBEAT, self.max_skipped)
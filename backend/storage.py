@@ -0,0 +1,389 @@
+import asyncio
+import bisect
+import sqlite3
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from indexes import ensure_indexes, has_unique_email_index
+from pagination import REGISTRATION_FIELDS, REGISTRATION_PROJECTION, REGISTRATION_SORT, page_filter
+from reports import referral_breakdown_pipeline
+
+STATUS_CHECK_FIELDS = ["id", "client_name", "timestamp"]
+STATUS_CHECK_PROJECTION = {"_id": 0, **{field: 1 for field in STATUS_CHECK_FIELDS}}
+
+DUPLICATE_KEY_ERROR = 11000
+
+Position = Tuple[datetime, str]
+
+
+class RegistrationStorage(ABC):
+    """
+    Storage for webinar registrations and status checks.
+
+    Registrations are unique by ``email`` and listed newest first in
+    REGISTRATION_SORT order; ``after`` is the (timestamp, id) of the last
+    row of the previous page. Listed documents carry REGISTRATION_FIELDS
+    only, so they can be encoded without further filtering.
+    """
+
+    name = ""
+
+    async def initialize(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def ping(self):
+        pass
+
+    async def emails_are_unique(self) -> bool:
+        """
+        Whether the backend currently enforces unique registration emails
+        """
+        return True
+
+    @abstractmethod
+    async def insert_registration(self, document: dict) -> bool:
+        """
+        Insert a registration unless its email is taken; True if it was inserted
+        """
+        ...
+
+    @abstractmethod
+    async def insert_registrations(self, documents: List[dict]) -> Dict[int, str]:
+        """
+        Insert many registrations, skipping rejected ones
+
+        Returns the index and reason of every document that was not inserted.
+        """
+        ...
+
+    @abstractmethod
+    async def registration_exists(self, email: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def list_registrations(self, after: Optional[Position] = None, limit: int = 100) -> List[dict]:
+        ...
+
+    async def iter_registrations(self, after: Optional[Position] = None, limit: Optional[int] = None,
+                                 chunk_size: int = 1000) -> AsyncIterator[dict]:
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = chunk_size if remaining is None else min(chunk_size, remaining)
+            page = await self.list_registrations(after, page_size)
+            for doc in page:
+                yield doc
+            if len(page) < page_size:
+                return
+            after = (page[-1]["timestamp"], page[-1]["id"])
+            if remaining is not None:
+                remaining -= len(page)
+
+    @abstractmethod
+    async def count_registrations(self) -> int:
+        ...
+
+    @abstractmethod
+    async def referral_counts(self) -> Dict[Optional[str], int]:
+        """
+        Number of registrations per referralSource
+        """
+        ...
+
+    @abstractmethod
+    async def insert_status_check(self, document: dict):
+        ...
+
+    @abstractmethod
+    async def list_status_checks(self, limit: int = 1000) -> List[dict]:
+        ...
+
+
+class MongoStorage(RegistrationStorage):
+    name = "mongo"
+
+    def __init__(self, db):
+        self.db = db
+        self.registrations = db.webinar_registrations
+        self.status_checks = db.status_checks
+        self.unique_email_index = False
+
+    async def initialize(self):
+        self.unique_email_index = await ensure_indexes(self.db)
+
+    async def ping(self):
+        await self.db.command("ping")
+
+    async def emails_are_unique(self) -> bool:
+        # Look again only while it is missing, so a manually built index is picked up
+        if not self.unique_email_index:
+            self.unique_email_index = await has_unique_email_index(self.db)
+        return self.unique_email_index
+
+    async def insert_registration(self, document: dict) -> bool:
+        try:
+            result = await self.registrations.update_one(
+                {"email": document["email"]},
+                {"$setOnInsert": document},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # A concurrent upsert for the same email won the race
+            return False
+        return result.upserted_id is not None
+
+    async def insert_registrations(self, documents: List[dict]) -> Dict[int, str]:
+        if not documents:
+            return {}
+        try:
+            await self.registrations.insert_many([dict(document) for document in documents], ordered=False)
+        except BulkWriteError as e:
+            return {
+                error["index"]: "duplicate email" if error.get("code") == DUPLICATE_KEY_ERROR else error.get("errmsg", "")
+                for error in e.details.get("writeErrors", [])
+            }
+        return {}
+
+    async def registration_exists(self, email: str) -> bool:
+        return await self.registrations.find_one({"email": email}, {"_id": 1}) is not None
+
+    async def list_registrations(self, after: Optional[Position] = None, limit: int = 100) -> List[dict]:
+        return await self.registrations.find(page_filter(after), REGISTRATION_PROJECTION) \
+            .sort(REGISTRATION_SORT).limit(limit).to_list(limit)
+
+    async def iter_registrations(self, after: Optional[Position] = None, limit: Optional[int] = None,
+                                 chunk_size: int = 1000) -> AsyncIterator[dict]:
+        cursor = self.registrations.find(page_filter(after), REGISTRATION_PROJECTION) \
+            .sort(REGISTRATION_SORT).batch_size(chunk_size)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        async for doc in cursor:
+            yield doc
+
+    async def count_registrations(self) -> int:
+        return await self.registrations.count_documents({})
+
+    async def referral_counts(self) -> Dict[Optional[str], int]:
+        rows = await self.registrations.aggregate(referral_breakdown_pipeline()).to_list(None)
+        return {row["_id"]: row["count"] for row in rows}
+
+    async def insert_status_check(self, document: dict):
+        await self.status_checks.insert_one(dict(document))
+
+    async def list_status_checks(self, limit: int = 1000) -> List[dict]:
+        return await self.status_checks.find({}, STATUS_CHECK_PROJECTION).to_list(limit)
+
+
+class MemoryStorage(RegistrationStorage):
+    """
+    Process-local storage for tests, benchmarks and local runs; nothing is persisted
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._by_email: Dict[str, dict] = {}
+        # (timestamp, id) of every registration, ascending
+        self._order: List[Position] = []
+        self._by_position: Dict[Position, dict] = {}
+        self._referrals: Dict[Optional[str], int] = {}
+        self._status_checks: List[dict] = []
+
+    async def insert_registration(self, document: dict) -> bool:
+        if document["email"] in self._by_email:
+            return False
+        row = {field: document.get(field) for field in REGISTRATION_FIELDS}
+        position = (row["timestamp"], row["id"])
+        self._by_email[row["email"]] = row
+        self._by_position[position] = row
+        bisect.insort(self._order, position)
+        self._referrals[row["referralSource"]] = self._referrals.get(row["referralSource"], 0) + 1
+        return True
+
+    async def insert_registrations(self, documents: List[dict]) -> Dict[int, str]:
+        rejected = {}
+        for index, document in enumerate(documents):
+            if not await self.insert_registration(document):
+                rejected[index] = "duplicate email"
+        return rejected
+
+    async def registration_exists(self, email: str) -> bool:
+        return email in self._by_email
+
+    async def list_registrations(self, after: Optional[Position] = None, limit: int = 100) -> List[dict]:
+        end = bisect.bisect_left(self._order, after) if after else len(self._order)
+        positions = self._order[max(0, end - limit):end]
+        return [dict(self._by_position[position]) for position in reversed(positions)]
+
+    async def count_registrations(self) -> int:
+        return len(self._by_email)
+
+    async def referral_counts(self) -> Dict[Optional[str], int]:
+        return dict(self._referrals)
+
+    async def insert_status_check(self, document: dict):
+        self._status_checks.append({field: document.get(field) for field in STATUS_CHECK_FIELDS})
+
+    async def list_status_checks(self, limit: int = 1000) -> List[dict]:
+        return [dict(doc) for doc in self._status_checks[:limit]]
+
+
+class SQLiteStorage(RegistrationStorage):
+    """
+    Single-file SQLite storage in WAL mode.
+
+    All statements run on one dedicated thread that owns the connection,
+    so the event loop never blocks on disk I/O. Timestamps are stored as
+    fixed-width ISO strings, which sort in time order.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS webinar_registrations (
+            id TEXT PRIMARY KEY,
+            fullName TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE,
+            whatsapp TEXT NOT NULL,
+            referralSource TEXT,
+            timestamp TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS timestamp_desc_id_desc ON webinar_registrations (timestamp DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS referralSource ON webinar_registrations (referralSource)",
+        """CREATE TABLE IF NOT EXISTS status_checks (
+            id TEXT PRIMARY KEY,
+            client_name TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )""",
+    ]
+    INSERT_REGISTRATION = (
+        "INSERT INTO webinar_registrations (id, fullName, email, whatsapp, referralSource, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (email) DO NOTHING"
+    )
+    SELECT_REGISTRATIONS = "SELECT id, fullName, email, whatsapp, referralSource, timestamp FROM webinar_registrations"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    async def initialize(self):
+        await self._run(lambda connection: None)
+
+    async def ping(self):
+        await self._run(lambda connection: connection.execute("SELECT 1"))
+
+    async def close(self):
+        if self._connection is not None:
+            await self._run(lambda connection: connection.close())
+            self._connection = None
+        self._executor.shutdown(wait=True)
+
+    async def insert_registration(self, document: dict) -> bool:
+        return await self._run(lambda connection: connection.execute(
+            self.INSERT_REGISTRATION, self._registration_row(document)
+        ).rowcount == 1)
+
+    async def insert_registrations(self, documents: List[dict]) -> Dict[int, str]:
+        def insert(connection):
+            rejected = {}
+            # One transaction for the whole chunk instead of a commit per row
+            connection.execute("BEGIN")
+            try:
+                for index, document in enumerate(documents):
+                    try:
+                        if connection.execute(self.INSERT_REGISTRATION, self._registration_row(document)).rowcount != 1:
+                            rejected[index] = "duplicate email"
+                    except sqlite3.IntegrityError as e:
+                        rejected[index] = str(e)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            return rejected
+        return await self._run(insert)
+
+    async def registration_exists(self, email: str) -> bool:
+        return await self._run(lambda connection: connection.execute(
+            "SELECT 1 FROM webinar_registrations WHERE email = ?", (email,)
+        ).fetchone() is not None)
+
+    async def list_registrations(self, after: Optional[Position] = None, limit: int = 100) -> List[dict]:
+        if after is None:
+            sql = f"{self.SELECT_REGISTRATIONS} ORDER BY timestamp DESC, id DESC LIMIT ?"
+            params = (limit,)
+        else:
+            timestamp = _timestamp(after[0])
+            sql = (
+                f"{self.SELECT_REGISTRATIONS} WHERE timestamp < ? OR (timestamp = ? AND id < ?) "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?"
+            )
+            params = (timestamp, timestamp, after[1], limit)
+        rows = await self._run(lambda connection: connection.execute(sql, params).fetchall())
+        return [
+            {**dict(zip(REGISTRATION_FIELDS, row)), "timestamp": datetime.fromisoformat(row[5])}
+            for row in rows
+        ]
+
+    async def count_registrations(self) -> int:
+        return await self._run(lambda connection: connection.execute(
+            "SELECT COUNT(*) FROM webinar_registrations"
+        ).fetchone()[0])
+
+    async def referral_counts(self) -> Dict[Optional[str], int]:
+        rows = await self._run(lambda connection: connection.execute(
+            "SELECT referralSource, COUNT(*) FROM webinar_registrations GROUP BY referralSource"
+        ).fetchall())
+        return dict(rows)
+
+    async def insert_status_check(self, document: dict):
+        await self._run(lambda connection: connection.execute(
+            "INSERT INTO status_checks (id, client_name, timestamp) VALUES (?, ?, ?)",
+            (document["id"], document["client_name"], _timestamp(document["timestamp"])),
+        ))
+
+    async def list_status_checks(self, limit: int = 1000) -> List[dict]:
+        rows = await self._run(lambda connection: connection.execute(
+            "SELECT id, client_name, timestamp FROM status_checks ORDER BY rowid LIMIT ?", (limit,)
+        ).fetchall())
+        return [
+            {"id": row[0], "client_name": row[1], "timestamp": datetime.fromisoformat(row[2])}
+            for row in rows
+        ]
+
+    async def _run(self, operation):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, lambda: operation(self._connect())
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Only ever called on the executor thread
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _registration_row(document: dict) -> tuple:
+        return (
+            document["id"],
+            document["fullName"],
+            document["email"],
+            document["whatsapp"],
+            document.get("referralSource"),
+            _timestamp(document["timestamp"]),
+        )
+
+
+def _timestamp(value: datetime) -> str:
+    return value.isoformat(timespec="microseconds")
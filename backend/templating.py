@@ -0,0 +1,126 @@
+import html
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TEMPLATE_DIR = Path(__file__).parent / "templates" / "email"
+
+# {{ field }} or {{ field|default text }}
+_PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*(?:\|([^}]*))?\}\}")
+_BETWEEN_TAGS = re.compile(r">\s*\n\s*<")
+_LINE_BREAKS = re.compile(r"\s*\n\s*")
+
+
+def minify(markup: str) -> str:
+    """
+    Drop indentation and line breaks; whitespace inside text collapses to one space
+    """
+    return _LINE_BREAKS.sub(" ", _BETWEEN_TAGS.sub("><", markup))
+
+
+class EmailTemplate:
+    """
+    A template pre-split into static and dynamic segments.
+
+    Static segments are minified once at load time and kept in a parts
+    list with an empty slot per field. Rendering only HTML-escapes the
+    dynamic fields into their slots and joins the pieces, so the cost per
+    message is proportional to the number of fields, not the size of the
+    markup.
+    """
+
+    def __init__(self, name: str, source: str, version: str):
+        self.name = name
+        self.version = version
+        self.static: List[str] = []
+        self.fields: List[Tuple[str, Optional[str]]] = []
+
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            self.static.append(source[position:match.start()])
+            default = match.group(2)
+            self.fields.append((match.group(1), default.strip() if default is not None else None))
+            position = match.end()
+        self.static.append(source[position:])
+        self.static = [minify(part) for part in self.static]
+        self.static[0] = self.static[0].lstrip()
+        self.static[-1] = self.static[-1].rstrip()
+
+        # Even indexes hold static markup, odd ones are filled per render
+        self._parts: List[str] = [self.static[0]]
+        self._slots: List[Tuple[int, str, str]] = []
+        for i, (field, default) in enumerate(self.fields, start=1):
+            self._slots.append((len(self._parts), field, html.escape(default or "")))
+            self._parts.extend(("", self.static[i]))
+
+    def render(self, context: Dict) -> str:
+        get = context.get
+        parts = self._parts[:]
+        for index, field, default in self._slots:
+            parts[index] = _field(get(field), default)
+        return "".join(parts)
+
+
+class Markup(str):
+    """
+    Trusted HTML (e.g. rendered rows) that templates insert without escaping
+    """
+
+
+def _field(value, default: str) -> str:
+    if value is None:
+        return default
+    if type(value) is Markup:
+        return value
+    return html.escape(value if type(value) is str else str(value))
+
+
+class TemplateRegistry:
+    """
+    Loads and compiles each template once per version.
+
+    The cache key is (name, version). The version comes from
+    EMAIL_TEMPLATE_VERSION; call ``reload`` after editing template files
+    to pick them up without a restart.
+    """
+
+    def __init__(self, directory: Path = TEMPLATE_DIR):
+        self.directory = directory
+        self.version = os.getenv("EMAIL_TEMPLATE_VERSION", "1")
+        self._cache: Dict[Tuple[str, str], EmailTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> EmailTemplate:
+        key = (name, self.version)
+        template = self._cache.get(key)
+        if template is None:
+            with self._lock:
+                template = self._cache.get(key)
+                if template is None:
+                    source = (self.directory / f"{name}.html").read_text(encoding="utf-8")
+                    template = EmailTemplate(name, source, key[1])
+                    self._cache[key] = template
+        return template
+
+    def render(self, name: str, context: Dict) -> str:
+        return self.get(name).render(context)
+
+    def precompile(self):
+        """
+        Compile every template in the directory ahead of the first send
+        """
+        for path in sorted(self.directory.glob("*.html")):
+            self.get(path.stem)
+
+    def reload(self, version: Optional[str] = None):
+        """
+        Switch to a new template version and drop compiled templates
+        """
+        with self._lock:
+            self.version = version or os.getenv("EMAIL_TEMPLATE_VERSION", "1")
+            self._cache.clear()
+
+
+templates = TemplateRegistry()
@@ -0,0 +1,434 @@
+import functools
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    Spans recorded while handling one request (or one background send)
+
+    Spans are (name, start, end) perf_counter readings appended by the
+    code under trace; at most ``max_spans`` are kept. Spans that end after
+    the trace finished (work the request left behind) are dropped.
+    """
+
+    __slots__ = ("name", "kind", "started", "started_at", "ended", "status", "spans", "max_spans",
+                 "handler_started", "handler_ended")
+
+    def __init__(self, name: str, kind: str = "http", max_spans: int = 200):
+        self.name = name
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.ended: Optional[float] = None
+        self.status: Optional[int] = None
+        self.spans: List[Tuple[str, float, float]] = []
+        self.max_spans = max_spans
+        self.handler_started: Optional[float] = None
+        self.handler_ended: Optional[float] = None
+
+    def add(self, name: str, started: float, ended: float):
+        if self.ended is None and len(self.spans) < self.max_spans:
+            self.spans.append((name, started, ended))
+
+    def totals(self) -> Dict[str, float]:
+        """
+        Milliseconds per span name, in order of first start
+        """
+        totals: Dict[str, float] = {}
+        for name, started, ended in sorted(self.spans, key=_span_start):
+            totals[name] = totals.get(name, 0.0) + (ended - started) * 1000
+        return totals
+
+    def server_timing(self, now: float) -> str:
+        entries = [f"{name};dur={ms:.2f}" for name, ms in self.totals().items()]
+        entries.append(f"app;dur={(now - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(((self.ended or time.perf_counter()) - self.started) * 1000, 3),
+            "spans": [
+                {
+                    "name": name,
+                    "offset_ms": round((started - self.started) * 1000, 3),
+                    "duration_ms": round((ended - started) * 1000, 3),
+                }
+                for name, started, ended in sorted(self.spans, key=_span_start)
+            ],
+        }
+
+
+def _span_start(span: Tuple[str, float, float]) -> float:
+    return span[1]
+
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, self.started, time.perf_counter())
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _RootSpan:
+    """
+    A span of the current trace, or a trace of its own when there is none
+    """
+
+    __slots__ = ("tracer", "name", "trace", "token", "started")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.trace = _current.get()
+        self.token = None
+        if self.trace is None or self.trace.ended is not None:
+            self.trace = Trace(self.name, kind="task", max_spans=self.tracer.max_spans)
+            self.token = _current.set(self.trace)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ended = time.perf_counter()
+        self.trace.add(self.name, self.started, ended)
+        if self.token is not None:
+            _current.reset(self.token)
+            self.tracer.finish(self.trace, ended)
+        return False
+
+
+class Tracer:
+    """
+    Per-request span recording with a ring buffer of recent slow traces.
+
+    ``span(name)`` times a block within the current trace; outside a
+    trace it is a shared no-op, and inside one it costs two
+    ``perf_counter`` calls and a list append, so instrumentation can stay
+    in production code. Traces slower than ``slow_ms`` are kept in a
+    ring buffer of the last ``buffer_size``.
+    """
+
+    def __init__(self, enabled: bool = True, slow_ms: float = 250.0, buffer_size: int = 100,
+                 max_spans: int = 200):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.max_spans = max_spans
+        self.slow: Deque[dict] = deque(maxlen=max(1, buffer_size))
+        self.finished = 0
+
+    def configure(self, enabled: Optional[bool] = None, slow_ms: Optional[float] = None,
+                  buffer_size: Optional[int] = None):
+        if enabled is not None:
+            self.enabled = enabled
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if buffer_size is not None and buffer_size != self.slow.maxlen:
+            self.slow = deque(self.slow, maxlen=max(1, buffer_size))
+
+    def finish(self, trace: Trace, ended: Optional[float] = None):
+        trace.ended = ended or time.perf_counter()
+        self.finished += 1
+        # Long-lived streams (SSE) are slow by design
+        if trace.kind != "stream" and (trace.ended - trace.started) * 1000 >= self.slow_ms:
+            self.slow.append(trace.as_dict())
+
+    def span(self, name: str):
+        trace = _current.get()
+        if trace is None or trace.ended is not None:
+            return _NO_SPAN
+        return _Span(trace, name)
+
+    def root_span(self, name: str):
+        """
+        Like ``span``, but starts a trace of its own outside a request (background sends)
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return _RootSpan(self, name)
+
+    def traced(self, name: str):
+        """
+        Decorator running a sync or async function inside ``root_span(name)``
+        """
+        def decorate(function):
+            if inspect.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.root_span(name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.root_span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def slow_traces(self, limit: Optional[int] = None) -> List[dict]:
+        traces = list(reversed(self.slow))
+        return traces[:limit] if limit else traces
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "slow_ms": self.slow_ms,
+            "finished": self.finished,
+            "slow_buffered": len(self.slow),
+            "buffer_size": self.slow.maxlen,
+        }
+
+
+# Configured from the environment by server.py
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a trace per HTTP request
+
+    The spans finished before the response starts are summed per name
+    into a ``Server-Timing`` header, with ``app`` for the time until then.
+    """
+
+    def __init__(self, app, tracer: Tracer = tracer, server_timing: bool = True):
+        self.app = app
+        self.tracer = tracer
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], max_spans=self.tracer.max_spans)
+        token = _current.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        trace.kind = "stream"
+                if self.server_timing:
+                    value = trace.server_timing(time.perf_counter()).encode("latin-1")
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            # Route templates, not raw paths, so traces carry no ids or emails
+            trace.name = f"{scope['method']} {getattr(route, 'path', None) or 'unmatched'}"
+            _current.reset(token)
+            self.tracer.finish(trace)
+
+
+class TracedRoute(APIRoute):
+    """
+    APIRoute that splits each request into ``parse`` (body and pydantic
+    validation), ``handler`` (the endpoint) and ``serialize`` (response
+    model validation and encoding) spans
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _mark_handler(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def traced_route_handler(request):
+            trace = _current.get()
+            if trace is None:
+                return await handler(request)
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                ended = time.perf_counter()
+                if trace.handler_started is not None:
+                    trace.add("parse", started, trace.handler_started)
+                    if trace.handler_ended is not None:
+                        trace.add("serialize", trace.handler_ended, ended)
+                else:
+                    # Rejected before the endpoint ran (validation error, auth)
+                    trace.add("parse", started, ended)
+
+        return traced_route_handler
+
+
+def _mark_handler(endpoint):
+    # include_router() builds the routes again from the already wrapped endpoints
+    if getattr(endpoint, "_marks_handler", False):
+        return endpoint
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_endpoint(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return await endpoint(*args, **kwargs)
+            trace.handler_started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                trace.handler_ended = time.perf_counter()
+                trace.add("handler", trace.handler_started, trace.handler_ended)
+        async_endpoint._marks_handler = True
+        return async_endpoint
+
+    @functools.wraps(endpoint)
+    def sync_endpoint(*args, **kwargs):
+        trace = _current.get()
+        if trace is None:
+            return endpoint(*args, **kwargs)
+        trace.handler_started = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            trace.handler_ended = time.perf_counter()
+            trace.add("handler", trace.handler_started, trace.handler_ended)
+    sync_endpoint._marks_handler = True
+    return sync_endpoint
+
+
+class TracedLogHandler(logging.Handler):
+    """
+    Wraps a logging handler so time spent emitting records shows up as a ``logging`` span
+    """
+
+    def __init__(self, handler: logging.Handler):
+        super().__init__(handler.level)
+        self.handler = handler
+
+    def handle(self, record):
+        with tracer.span("logging"):
+            return self.handler.handle(record)
+
+    def setFormatter(self, fmt):
+        self.handler.setFormatter(fmt)
+
+    def close(self):
+        self.handler.close()
+        super().close()
+
+
+def trace_logging(logger: logging.Logger = logging.getLogger()):
+    logger.handlers = [
+        handler if isinstance(handler, TracedLogHandler) else TracedLogHandler(handler)
+        for handler in logger.handlers
+    ]
+
+
+# (file, function) of the leaf frame of threads that are waiting, not working
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    """
+    Stack-sampling profiler for every thread of the process.
+
+    ``run`` samples ``sys._current_frames()`` every ``interval`` seconds
+    from its own thread and returns collapsed stacks (``thread;outer;...;leaf
+    count`` per line, the input format of flamegraph.pl and speedscope).
+    The sampled code is not instrumented; each sample costs one walk of
+    the thread stacks under the GIL. Only one profile runs at a time.
+    """
+
+    def __init__(self, max_seconds: float = 60.0, min_interval: float = 0.001, max_depth: int = 128):
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval: float = 0.01, include_idle: bool = False) -> Tuple[str, int]:
+        """
+        Sample for ``seconds``; returns (collapsed stacks, number of samples)
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            seconds = min(max(seconds, 0.0), self.max_seconds)
+            interval = max(interval, self.min_interval)
+            me = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if not include_idle:
+                        code = frame.f_code
+                        if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                            continue
+                    thread = names.get(ident, f"thread-{ident}").replace(";", ":").replace(" ", "_")
+                    stacks[";".join([thread] + self._collapse(frame))] += 1
+                samples += 1
+                time.sleep(interval)
+            return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()), samples
+        finally:
+            self._lock.release()
+
+    def _collapse(self, frame) -> List[str]:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            name = f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}"
+            stack.append(name.replace(";", ":").replace(" ", "_"))
+            frame = frame.f_back
+        stack.reverse()
+        return stack
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class InsertBatcher:
+    """
+    Group-commit writer for one collection.
+
+    Concurrent callers hand documents to ``insert``; they are written
+    with ``insert_many(ordered=False)`` and every caller gets its own
+    outcome back (``None`` or the per-document error). While a batch is
+    being written the next one accumulates, so an idle system flushes a
+    lone document immediately (same latency as ``insert_one``) and a busy
+    one writes up to ``max_batch`` documents per round trip. A positive
+    ``max_delay`` additionally lingers before flushing a partial batch.
+    """
+
+    def __init__(self, collection, max_batch: int = 500, max_delay: float = 0.0):
+        self.collection = collection
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._queue: List[Tuple[dict, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.batches_written = 0
+        self.documents_written = 0
+
+    async def insert(self, document: dict):
+        """
+        Insert one document as part of the next batch
+
+        Raises:
+            DuplicateKeyError: if the document violates a unique index
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((document, future))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._run())
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "max_delay": self.max_delay,
+            "queued": len(self._queue),
+            "batches_written": self.batches_written,
+            "documents_written": self.documents_written,
+        }
+
+    async def close(self):
+        if self._flusher is not None:
+            await self._flusher
+
+    async def _run(self):
+        try:
+            while self._queue:
+                if self.max_delay and len(self._queue) < self.max_batch:
+                    await asyncio.sleep(self.max_delay)
+                batch = self._queue[:self.max_batch]
+                del self._queue[:self.max_batch]
+                await self._flush(batch)
+        finally:
+            self._flusher = None
+
+    async def _flush(self, batch: List[Tuple[dict, asyncio.Future]]):
+        errors = {}
+        try:
+            # insert_many adds _id to what it is given; keep the callers' dicts untouched
+            await self.collection.insert_many([dict(document) for document, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == DUPLICATE_KEY_ERROR:
+                    errors[error["index"]] = DuplicateKeyError(error.get("errmsg", ""), DUPLICATE_KEY_ERROR, error)
+                else:
+                    errors[error["index"]] = OperationFailure(error.get("errmsg", ""), error.get("code"), error)
+        except Exception as e:
+            logger.error(f"Batched insert of {len(batch)} documents failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_written += 1
+        self.documents_written += len(batch) - len(errors)
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
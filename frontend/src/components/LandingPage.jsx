@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Helmet } from 'react-helmet-async';
 import { Button } from './ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from './ui/card';
@@ -29,6 +29,8 @@ import { webinarData, formFields } from '../data/mockData';
 const LandingPage = () => {
   const [formData, setFormData] = useState({});
   const [isSubmitting, setIsSubmitting] = useState(false);
+  // One key per form fill, so resubmits and retries are replayed by the backend
+  const idempotencyKey = useRef(null);
   const [timeLeft, setTimeLeft] = useState({ days: 0, hours: 0, minutes: 0, seconds: 0 });
   const [webinarStats, setWebinarStats] = useState({
     totalRegistrations: 0,
@@ -60,28 +62,43 @@ const LandingPage = () => {
     return () => clearInterval(timer);
   }, []);
 
-  // Fetch real-time webinar stats
+  // Real-time webinar stats, pushed by the server over Server-Sent Events
   useEffect(() => {
-    const fetchStats = async () => {
-      try {
-        const backendUrl = process.env.REACT_APP_BACKEND_URL || import.meta.env.REACT_APP_BACKEND_URL;
-        const response = await fetch(`${backendUrl}/api/webinar-stats`);
-        if (response.ok) {
-          const stats = await response.json();
-          setWebinarStats({
-            totalRegistrations: stats.total_registrations || 0,
-            availableSeats: stats.available_seats || 100
-          });
+    const backendUrl = process.env.REACT_APP_BACKEND_URL || import.meta.env.REACT_APP_BACKEND_URL;
+    const applyStats = (stats) => {
+      setWebinarStats({
+        totalRegistrations: stats.total_registrations || 0,
+        availableSeats: stats.available_seats ?? 100
+      });
+    };
+
+    if (typeof EventSource === 'undefined') {
+      // Browsers without SSE fall back to polling
+      const fetchStats = async () => {
+        try {
+          const response = await fetch(`${backendUrl}/api/webinar-stats`);
+          if (response.ok) {
+            applyStats(await response.json());
+          }
+        } catch (error) {
+          console.error('Failed to fetch webinar stats:', error);
         }
+      };
+      fetchStats();
+      const statsInterval = setInterval(fetchStats, 30000);
+      return () => clearInterval(statsInterval);
+    }
+
+    // EventSource reconnects on its own after errors and server-side stream ends
+    const source = new EventSource(`${backendUrl}/api/webinar-stats/stream`);
+    source.addEventListener('stats', (event) => {
+      try {
+        applyStats(JSON.parse(event.data));
       } catch (error) {
-        console.error('Failed to fetch webinar stats:', error);
+        console.error('Invalid webinar stats event:', error);
       }
-    };
-    
-    fetchStats();
-    // Refresh stats every 30 seconds
-    const statsInterval = setInterval(fetchStats, 30000);
-    return () => clearInterval(statsInterval);
+    });
+    return () => source.close();
   }, []);
 
   const scrollToForm = () => {
@@ -90,6 +107,7 @@ const LandingPage = () => {
 
   const handleInputChange = (field, value) => {
     setFormData(prev => ({ ...prev, [field]: value }));
+    idempotencyKey.current = null;
   };
 
   const handleFormSubmit = async (e) => {
@@ -100,10 +118,15 @@ const LandingPage = () => {
       // Get the backend URL from environment variable
       const backendUrl = process.env.REACT_APP_BACKEND_URL || import.meta.env.REACT_APP_BACKEND_URL;
       
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = window.crypto?.randomUUID?.() || `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+
       const response = await fetch(`${backendUrl}/api/webinar-register`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey.current,
         },
         body: JSON.stringify(formData),
       });
@@ -112,7 +135,7 @@ const LandingPage = () => {
       
       if (response.ok) {
         toast({
-          title: "Registration Successful! 🎉",
+          title: result.status === 'waitlisted' ? "You're on the Waitlist" : "Registration Successful! 🎉",
           description: result.message || "Welcome aboard! Check your email for the webinar link and calendar invite.",
         });
         
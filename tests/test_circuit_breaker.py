@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, backoff_delay
+
+
+def trip(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure("timeout")
+
+
+def test_consecutive_failures_open_the_circuit_and_success_resets_the_count():
+    breaker = CircuitBreaker("sendgrid", failure_threshold=3, reset_seconds=60)
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    breaker.record_success()
+    breaker.record_failure("timeout")
+    breaker.record_failure("timeout")
+    assert breaker.state == CLOSED
+
+    breaker.record_failure("timeout")
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert 0 < breaker.retry_after() <= 60
+    stats = breaker.stats()
+    assert (stats["times_opened"], stats["rejected_calls"], stats["last_error"]) == (1, 1, "timeout")
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit():
+    breaker = CircuitBreaker("sendgrid", failure_threshold=1, reset_seconds=0.01)
+    trip(breaker)
+    time.sleep(0.02)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure("still down")
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_unreported_probe_slot_is_handed_out_again_after_the_reset_time():
+    breaker = CircuitBreaker("sendgrid", failure_threshold=1, reset_seconds=0.01)
+    trip(breaker)
+    time.sleep(0.02)
+    assert breaker.allow()
+    time.sleep(0.02)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+
+@pytest.mark.parametrize("attempt", [0, 1, 4])
+def test_backoff_is_jittered_between_half_and_full_delay(attempt):
+    delays = [backoff_delay(attempt, 2.0, cap=20.0) for _ in range(200)]
+    full = min(20.0, 2.0 * 2 ** attempt)
+    assert all(full / 2 <= delay <= full for delay in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+import email_batching
+from email_batching import ConfirmationBatcher
+from emails import EmailDeliveryError, EmailRejectedError
+
+
+@pytest.fixture
+def sendgrid(monkeypatch):
+    """
+    Stand-ins for the SendGrid senders; returns the recorded batches and single sends
+    """
+    sent = {"batches": [], "singles": [], "batch_error": None}
+
+    async def send_batch(recipients):
+        sent["batches"].append([email for email, _ in recipients])
+        if sent["batch_error"] is not None:
+            raise sent["batch_error"]
+        return True
+
+    async def send_one(email, name):
+        sent["singles"].append(email)
+        if email.startswith("bad"):
+            raise EmailRejectedError("invalid address", 400)
+        return True
+
+    monkeypatch.setattr(email_batching, "async_send_webinar_confirmation_batch", send_batch)
+    monkeypatch.setattr(email_batching, "async_send_webinar_confirmation_email", send_one)
+    return sent
+
+
+def recipients(*emails):
+    return [(email, email.split("@")[0]) for email in emails]
+
+
+def test_recipients_are_sent_in_full_batches(sendgrid):
+    async def main():
+        batcher = ConfirmationBatcher(window_seconds=0.01, max_recipients=500)
+        results = await batcher.submit_many(recipients(*(f"user{i}@example.com" for i in range(700))))
+        assert results == [True] * 700
+        assert [len(batch) for batch in sendgrid["batches"]] == [500, 200]
+        assert batcher.stats()["recipients_sent"] == 700
+
+    asyncio.run(main())
+
+
+def test_rejected_batch_is_split_so_only_bad_recipients_fail(sendgrid):
+    async def main():
+        sendgrid["batch_error"] = EmailRejectedError("bad request", 400)
+        batcher = ConfirmationBatcher(window_seconds=0.01)
+        results = await batcher.submit_many(recipients("ok1@example.com", "bad@example.com", "ok2@example.com"))
+
+        assert results[0] is True and results[2] is True
+        assert isinstance(results[1], EmailRejectedError)
+        assert sendgrid["singles"] == ["ok1@example.com", "bad@example.com", "ok2@example.com"]
+        assert batcher.stats()["batches_split"] == 1
+        assert batcher.stats()["recipients_sent"] == 2
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("error", [EmailRejectedError("forbidden", 403), EmailDeliveryError("timeout")])
+def test_account_rejections_and_transient_errors_fail_the_whole_batch(sendgrid, error):
+    async def main():
+        sendgrid["batch_error"] = error
+        batcher = ConfirmationBatcher(window_seconds=0.01)
+        results = await batcher.submit_many(recipients("a@example.com", "b@example.com"))
+
+        assert results == [error, error]
+        assert sendgrid["singles"] == []
+        with pytest.raises(type(error)):
+            await batcher.submit("c@example.com", "c")
+
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from idempotency import (
+    IdempotencyCache,
+    IdempotencyKeyReused,
+    MemoryIdempotencyStore,
+    MongoIdempotencyStore,
+    request_fingerprint,
+)
+
+
+def counting_operation():
+    calls = []
+
+    async def operation():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return {"status": "success", "call": len(calls)}
+
+    return operation, calls
+
+
+def test_fingerprint_ignores_key_order():
+    assert request_fingerprint({"a": 1, "b": 2}) == request_fingerprint({"b": 2, "a": 1})
+    assert request_fingerprint({"a": 1}) != request_fingerprint({"a": 2})
+
+
+def test_repeated_key_replays_and_different_body_is_rejected():
+    async def main():
+        cache = IdempotencyCache(MemoryIdempotencyStore())
+        operation, calls = counting_operation()
+
+        assert await cache.run("key", "body-1", operation) == ({"status": "success", "call": 1}, False)
+        assert await cache.run("key", "body-1", operation) == ({"status": "success", "call": 1}, True)
+        with pytest.raises(IdempotencyKeyReused):
+            await cache.run("key", "body-2", operation)
+
+        assert len(calls) == 1
+        assert cache.stats()["replayed"] == 1
+        assert cache.stats()["conflicts"] == 1
+
+    asyncio.run(main())
+
+
+def test_concurrent_requests_with_one_key_run_the_operation_once():
+    async def main():
+        cache = IdempotencyCache(MemoryIdempotencyStore())
+        operation, calls = counting_operation()
+
+        results = await asyncio.gather(*(cache.run("key", "body", operation) for _ in range(5)))
+
+        assert len(calls) == 1
+        assert sorted(replayed for _, replayed in results) == [False, True, True, True, True]
+        assert cache.stats()["in_flight"] == 0
+
+    asyncio.run(main())
+
+
+def test_failed_operation_is_not_stored():
+    async def main():
+        cache = IdempotencyCache(MemoryIdempotencyStore())
+
+        async def failing():
+            raise RuntimeError("database down")
+
+        with pytest.raises(RuntimeError):
+            await cache.run("key", "body", failing)
+        operation, calls = counting_operation()
+        assert await cache.run("key", "body", operation) == ({"status": "success", "call": 1}, False)
+
+    asyncio.run(main())
+
+
+def test_shared_store_replays_across_workers_and_skips_unfingerprinted_records():
+    async def main():
+        collection = AsyncMongoMockClient()["idempotency_test"]["idempotency_keys"]
+        first = IdempotencyCache(MemoryIdempotencyStore(), MongoIdempotencyStore(collection))
+        second = IdempotencyCache(MemoryIdempotencyStore(), MongoIdempotencyStore(collection))
+        operation, calls = counting_operation()
+
+        await first.run("key", "body", operation)
+        assert await second.run("key", "body", operation) == ({"status": "success", "call": 1}, True)
+        with pytest.raises(IdempotencyKeyReused):
+            await second.run("key", "other-body", operation)
+
+        await collection.insert_one({
+            "_id": "legacy",
+            "response": {"status": "stale"},
+            "expires_at": datetime.utcnow() + timedelta(hours=1),
+        })
+        assert await second.run("legacy", "body", operation) == ({"status": "success", "call": 2}, False)
+
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from circuit_breaker import CircuitOpenError
+from outbox import FAILED, PENDING, SENDING, SENT, EmailOutbox, LocalEmailQueue
+
+
+def outbox_collection():
+    return AsyncMongoMockClient()["outbox_test"]["email_outbox"]
+
+
+async def settle(outbox, condition, timeout: float = 2.0):
+    """
+    Let the outbox work until ``condition(stats)`` holds
+    """
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        stats = await outbox.stats()
+        if condition(stats) or asyncio.get_running_loop().time() > deadline:
+            return stats
+        await asyncio.sleep(0.01)
+
+
+def test_messages_are_delivered_and_kept_for_the_retention_period():
+    async def main():
+        collection = outbox_collection()
+        sent = []
+
+        async def handler(user_email):
+            sent.append(user_email)
+
+        outbox = EmailOutbox(collection, {"welcome": handler}, poll_interval=0.01,
+                             sent_retention_days=7, failed_retention_days=30)
+        await outbox.start()
+        await outbox.enqueue_many([("welcome", {"user_email": f"user{i}@example.com"}) for i in range(3)])
+        stats = await settle(outbox, lambda stats: stats["sent"] == 3)
+        await outbox.stop()
+
+        assert sorted(sent) == [f"user{i}@example.com" for i in range(3)]
+        assert stats["queue_depth"] == 0
+        doc = await collection.find_one({"status": SENT})
+        assert doc["sent_at"] is not None and doc["attempts"] == 1
+
+        indexes = await collection.index_information()
+        assert indexes["sent_at_ttl"]["expireAfterSeconds"] == 7 * 86400
+        assert indexes["failed_at_ttl"]["expireAfterSeconds"] == 30 * 86400
+        assert indexes["failed_at_ttl"]["partialFilterExpression"] == {"status": FAILED}
+
+    asyncio.run(main())
+
+
+def test_failed_sends_are_retried_then_marked_failed():
+    async def main():
+        collection = outbox_collection()
+        calls = []
+
+        async def handler(user_email):
+            calls.append(user_email)
+            raise RuntimeError("provider down")
+
+        outbox = EmailOutbox(collection, {"welcome": handler}, max_attempts=3, poll_interval=0.01, backoff_seconds=0)
+        await outbox.start()
+        await outbox.enqueue("welcome", {"user_email": "ada@example.com"})
+        await settle(outbox, lambda stats: stats["failed"] == 1)
+        await outbox.stop()
+
+        doc = await collection.find_one({})
+        assert len(calls) == 3
+        assert doc["status"] == FAILED
+        assert doc["attempts"] == 3
+        assert doc["failed_at"] is not None
+        assert doc["last_error"] == "provider down"
+
+    asyncio.run(main())
+
+
+def test_expired_lease_is_claimed_again_and_live_one_is_not():
+    async def main():
+        collection = outbox_collection()
+        outbox = EmailOutbox(collection, {})
+        now = datetime.utcnow()
+        expired = EmailOutbox.build_message("welcome", {})
+        expired.update(status=SENDING, attempts=1, lease_expires_at=now - timedelta(seconds=1))
+        leased = EmailOutbox.build_message("welcome", {})
+        leased.update(status=SENDING, attempts=1, lease_expires_at=now + timedelta(minutes=1))
+        later = EmailOutbox.build_message("welcome", {}, not_before=now + timedelta(minutes=1))
+        await collection.insert_many([expired, leased, later])
+
+        claimed = await outbox._claim()
+        assert claimed["id"] == expired["id"]
+        assert claimed["attempts"] == 2
+        assert claimed["lease_expires_at"] > now
+        assert await outbox._claim() is None
+
+    asyncio.run(main())
+
+
+def test_batch_kinds_are_claimed_together_and_failures_retried_alone():
+    async def main():
+        collection = outbox_collection()
+        batches = []
+
+        async def send_batch(payloads):
+            batches.append(len(payloads))
+            return [RuntimeError("rejected") if payload["user_email"] == "bad@example.com" else True
+                    for payload in payloads]
+
+        outbox = EmailOutbox(collection, {}, batch_handlers={"confirmation": send_batch}, batch_size=4,
+                             concurrency=1, poll_interval=0.01, backoff_seconds=60)
+        emails = [f"user{i}@example.com" for i in range(5)] + ["bad@example.com"]
+        await outbox.enqueue_many([("confirmation", {"user_email": email}) for email in emails])
+        await outbox.start()
+        stats = await settle(outbox, lambda stats: stats["sent"] == 5 and stats["sending"] == 0)
+        await outbox.stop()
+
+        assert batches == [4, 2]
+        assert stats["pending"] == 1
+        retry = await collection.find_one({"status": PENDING})
+        assert retry["payload"]["user_email"] == "bad@example.com"
+        assert retry["next_attempt_at"] > datetime.utcnow()
+
+    asyncio.run(main())
+
+
+def test_local_queue_sends_batch_kinds_through_the_batch_handler():
+    async def main():
+        sent, batches = [], []
+
+        async def handler(user_email):
+            sent.append(user_email)
+
+        async def send_batch(payloads):
+            batches.append(payloads)
+            return [True] * len(payloads)
+
+        queue = LocalEmailQueue({"welcome": handler}, concurrency=2, batch_handlers={"confirmation": send_batch})
+        await queue.enqueue_many([("welcome", {"user_email": "a@example.com"}),
+                                  ("confirmation", {"user_email": "b@example.com"})])
+        await queue.stop()
+
+        assert sent == ["a@example.com"]
+        assert batches == [[{"user_email": "b@example.com"}]]
+        assert (await queue.stats())["sent"] == 2
+
+    asyncio.run(main())
+
+
+def test_circuit_refusal_defers_without_using_an_attempt():
+    async def main():
+        collection = outbox_collection()
+        outbox = EmailOutbox(collection, {}, backoff_seconds=1)
+        message = EmailOutbox.build_message("welcome", {})
+        message.update(status=SENDING, attempts=1)
+        await collection.insert_one(message)
+
+        await outbox._fail(message, CircuitOpenError("open", retry_after=30))
+
+        doc = await collection.find_one({"id": message["id"]})
+        assert doc["status"] == PENDING
+        assert doc["attempts"] == 0
+        assert doc["next_attempt_at"] >= datetime.utcnow() + timedelta(seconds=29)
+
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from rate_limit import ClientBuckets, LoopLagMonitor, RateLimiter, RateLimitMiddleware, TokenBucket
+
+
+def test_bucket_allows_a_burst_then_refills_at_its_rate():
+    bucket = TokenBucket(rate=2.0, capacity=3, now=0.0)
+    assert [bucket.take(0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0.0
+    # Idle time never fills the bucket beyond its capacity
+    assert [bucket.take(100.0) for _ in range(4)][-1] > 0
+
+
+def test_client_buckets_forget_the_least_recently_seen_client():
+    buckets = ClientBuckets(rate=1.0, burst=1, max_clients=2)
+    buckets.take("a", 0.0)
+    buckets.take("b", 0.0)
+    buckets.take("a", 0.0)
+    buckets.take("c", 0.0)
+    assert len(buckets) == 2
+    # "b" was evicted, so it starts over with a full bucket
+    assert buckets.take("b", 0.0) == 0.0
+    assert buckets.take("c", 0.0) > 0
+
+
+def test_limiter_checks_the_client_then_the_global_bucket():
+    limiter = RateLimiter(per_client_rate=0.001, per_client_burst=1, global_rate=0.001, global_burst=2)
+    assert limiter.check("1.1.1.1") == (0, 0.0)
+    assert limiter.check("1.1.1.1")[0] == 429
+    assert limiter.check("2.2.2.2") == (0, 0.0)
+    assert limiter.check(None)[0] == 429
+    assert limiter.stats()["rejected"] == 2
+
+
+def test_limiter_sheds_load_while_the_loop_lags():
+    monitor = LoopLagMonitor()
+    monitor.lag = 0.5
+    limiter = RateLimiter(lag_monitor=monitor, max_loop_lag=0.2)
+    assert limiter.check("1.1.1.1") == (503, 1.0)
+    assert limiter.stats()["shed"] == 1
+
+
+def scope(peer="10.0.0.1", forwarded=()):
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/webinar-register",
+        "client": (peer, 1234),
+        "headers": [(b"x-forwarded-for", value.encode()) for value in forwarded],
+    }
+
+
+@pytest.mark.parametrize("hops, forwarded, expected", [
+    (None, ["1.1.1.1"], None),
+    (0, ["1.1.1.1"], "10.0.0.1"),
+    (1, ["6.6.6.6, 1.1.1.1"], "1.1.1.1"),
+    # Repeated headers are read as one list; entries left of the trusted hops are the client's own
+    (2, ["6.6.6.6, 1.1.1.1", "172.16.0.1"], "1.1.1.1"),
+    # Fewer entries than trusted hops: fall back to the socket peer
+    (2, ["1.1.1.1"], "10.0.0.1"),
+    (1, [], "10.0.0.1"),
+])
+def test_client_key_trusts_only_the_configured_proxy_hops(hops, forwarded, expected):
+    middleware = RateLimitMiddleware(None, RateLimiter(), [], trusted_proxy_hops=hops)
+    assert middleware._client_key(scope(forwarded=forwarded)) == expected
+
+
+def test_middleware_rejects_limited_routes_with_retry_after():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def main():
+        limiter = RateLimiter(per_client_rate=0.5, per_client_burst=1)
+        middleware = RateLimitMiddleware(app, limiter, [("POST", "/api/webinar-register")], trusted_proxy_hops=0)
+        statuses, headers = [], []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+                headers.append(dict(message["headers"]))
+
+        for _ in range(2):
+            await middleware(scope(), None, send)
+        await middleware({**scope(), "path": "/api/webinar-stats", "method": "GET"}, None, send)
+
+        assert statuses == [200, 429, 200]
+        assert headers[1][b"retry-after"] == b"2"
+
+    asyncio.run(main())
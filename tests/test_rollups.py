@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from mongomock_motor import AsyncMongoMockClient
+
+from rollups import BACKFILL_MARKER, LocalReferralRollups, ReferralRollups, as_naive_utc, bucket_hour
+from storage import MemoryStorage
+
+
+def registration(timestamp: datetime, referral_source=None) -> dict:
+    return {"timestamp": timestamp, "referralSource": referral_source}
+
+
+def by_source(result: dict) -> dict:
+    return {row["_id"]: row["count"] for row in result["channels"]}
+
+
+def test_aware_datetimes_become_naive_utc():
+    aware = datetime(2026, 1, 1, 14, 30, tzinfo=timezone(timedelta(hours=2)))
+    assert as_naive_utc(aware) == datetime(2026, 1, 1, 12, 30)
+    assert as_naive_utc(datetime(2026, 1, 1, 12, 30)) == datetime(2026, 1, 1, 12, 30)
+
+
+def test_backfill_sets_closed_hours_and_leaves_recent_ones_to_record():
+    async def main():
+        db = AsyncMongoMockClient()["rollups_test"]
+        now = datetime.utcnow()
+        old = bucket_hour(now) - timedelta(hours=3)
+        await db.webinar_registrations.insert_many([
+            registration(old, "LinkedIn"),
+            registration(old + timedelta(minutes=10), "LinkedIn"),
+            registration(old + timedelta(minutes=20)),
+            # Within the margin: left to the live increments
+            registration(now - timedelta(seconds=30), "LinkedIn"),
+        ])
+        rollups = ReferralRollups(db.registration_rollups, db.webinar_registrations)
+
+        await rollups.initialize()
+        marker = await db.registration_rollups.find_one({"_id": BACKFILL_MARKER})
+        assert marker["state"] == "done"
+        assert marker["cutoff"] <= bucket_hour(now - timedelta(seconds=rollups.backfill_margin_seconds))
+
+        await rollups.record(registration(now, "Friend"))
+        # A second backfill sets the same counts instead of adding to them
+        await rollups.rebuild()
+        result = await rollups.query(old, now + timedelta(hours=1))
+        assert by_source(result) == {"LinkedIn": 2, None: 1, "Friend": 1}
+
+    asyncio.run(main())
+
+
+def test_only_one_worker_backfills_unless_the_lease_ran_out():
+    async def main():
+        db = AsyncMongoMockClient()["rollups_test"]
+        first = ReferralRollups(db.registration_rollups, db.webinar_registrations)
+        second = ReferralRollups(db.registration_rollups, db.webinar_registrations)
+
+        assert await first._claim_backfill()
+        assert not await second._claim_backfill()
+
+        await db.registration_rollups.update_one(
+            {"_id": BACKFILL_MARKER},
+            {"$set": {"started_at": datetime.utcnow() - timedelta(seconds=second.backfill_lease_seconds + 1)}},
+        )
+        assert await second._claim_backfill()
+
+    asyncio.run(main())
+
+
+def test_local_rebuild_keeps_registrations_recorded_meanwhile():
+    async def main():
+        storage = MemoryStorage()
+        now = datetime.utcnow()
+        old = now - timedelta(hours=2)
+        await storage.insert_registrations([
+            {"id": "1", "email": "one@example.com", "timestamp": old, "referralSource": "LinkedIn"},
+            {"id": "2", "email": "two@example.com", "timestamp": old, "referralSource": None},
+        ])
+        rollups = LocalReferralRollups(storage)
+        iterate = storage.iter_registrations
+
+        async def record_while_reading(*args, **kwargs):
+            async for document in iterate(*args, **kwargs):
+                yield document
+                await rollups.record(registration(datetime.utcnow(), "Friend"))
+
+        storage.iter_registrations = record_while_reading
+        await rollups.rebuild()
+
+        result = await rollups.query(old - timedelta(hours=1), datetime.utcnow() + timedelta(hours=1))
+        assert by_source(result) == {"LinkedIn": 1, None: 1, "Friend": 2}
+
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from seats import LocalSeatAllocator, SeatAllocator
+from storage import MemoryStorage
+
+
+@pytest.fixture(params=["mongo", "local"])
+def make_allocator(request):
+    """
+    Build allocators of each kind over one shared database or storage
+    """
+    db = AsyncMongoMockClient()["seats_test"]
+    storage = MemoryStorage()
+
+    async def make(capacity: int, existing: int = 0):
+        if request.param == "mongo":
+            if existing:
+                await db.webinar_registrations.insert_many([{"email": f"old{i}@example.com"} for i in range(existing)])
+            allocator = SeatAllocator(db, capacity=capacity)
+        else:
+            if existing:
+                await storage.insert_registrations([
+                    {"id": str(i), "email": f"old{i}@example.com", "timestamp": None} for i in range(existing)
+                ])
+            allocator = LocalSeatAllocator(storage, capacity=capacity)
+        await allocator.initialize()
+        return allocator
+
+    return make
+
+
+def test_concurrent_reservations_never_oversell(make_allocator):
+    async def main():
+        allocator = await make_allocator(capacity=10, existing=3)
+        taken = await asyncio.gather(*(allocator.reserve() for _ in range(20)))
+
+        assert taken.count(True) == 7
+        assert await allocator.reserve_many(5) == 0
+        stats = await allocator.stats()
+        assert (stats["reserved"], stats["available"]) == (10, 0)
+
+    asyncio.run(main())
+
+
+def test_bulk_reservation_takes_what_is_left_and_release_returns_seats(make_allocator):
+    async def main():
+        allocator = await make_allocator(capacity=10)
+        assert await allocator.reserve_many(4) == 4
+        assert await allocator.reserve_many(10) == 6
+        await allocator.release(2)
+        assert await allocator.reserve()
+        stats = await allocator.stats()
+        assert (stats["reserved"], stats["available"]) == (9, 1)
+
+    asyncio.run(main())
+
+
+def test_waitlist_keeps_one_entry_per_email_in_arrival_order(make_allocator):
+    async def main():
+        allocator = await make_allocator(capacity=0)
+        assert not await allocator.reserve()
+        assert await allocator.join_waitlist({"email": "first@example.com"}) == 1
+        await asyncio.sleep(0.001)
+        assert await allocator.join_waitlist({"email": "second@example.com"}) == 2
+        assert await allocator.join_waitlist({"email": "first@example.com"}) == 1
+        assert (await allocator.stats())["waitlisted"] == 2
+
+    asyncio.run(main())
+
+
+def test_changed_capacity_applies_to_the_existing_counter():
+    async def main():
+        db = AsyncMongoMockClient()["seats_test"]
+        first = SeatAllocator(db, capacity=5)
+        await first.initialize()
+        assert await first.reserve_many(5) == 5
+
+        raised = SeatAllocator(db, capacity=8)
+        await raised.initialize()
+        assert await raised.reserve_many(10) == 3
+        assert await raised.stats() == {"capacity": 8, "reserved": 8, "available": 0, "waitlisted": 0}
+
+    asyncio.run(main())
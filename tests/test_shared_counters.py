@@ -0,0 +1,100 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+import serve
+from shared_counters import SharedCounters, SharedCountersFull
+from stats_cache import TOTAL_KEY, WebinarStatsCache
+from storage import MemoryStorage
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """
+    Two handles on one counters file, each holding its own worker row
+    """
+    path = str(tmp_path / "counters")
+    SharedCounters.create(path, max_workers=2, max_keys=8, max_slots=16).close()
+    opened = [SharedCounters.open(path) for _ in range(2)]
+    for counters in opened:
+        counters.claim_worker()
+    yield opened
+    for counters in opened:
+        counters.close()
+
+
+def test_totals_sum_every_worker_row(workers):
+    first, second = workers
+    assert {first.worker, second.worker} == {0, 1}
+
+    first.add(first.slot("stats:registrations"), 2)
+    second.add(second.slot("stats:registrations"))
+    assert first.value("stats:registrations") == second.value("stats:registrations") == 3
+    assert first.slot("stats:registrations") == second.slot("stats:registrations")
+
+
+def test_rebase_sets_the_total_and_keeps_later_increments(workers):
+    first, second = workers
+    offset = first.slot(TOTAL_KEY)
+    first.add(offset, 5)
+    second.rebase({TOTAL_KEY: 2}, prefix="stats:")
+    assert first.value(TOTAL_KEY) == 2
+
+    second.add(second.slot(TOTAL_KEY))
+    assert first.value(TOTAL_KEY) == 3
+
+
+def test_rows_and_keys_are_bounded(workers):
+    third = SharedCounters.open(workers[0].path)
+    with pytest.raises(SharedCountersFull):
+        third.claim_worker()
+    third.close()
+    with pytest.raises(SharedCountersFull):
+        workers[0].slot("wide", width=17)
+    with pytest.raises(ValueError):
+        workers[0].slot("x" * 249)
+
+
+def test_released_row_is_claimed_again(workers):
+    first, _ = workers
+    row = first.worker
+    first.release_worker()
+    third = SharedCounters.open(first.path)
+    assert third.claim_worker() == row
+    third.close()
+
+
+def test_stats_cache_shares_only_the_total(workers):
+    async def main():
+        storage = MemoryStorage()
+        caches = [WebinarStatsCache(storage, capacity=10, shared=counters) for counters in workers]
+        for cache in caches:
+            await cache.load()
+
+        caches[0].record_registration("LinkedIn")
+        caches[1].record_registration("नमस्ते" * 40)
+        snapshots = [await cache.snapshot() for cache in caches]
+
+        assert [snapshot["total_registrations"] for snapshot in snapshots] == [2, 2]
+        assert [snapshot["available_seats"] for snapshot in snapshots] == [8, 8]
+        assert snapshots[0]["referral_breakdown"] == [{"_id": "LinkedIn", "count": 1}]
+        assert list(workers[0].keys()) == [TOTAL_KEY]
+
+    asyncio.run(main())
+
+
+def test_counters_files_of_dead_servers_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(serve, "counters_directory", lambda: str(tmp_path))
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    stale = tmp_path / f"{serve.COUNTERS_FILE_PREFIX}{exited.stdout.strip()}"
+    live = tmp_path / f"{serve.COUNTERS_FILE_PREFIX}{os.getpid()}"
+    stale.touch()
+    live.touch()
+
+    serve.remove_stale_counters()
+
+    assert not stale.exists()
+    assert live.exists()
@@ -0,0 +1,80 @@
+import asyncio
+
+from stats_stream import StatsBroadcaster
+
+
+def broadcaster(**options):
+    state = {"total": 0}
+
+    async def snapshot():
+        return dict(state)
+
+    return StatsBroadcaster(snapshot, coalesce_seconds=0, **options), state
+
+
+def test_stream_is_registered_only_while_it_runs():
+    async def main():
+        stats, state = broadcaster()
+        stream = stats.stream()
+        assert stats.stats()["subscribers"] == 0
+
+        first = await stream.__anext__()
+        assert first.startswith(b"retry: 5000\nevent: stats\nid: 1\n")
+        assert stats.stats()["subscribers"] == 1
+
+        state["total"] = 1
+        await stats.publish()
+        assert b'"total":1' in await stream.__anext__()
+
+        await stream.aclose()
+        assert stats.stats()["subscribers"] == 0
+
+    asyncio.run(main())
+
+
+def test_stream_cancelled_while_waiting_is_cleaned_up():
+    async def main():
+        stats, _ = broadcaster()
+
+        async def consume():
+            async for _ in stats.stream():
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        assert stats.stats()["subscribers"] == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert stats.stats()["subscribers"] == 0
+
+    asyncio.run(main())
+
+
+def test_slow_consumer_is_dropped():
+    async def main():
+        stats, state = broadcaster(max_skipped=2)
+        stream = stats.stream()
+        await stream.__anext__()
+        for total in range(1, 5):
+            state["total"] = total
+            await stats.publish()
+
+        assert stats.stats()["dropped_slow_consumers"] == 1
+        assert stats.stats()["subscribers"] == 0
+        await stream.aclose()
+
+    asyncio.run(main())
+
+
+def test_stream_over_capacity_only_sets_the_retry_delay():
+    async def main():
+        stats, _ = broadcaster(max_subscribers=1)
+        stream = stats.stream()
+        await stream.__anext__()
+        assert not stats.has_capacity()
+
+        assert [chunk async for chunk in stats.stream()] == [b"retry: 5000\n\n"]
+        assert stats.stats()["subscribers"] == 1
+        await stream.aclose()
+
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+"""
+Behaviour every registration storage backend has to share
+
+MongoStorage runs against the server in ``MONGO_URL`` (in a throwaway
+database) and is skipped when it is not set.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from storage import MemoryStorage, MongoStorage, RegistrationStorage, SQLiteStorage
+
+BACKENDS = ["memory", "sqlite", "mongo"]
+
+# MongoDB keeps millisecond precision, so test timestamps stay on whole milliseconds
+BASE_TIME = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def registration(email: str, timestamp: datetime = BASE_TIME, referral_source=None, registration_id=None) -> dict:
+    return {
+        "id": registration_id or str(uuid.uuid4()),
+        "fullName": email.split("@")[0],
+        "email": email,
+        "whatsapp": "+10000000000",
+        "referralSource": referral_source,
+        "timestamp": timestamp,
+    }
+
+
+@pytest.fixture(params=BACKENDS)
+def run(request, tmp_path):
+    """
+    Run a scenario coroutine against a fresh, initialized storage of each backend
+    """
+    backend = request.param
+    if backend == "mongo" and not os.getenv("MONGO_URL"):
+        pytest.skip("MONGO_URL is not set")
+
+    def run_scenario(scenario):
+        async def main():
+            client = None
+            if backend == "memory":
+                storage = MemoryStorage()
+            elif backend == "sqlite":
+                storage = SQLiteStorage(str(tmp_path / "registrations.db"))
+            else:
+                from motor.motor_asyncio import AsyncIOMotorClient
+
+                client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+                storage = MongoStorage(client[f"storage_test_{uuid.uuid4().hex}"])
+            await storage.initialize()
+            try:
+                await scenario(storage)
+            finally:
+                await storage.close()
+                if client is not None:
+                    await client.drop_database(storage.db.name)
+                    client.close()
+
+        asyncio.run(main())
+
+    return run_scenario
+
+
+def test_duplicate_email_is_rejected(run):
+    async def scenario(storage):
+        assert await storage.insert_registration(registration("ada@example.com"))
+        assert not await storage.insert_registration(registration("ada@example.com"))
+        assert await storage.registration_exists("ada@example.com")
+        assert not await storage.registration_exists("grace@example.com")
+        assert await storage.count_registrations() == 1
+
+    run(scenario)
+
+
+def test_insert_registrations_reports_rejected_indexes(run):
+    async def scenario(storage):
+        assert await storage.insert_registration(registration("taken@example.com"))
+        rejected = await storage.insert_registrations([
+            registration("new1@example.com"),
+            registration("taken@example.com"),
+            registration("new2@example.com"),
+            registration("new1@example.com"),
+        ])
+        assert rejected == {1: "duplicate email", 3: "duplicate email"}
+        assert await storage.count_registrations() == 3
+        assert await storage.insert_registrations([]) == {}
+
+    run(scenario)
+
+
+def test_pages_are_newest_first_with_id_breaking_timestamp_ties(run):
+    async def scenario(storage):
+        later = BASE_TIME + timedelta(seconds=1)
+        ids = ["a", "b", "c", "d", "e"]
+        for registration_id in ids:
+            await storage.insert_registration(
+                registration(f"{registration_id}@example.com", BASE_TIME, registration_id=registration_id)
+            )
+        await storage.insert_registration(registration("z@example.com", later, registration_id="0"))
+
+        seen, after = [], None
+        while True:
+            page = await storage.list_registrations(after, limit=2)
+            seen.extend(page)
+            if len(page) < 2:
+                break
+            after = (page[-1]["timestamp"], page[-1]["id"])
+
+        assert [doc["id"] for doc in seen] == ["0", "e", "d", "c", "b", "a"]
+        assert seen[0]["timestamp"] == later
+        assert all(doc["timestamp"] == BASE_TIME for doc in seen[1:])
+        assert set(seen[0]) == {"id", "fullName", "email", "whatsapp", "referralSource", "timestamp"}
+
+        streamed = [doc["id"] async for doc in storage.iter_registrations((BASE_TIME, "d"))]
+        assert streamed == ["c", "b", "a"]
+        limited = [doc["id"] async for doc in storage.iter_registrations(limit=3, chunk_size=2)]
+        assert limited == ["0", "e", "d"]
+
+    run(scenario)
+
+
+def test_counts_and_referral_breakdown_include_missing_source(run):
+    async def scenario(storage):
+        assert await storage.count_registrations() == 0
+        assert await storage.referral_counts() == {}
+        await storage.insert_registrations([
+            registration("one@example.com", referral_source="LinkedIn"),
+            registration("two@example.com", referral_source="LinkedIn"),
+            registration("three@example.com", referral_source="Friend"),
+            registration("four@example.com"),
+        ])
+        # A rejected duplicate must not be counted anywhere
+        await storage.insert_registration(registration("four@example.com", referral_source="Friend"))
+
+        assert await storage.count_registrations() == 4
+        assert await storage.referral_counts() == {"LinkedIn": 2, "Friend": 1, None: 1}
+
+    run(scenario)
+
+
+def test_mongo_reports_missing_unique_email_index_until_it_is_built():
+    from mongomock_motor import AsyncMongoMockClient
+
+    async def main():
+        db = AsyncMongoMockClient()["storage_test"]
+        await db.webinar_registrations.insert_many([{"email": "ada@example.com"}, {"email": "ada@example.com"}])
+        storage = MongoStorage(db)
+        await storage.initialize()
+        assert not await storage.emails_are_unique()
+
+        await db.webinar_registrations.delete_one({"email": "ada@example.com"})
+        await db.webinar_registrations.create_index("email", unique=True, name="email_unique")
+        assert await storage.emails_are_unique()
+
+    asyncio.run(main())
+
+
+def test_backend_missing_an_operation_cannot_be_created():
+    class PartialStorage(RegistrationStorage):
+        async def insert_registration(self, document):
+            return True
+
+    with pytest.raises(TypeError):
+        PartialStorage()
@@ -0,0 +1,25 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import DuplicateKeyError
+
+from write_batcher import InsertBatcher
+
+
+def test_concurrent_inserts_share_a_batch_and_keep_documents_untouched():
+    async def main():
+        collection = AsyncMongoMockClient()["batcher_test"]["registrations"]
+        await collection.create_index("email", unique=True)
+        batcher = InsertBatcher(collection, max_batch=10)
+        documents = [{"email": f"user{i}@example.com"} for i in range(3)] + [{"email": "user0@example.com"}]
+
+        results = await asyncio.gather(*(batcher.insert(document) for document in documents), return_exceptions=True)
+        await batcher.close()
+
+        assert results[:3] == [None, None, None]
+        assert isinstance(results[3], DuplicateKeyError)
+        assert all("_id" not in document for document in documents)
+        assert batcher.stats()["documents_written"] == 3
+        assert await collection.count_documents({}) == 3
+
+    asyncio.run(main())
@@ -1,71 +1,249 @@
 #!/usr/bin/env python3
 """
-Direct Database Access Script for TransformBuddy.AI Webinar Registrations
-Run this script to view all registrations directly from MongoDB
+Admin CLI for TransformBuddy.AI Webinar Registrations
+
+Reads registrations straight from MongoDB. Rows are streamed from an
+async cursor and breakdowns are computed by aggregation pipelines on
+the server, so memory use does not grow with the collection.
+
+    python view_registrations.py list --since 2024-06-01 --referral LinkedIn
+    python view_registrations.py stats --by day
+    python view_registrations.py export --format parquet --output registrations.parquet
 """
 
-import os
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
-import json
+import csv
+import os
+import sys
+import time
 from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional
+
+import orjson
+import typer
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BACKEND_DIR = Path(__file__).resolve().parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The backend modules are importable only once BACKEND_DIR is on the path
+from pagination import REGISTRATION_FIELDS, REGISTRATION_PROJECTION, REGISTRATION_SORT, serialize_row  # noqa: E402
+from reports import (  # noqa: E402
+    TIME_BUCKET_FORMATS,
+    referral_breakdown_pipeline,
+    registration_filter,
+    time_breakdown_pipeline,
+)
+
+app = typer.Typer(help="View, summarize and export webinar registrations.", no_args_is_help=True)
+
+NO_REFERRAL = "none"
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    parquet = "parquet"
+
+
+TimeBucket = Enum("TimeBucket", {name: name for name in TIME_BUCKET_FORMATS}, type=str)
+
+settings = {}
+
+
+@app.callback()
+def configure(
+    env_file: Path = typer.Option(BACKEND_DIR / ".env", help="dotenv file with MONGO_URL and DB_NAME"),
+    mongo_url: Optional[str] = typer.Option(None, help="overrides MONGO_URL"),
+    db_name: Optional[str] = typer.Option(None, help="overrides DB_NAME"),
+):
+    load_dotenv(env_file)
+    settings["mongo_url"] = mongo_url or os.getenv("MONGO_URL")
+    settings["db_name"] = db_name or os.getenv("DB_NAME")
+    if not settings["mongo_url"] or not settings["db_name"]:
+        raise typer.BadParameter(f"MONGO_URL and DB_NAME must be set (looked in {env_file})")
+
+
+def registrations_collection():
+    client = AsyncIOMotorClient(settings["mongo_url"])
+    return client, client[settings["db_name"]].webinar_registrations
+
+
+def build_filter(since: Optional[datetime], until: Optional[datetime], referral: Optional[List[str]]) -> dict:
+    sources = [None if source.lower() == NO_REFERRAL else source for source in referral or []]
+    return registration_filter(since, until, sources)
+
+
+def stream(collection, query: dict, limit: Optional[int] = None, batch_size: int = 1000):
+    cursor = collection.find(query, REGISTRATION_PROJECTION).sort(REGISTRATION_SORT).batch_size(batch_size)
+    if limit:
+        cursor = cursor.limit(limit)
+    return cursor
+
+
+SINCE = typer.Option(None, help="registered at or after (UTC)")
+UNTIL = typer.Option(None, help="registered before (UTC)")
+REFERRAL = typer.Option(None, help=f"referral source, repeatable; '{NO_REFERRAL}' for unspecified")
+
+
+@app.command("list")
+def list_registrations(
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    referral: Optional[List[str]] = REFERRAL,
+    limit: Optional[int] = typer.Option(None, help="show at most this many rows"),
+):
+    """
+    Print registrations, newest first
+    """
+    async def run():
+        client, collection = registrations_collection()
+        try:
+            shown = 0
+            async for reg in stream(collection, build_filter(since, until, referral), limit):
+                shown += 1
+                typer.echo(
+                    f"{reg['timestamp']:%Y-%m-%d %H:%M:%S}  {reg.get('fullName', 'N/A')}  <{reg.get('email', 'N/A')}>  "
+                    f"{reg.get('whatsapp', 'N/A')}  {reg.get('referralSource') or 'Not specified'}  {reg.get('id', 'N/A')}"
+                )
+            if not shown:
+                typer.echo("📭 No registrations found.")
+        finally:
+            client.close()
+
+    asyncio.run(run())
+
+
+@app.command()
+def stats(
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    referral: Optional[List[str]] = REFERRAL,
+    by: Optional[TimeBucket] = typer.Option(None, help="also break registrations down by time"),
+    capacity: int = typer.Option(lambda: int(os.getenv("WEBINAR_CAPACITY", "100")), help="webinar seats"),
+):
+    """
+    Totals, referral breakdown and optional time breakdown, aggregated on the server
+    """
+    async def run():
+        client, collection = registrations_collection()
+        try:
+            query = build_filter(since, until, referral)
+            total = await collection.count_documents(query)
+            referrals = await collection.aggregate(referral_breakdown_pipeline(query)).to_list(None)
+            buckets = await collection.aggregate(time_breakdown_pipeline(by.value, query)).to_list(None) if by else []
+        finally:
+            client.close()
+
+        typer.echo("🔍 TransformBuddy.AI Webinar Registrations")
+        typer.echo("=" * 60)
+        typer.echo(f"📊 Total Registrations: {total}")
+        if not query:
+            typer.echo(f"💺 Available Seats: {max(0, capacity - total)}")
+        typer.echo("\n📈 Referral Source Breakdown:")
+        typer.echo("-" * 40)
+        for row in referrals:
+            typer.echo(f"{row['_id'] or 'Not specified'}: {row['count']}")
+        if by:
+            typer.echo(f"\n🗓️  Registrations per {by.value}:")
+            typer.echo("-" * 40)
+            for row in buckets:
+                typer.echo(f"{row['_id']}: {row['count']}")
+
+    asyncio.run(run())
+
+
+class ParquetChunkWriter:
+    """
+    Writes rows to a Parquet file one row group per chunk
+    """
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise typer.BadParameter("Parquet export needs pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema(
+            [(field, pa.string()) for field in REGISTRATION_FIELDS if field != "timestamp"]
+            + [("timestamp", pa.timestamp("ms"))]
+        )
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[dict]):
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+@app.command()
+def export(
+    export_format: ExportFormat = typer.Option(ExportFormat.csv, "--format", help="output format"),
+    output: str = typer.Option("-", help="output file; '-' writes csv/ndjson to stdout"),
+    since: Optional[datetime] = SINCE,
+    until: Optional[datetime] = UNTIL,
+    referral: Optional[List[str]] = REFERRAL,
+    chunk_size: int = typer.Option(5000, help="rows fetched and written per chunk"),
+):
+    """
+    Export registrations, newest first, in constant memory
+    """
+    if export_format == ExportFormat.parquet and output == "-":
+        raise typer.BadParameter("Parquet export needs --output")
+
+    async def run() -> int:
+        client, collection = registrations_collection()
+        docs = stream(collection, build_filter(since, until, referral), batch_size=chunk_size)
+        rows = 0
+        try:
+            if export_format == ExportFormat.parquet:
+                writer = ParquetChunkWriter(output)
+                chunk = []
+                try:
+                    async for doc in docs:
+                        chunk.append(doc)
+                        if len(chunk) >= chunk_size:
+                            writer.write(chunk)
+                            rows += len(chunk)
+                            chunk = []
+                    if chunk:
+                        writer.write(chunk)
+                        rows += len(chunk)
+                finally:
+                    writer.close()
+            elif export_format == ExportFormat.ndjson:
+                out = sys.stdout.buffer if output == "-" else open(output, "wb")
+                try:
+                    async for doc in docs:
+                        out.write(orjson.dumps(doc, option=orjson.OPT_APPEND_NEWLINE))
+                        rows += 1
+                finally:
+                    if out is not sys.stdout.buffer:
+                        out.close()
+            else:
+                out = sys.stdout if output == "-" else open(output, "w", newline="")
+                try:
+                    writer = csv.DictWriter(out, fieldnames=REGISTRATION_FIELDS)
+                    writer.writeheader()
+                    async for doc in docs:
+                        writer.writerow(serialize_row(doc))
+                        rows += 1
+                finally:
+                    if out is not sys.stdout:
+                        out.close()
+        finally:
+            client.close()
+        return rows
+
+    started = time.perf_counter()
+    rows = asyncio.run(run())
+    typer.echo(f"Exported {rows} registrations as {export_format.value} in {time.perf_counter() - started:.1f}s", err=True)
 
-# Load environment variables
-load_dotenv('/app/backend/.env')
-
-async def view_registrations():
-    try:
-        # Connect to MongoDB
-        mongo_url = os.environ['MONGO_URL']
-        db_name = os.environ['DB_NAME']
-        
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
-        
-        print("🔍 TransformBuddy.AI Webinar Registrations")
-        print("=" * 60)
-        
-        # Get all registrations
-        registrations = await db.webinar_registrations.find().sort("timestamp", -1).to_list(1000)
-        
-        if not registrations:
-            print("📭 No registrations found yet.")
-            return
-        
-        print(f"📊 Total Registrations: {len(registrations)}")
-        print(f"💺 Available Seats: {max(0, 100 - len(registrations))}")
-        print("\n" + "="*60)
-        
-        # Display each registration
-        for i, reg in enumerate(registrations, 1):
-            print(f"\n🎟️  Registration #{i}")
-            print("-" * 40)
-            print(f"👤 Name: {reg.get('fullName', 'N/A')}")
-            print(f"📧 Email: {reg.get('email', 'N/A')}")
-            print(f"📱 WhatsApp: {reg.get('whatsapp', 'N/A')}")
-            print(f"🔗 Source: {reg.get('referralSource', 'Not specified')}")
-            print(f"📅 Date: {reg.get('timestamp', 'N/A')}")
-            print(f"🆔 ID: {reg.get('id', 'N/A')}")
-        
-        # Referral source breakdown
-        print(f"\n📈 Referral Source Breakdown:")
-        print("-" * 40)
-        
-        referral_stats = {}
-        for reg in registrations:
-            source = reg.get('referralSource', 'Not specified')
-            referral_stats[source] = referral_stats.get(source, 0) + 1
-        
-        for source, count in sorted(referral_stats.items(), key=lambda x: x[1], reverse=True):
-            print(f"{source}: {count} registration{'s' if count > 1 else ''}")
-        
-        # Close connection
-        client.close()
-        
-    except Exception as e:
-        print(f"❌ Error accessing database: {str(e)}")
-        print("Please ensure MongoDB is running and environment variables are set correctly.")
 
 if __name__ == "__main__":
-    asyncio.run(view_registrations())
\ No newline at end of file
+    app()